@@ -0,0 +1,27 @@
+import argparse
+import sys
+
+from benchmarks import bench_codec, bench_commands, bench_events, bench_transport  # noqa: F401 (registration)
+from benchmarks.runner import run_benchmarks, compare, save, load
+
+parser = argparse.ArgumentParser(description='Pyseco hot paths benchmarks')
+parser.add_argument('-k', '--filter', action='append', help='Run the benchmarks with this in their name only')
+parser.add_argument('-o', '--output', type=str, help='JSON file to write the results to')
+parser.add_argument('-b', '--baseline', type=str, help='JSON results of a previous run to compare with')
+parser.add_argument('-t', '--threshold', default=0.1, type=float,
+                    help='Fail when a benchmark is slower than the baseline by more than this ratio (0.1 = 10%%)')
+parser.add_argument('-r', '--repeat', default=5, type=int, help='Measurements per benchmark, the median counts')
+parser.add_argument('--min-time', default=0.2, type=float, help='Minimal duration of one measurement, in seconds')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    results = run_benchmarks(args.filter, args.repeat, args.min_time)
+    if args.output:
+        save(results, args.output)
+    if args.baseline:
+        regressions = compare(results, load(args.baseline), args.threshold)
+        for name, ratio in regressions:
+            print(f'REGRESSION {name}: {ratio:.0%} of baseline throughput')
+        if regressions:
+            sys.exit(1)
+        print(f'No regression over {args.threshold:.0%} against {args.baseline}')
@@ -0,0 +1,59 @@
+from typing import List
+from xmlrpc.client import dumps, loads
+
+from benchmarks.runner import benchmark
+from src.api.tm_requests import XmlRpc
+from src.api.tm_types import PlayerInfo, ChallengeInfo
+from src.includes.type_factory import ObjectFactory
+from src.simulator import ServerState, to_struct
+
+
+class CannedSender:
+    """Answers every request with the same response, without any socket."""
+
+    def __init__(self, response: bytes):
+        self.response = response
+        self.request_num = 0x80000000
+
+    def send_request(self, request):
+        self.request_num += 1
+        return self.request_num
+
+    def get_response(self, request_num=None):
+        return self.response
+
+
+def player_list_response(count: int = 250) -> bytes:
+    state = ServerState(seed=1)
+    for _ in range(count):
+        state.add_player()
+    return dumps((to_struct([state.player_info(login) for login in state.players]),), methodresponse=True).encode()
+
+
+def challenge_list_response(count: int = 1000) -> bytes:
+    return dumps((to_struct(ServerState(challenges=count, seed=1).challenges),), methodresponse=True).encode()
+
+
+@benchmark('codec.get_player_list_250')
+def get_player_list():
+    rpc = XmlRpc(CannedSender(player_list_response()))
+    return lambda: rpc.get_player_list(250), 1
+
+
+@benchmark('codec.get_challenge_list_1000')
+def get_challenge_list():
+    rpc = XmlRpc(CannedSender(challenge_list_response()))
+    return lambda: rpc.get_challenge_list(1000, 0), 1
+
+
+@benchmark('codec.object_factory_player_list_250')
+def object_factory_player_list():
+    """The generic path: loads to dicts, then ObjectFactory builds the types."""
+    response = player_list_response()
+    return lambda: ObjectFactory(List[PlayerInfo], loads(response)[0][0]).create(), 1
+
+
+@benchmark('codec.object_factory_challenge_list_1000')
+def object_factory_challenge_list():
+    response = challenge_list_response()
+    return lambda: ObjectFactory(List[ChallengeInfo], loads(response)[0][0]).create(), 1
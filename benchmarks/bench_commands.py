@@ -0,0 +1,27 @@
+from benchmarks.runner import benchmark
+from src.commands import CommandRegistry
+from src.controllers.admin_controller import AdminController
+from src.utils import CommandParser
+
+CHAT_LINES = ['*kick player_00001 "stop ramming"', '*skip', '*restart_challenge', '*profile',
+              '*kick player_00042 afk']
+
+
+@benchmark('commands.parser_regex')
+def parser_regex():
+    def run():
+        for line in CHAT_LINES:
+            CommandParser.parser_regex(AdminController, line)
+    return run, len(CHAT_LINES)
+
+
+@benchmark('commands.registry')
+def registry():
+    commands = CommandRegistry()
+    for name in ('kick', 'skip', 'restart_challenge', 'profile'):
+        commands.register(name, lambda caller, *params: None)
+
+    def run():
+        for line in CHAT_LINES:
+            commands.parse(line)
+    return run, len(CHAT_LINES)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from xmlrpc.client import dumps
+
+from benchmarks.runner import benchmark
+from src.includes.events_types import EventPlayerCheckpoint, EventPlayerChat, EventPlayerConnect, EventPlayerFinish
+from src.pyseco import Pyseco, Listener
+from src.simulator import RandomCallbacks, ServerState
+
+CONFIG = '''
+prefix: 'bench'
+color: '$f00'
+tm_login: 'bench'
+rcp_login: 'SuperAdmin'
+rcp_password: 'SuperAdmin'
+rcp_ip: '127.0.0.1'
+rcp_port: 5000
+db_user: 'bench'
+db_password: 'bench'
+db_name: 'bench'
+db_charset: 'utf8'
+db_hostname: '127.0.0.1'
+'''
+
+
+class BenchListener(Listener):
+    def __init__(self, name, pyseco_instance):
+        super().__init__(name, pyseco_instance)
+        self.handled = 0
+        for event in [EventPlayerConnect, EventPlayerCheckpoint, EventPlayerFinish, EventPlayerChat]:
+            self.pyseco.register(event.name, self.on_event)
+
+    def on_event(self, data):
+        self.handled += 1
+
+
+def make_pyseco() -> Pyseco:
+    config_file, path = tempfile.mkstemp(suffix='.yaml')
+    with os.fdopen(config_file, 'w') as config:
+        config.write(CONFIG)
+    try:
+        pyseco = Pyseco(path)
+    finally:
+        os.remove(path)
+    pyseco.register_listener(BenchListener, 'BenchListener')
+    return pyseco
+
+
+def callback_frames(count: int):
+    state = ServerState(seed=1)
+    for _ in range(32):
+        state.add_player()
+    callbacks = RandomCallbacks(rate=0, count=count, weights={'chat': 5, 'next_challenge': 0.02})(state)
+    return [dumps(params, method).encode() for _, method, params in callbacks]
+
+
+@benchmark('events.handle_event')
+def handle_event():
+    """Callbacks of a busy server (mostly checkpoints) through _prepare_event and handle_event, some of them
+    (PlayerInfoChanged, challenge changes) without listeners."""
+    pyseco = make_pyseco()
+    frames = callback_frames(2000)
+
+    def run():
+        for frame in frames:
+            pyseco.handle_event(frame)
+    return run, len(frames)
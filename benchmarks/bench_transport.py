@@ -0,0 +1,34 @@
+import socket
+import threading
+from queue import Queue
+from xmlrpc.client import dumps
+
+from benchmarks.runner import benchmark
+from src.transport import Transport, pack_message
+
+FRAMES = 5000
+
+
+def loopback_transport():
+    listener = socket.create_server(('127.0.0.1', 0))
+    transport = Transport(*listener.getsockname()[:2], Queue())
+    transport.sock.connect(listener.getsockname())
+    server_sock, _ = listener.accept()
+    listener.close()
+    return transport, server_sock
+
+
+@benchmark('transport.loopback_frames')
+def loopback_frames():
+    """Checkpoint callbacks written by a thread to a loopback TCP socket, read frame by frame by Transport."""
+    transport, server_sock = loopback_transport()
+    frame = dumps((236, 'player_00001', 12345, 0, 3), 'TrackMania.PlayerCheckpoint')
+    blob = b''.join(pack_message(frame, index % 0x7fffffff + 1) for index in range(FRAMES))
+
+    def run():
+        writer = threading.Thread(target=server_sock.sendall, args=(blob,))
+        writer.start()
+        for _ in range(FRAMES):
+            transport.get_any_message()
+        writer.join()
+    return run, FRAMES
@@ -0,0 +1,93 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+BENCHMARKS = dict()
+
+
+def benchmark(name: str):
+    """Registers a benchmark. The decorated function prepares everything and returns (run, operations): each
+    run() call does `operations` of the measured operations."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(setup, repeat: int = 5, min_time: float = 0.2) -> dict:
+    run, operations = setup()
+    run()
+    loops = 1
+    while True:
+        time_start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - time_start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        time_start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        timings.append((time.perf_counter() - time_start) / loops)
+    return {
+        'operations': operations,
+        'best_ops_per_sec': operations / min(timings),
+        'median_ops_per_sec': operations / statistics.median(timings),
+        'median_us_per_op': statistics.median(timings) / operations * 1e6,
+        'runs': repeat,
+        'loops': loops,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_benchmarks(names=None, repeat: int = 5, min_time: float = 0.2, report=print) -> dict:
+    results = dict()
+    for name, setup in BENCHMARKS.items():
+        if names and not any(wanted in name for wanted in names):
+            continue
+        results[name] = measure(setup, repeat, min_time)
+        report(f'{name:45} {results[name]["median_ops_per_sec"]:14,.0f} ops/s '
+               f'{results[name]["median_us_per_op"]:10.2f} us/op')
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    """Names and ratios of the benchmarks whose median throughput fell more than `threshold` (0.1 = 10%) under
+    the baseline's. Benchmarks missing from either run are not compared."""
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['median_ops_per_sec'] / base['median_ops_per_sec']
+        if ratio < 1 - threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def save(results: dict, path: str):
+    with open(path, 'w') as results_file:
+        json.dump(results, results_file, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path) as results_file:
+        return json.load(results_file)
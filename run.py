@@ -9,6 +9,10 @@ parser.add_argument('-l', '--loglevel', default='DEBUG', type=str,
                     help='Logging modes: "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL')
 parser.add_argument('-s', '--settings', default='config.yaml', type=str,
                     help='Filename with config')
+parser.add_argument('-r', '--replay', type=str,
+                    help='Feed the callbacks of an events journal to the listeners instead of connecting')
+parser.add_argument('--realtime', action='store_true',
+                    help='Replay the journal with the delays it was recorded with')
 
 logging_modes = {
     'DEBUG': logging.DEBUG,
@@ -26,6 +30,8 @@ from src.listeners.server_state import ServerStateListener
 from src.pyseco import Pyseco
 from src.listeners.chat_listener import ChatListener
 from src.listeners.player_listener import PlayerListener
+from src.listeners.records_listener import RecordsListener
+from src.listeners.karma_listener import KarmaListener
 
 if __name__ == '__main__':
     settings = os.path.join(os.path.dirname(os.path.realpath(__file__)), args.settings)
@@ -33,4 +39,9 @@ if __name__ == '__main__':
         pyseco.register_listener(ServerStateListener, 'ServerStateListener')
         pyseco.register_listener(PlayerListener, 'PlayerListener')
         pyseco.register_listener(ChatListener, 'ChatListener')
-        pyseco.run()
+        pyseco.register_listener(RecordsListener, 'RecordsListener')
+        pyseco.register_listener(KarmaListener, 'KarmaListener')
+        if args.replay:
+            pyseco.replay(args.replay, args.realtime)
+        else:
+            pyseco.run()
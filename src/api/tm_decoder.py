@@ -0,0 +1,177 @@
+import dataclasses
+import typing
+from xml.parsers import expat
+from xmlrpc.client import Fault, Binary, DateTime
+
+from src.api.tm_types import TmType
+
+_SKIP = object()
+_FIELD_MAPS = dict()
+
+
+def _binary(text):
+    value = Binary()
+    value.decode(text.encode('ascii'))
+    return value
+
+
+SCALARS = {
+    'int': int,
+    'i4': int,
+    'i8': int,
+    'ex:i8': int,
+    'boolean': lambda text: text.strip() == '1',
+    'string': str,
+    'double': float,
+    'base64': _binary,
+    'dateTime.iso8601': DateTime,
+    'nil': lambda text: None,
+    'ex:nil': lambda text: None,
+}
+
+
+def field_map(tm_type):
+    """Server member name -> (field name, field type) of a TmType, built once per type."""
+    try:
+        return _FIELD_MAPS[tm_type]
+    except KeyError:
+        field_types = {field.name: field.type for field in dataclasses.fields(tm_type)}
+        _FIELD_MAPS[tm_type] = {key: (name, field_types[name]) for key, name in tm_type.KEYS.items()}
+        return _FIELD_MAPS[tm_type]
+
+
+def _item_type(type_name):
+    if type_name is _SKIP:
+        return _SKIP
+    type_in_list = typing.get_args(type_name)
+    return type_in_list[0] if len(type_in_list) == 1 else None
+
+
+class _TmTypeFrame:
+    def __init__(self, tm_type):
+        self.value = tm_type()
+        self._fields = field_map(tm_type)
+        self._field = None
+
+    def set_key(self, key):
+        self._field = self._fields.get(key)
+
+    def expected_type(self):
+        return self._field[1] if self._field else _SKIP
+
+    def add(self, value):
+        if self._field:
+            setattr(self.value, self._field[0], value)
+
+
+class _DictFrame:
+    def __init__(self):
+        self.value = dict()
+        self._key = None
+
+    def set_key(self, key):
+        self._key = key
+
+    def expected_type(self):
+        return None
+
+    def add(self, value):
+        self.value[self._key] = value
+
+
+class _ListFrame:
+    def __init__(self, item_type):
+        self.value = list()
+        self._item_type = item_type
+
+    def expected_type(self):
+        return self._item_type
+
+    def add(self, value):
+        self.value.append(value)
+
+
+class _SkipFrame:
+    value = None
+
+    def set_key(self, key):
+        pass
+
+    def expected_type(self):
+        return _SKIP
+
+    def add(self, value):
+        pass
+
+
+class _ResultFrame:
+    def __init__(self, result_type):
+        self.value = None
+        self._result_type = result_type
+
+    def expected_type(self):
+        return self._result_type
+
+    def add(self, value):
+        self.value = value
+
+
+class ResponseDecoder:
+    """Decodes a methodResponse with expat callbacks. Structs expected as a TmType (directly, as a List[TmType]
+    item or as a TmType field) are filled in place while parsing, members the type does not know are skipped
+    without being built. Everything else is decoded like xmlrpc.client.loads does."""
+
+    def __init__(self, result_type=None):
+        self._result = _ResultFrame(result_type)
+        self._frames = [self._result]
+        self._text = []
+        self._typed_value = False
+        self._is_fault = False
+        self._parser = expat.ParserCreate('utf-8')
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._text.append
+
+    def _start(self, tag, attrs):
+        self._text.clear()
+        if tag == 'value':
+            self._typed_value = False
+            return
+        self._typed_value = True
+        if tag == 'struct':
+            expected_type = self._frames[-1].expected_type()
+            if expected_type is _SKIP:
+                self._frames.append(_SkipFrame())
+            elif isinstance(expected_type, type) and issubclass(expected_type, TmType):
+                self._frames.append(_TmTypeFrame(expected_type))
+            else:
+                self._frames.append(_DictFrame())
+        elif tag == 'array':
+            self._frames.append(_ListFrame(_item_type(self._frames[-1].expected_type())))
+        elif tag == 'fault':
+            self._is_fault = True
+            self._result = self._frames[0] = _ResultFrame(None)
+
+    def _end(self, tag):
+        if tag in SCALARS:
+            self._frames[-1].add(SCALARS[tag](''.join(self._text)))
+        elif tag == 'value':
+            if not self._typed_value:
+                self._frames[-1].add(''.join(self._text))
+            self._typed_value = True
+        elif tag == 'name':
+            self._frames[-1].set_key(''.join(self._text))
+        elif tag == 'struct' or tag == 'array':
+            frame = self._frames.pop()
+            self._frames[-1].add(frame.value)
+
+    def feed(self, data):
+        self._parser.Parse(data, True)
+        if self._is_fault:
+            raise Fault(**self._result.value)
+        return self._result.value
+
+
+def decode_response(data, result_type=None):
+    return ResponseDecoder(result_type).feed(data)
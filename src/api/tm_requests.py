@@ -1,14 +1,17 @@
+import threading
 import time
 from abc import abstractmethod
-from xmlrpc.client import dumps, loads, Fault, MultiCall
+from concurrent.futures import Future
+from xmlrpc.client import dumps, loads, Fault, Marshaller
 
 import typing
 
 from src.api.tm_types import *
+from src.api.tm_decoder import decode_response
 from src.errors import InconsistentTypesError
 from src.includes.log import setup_logger
-from src.includes.type_factory import ObjectFactory
-from src.transport import Transport
+from src.includes.type_factory import get_builder
+from src.transport import Transport, AsyncTransport
 
 logger = setup_logger(__name__)
 
@@ -21,13 +24,19 @@ class XmlRpc:
     def __getattr__(self, name):
         return Method(self.sender, name)
 
-    def getMulticallRpc(self):
-        return XmlRpc(self.sender, multicall=True)
+    def getMulticallRpc(self, max_request_size: int = None):
+        multicall_rpc = XmlRpc(self.sender, multicall=True)
+        if max_request_size:
+            multicall_rpc.call_proxy.max_request_size = max_request_size
+        return multicall_rpc
 
     def exec_multicall(self, *types):
         if isinstance(self.call_proxy, RpcMulticall):
             return self.call_proxy(*types)
 
+    def batch(self, window: float = 0):
+        return RpcBatch(self, window)
+
     def authenticate(self, login: str, password: str) -> bool:
         """Allow user authentication by specifying a login and a password, to gain access to the set of
         functionalities corresponding to this authorization level. """
@@ -94,7 +103,7 @@ class XmlRpc:
 
     def get_call_vote_ratios(self) -> List[CallVoteRatio]:
         """Get the current ratios for passing votes."""
-        return [CallVoteRatio(result) for result in self.call_proxy.GetCallVoteRatios()]
+        return self.call_proxy.GetCallVoteRatios[List[CallVoteRatio]]()
 
     def chat_send_server_message(self, message: str) -> bool:
         """Send a text message to all clients without the server login. Only available to Admin."""
@@ -206,7 +215,7 @@ class XmlRpc:
     def get_manialink_page_answers(self) -> List[ManialinkPageAnswers]:
         """Returns the latest results from the current manialink page, as an array of structs {string Login,
         int PlayerId, int Result} Result==0 -> no answer, Result>0.... -> answer from the player."""
-        return [ManialinkPageAnswers(result) for result in self.call_proxy.GetManialinkPageAnswers()]
+        return self.call_proxy.GetManialinkPageAnswers[List[ManialinkPageAnswers]]()
 
     def kick(self, login: str, message='') -> bool:
         """Kick the player with the specified login, with an optional message. Only available to Admin."""
@@ -242,8 +251,7 @@ class XmlRpc:
         specifies the maximum number of infos to be returned, and the second one the starting index in the list.
         The list is an array of structures. Each structure contains the following fields :
         Login, ClientName and IPAddress."""
-        return [BanItem(result) for result in
-                self.call_proxy.GetBanList(max_number_of_infos, starting_index)]
+        return self.call_proxy.GetBanList[List[BanItem]](max_number_of_infos, starting_index)
 
     def black_list(self, login: str) -> bool:
         """Blacklist the player with the specified login. Only available to SuperAdmin."""
@@ -609,7 +617,7 @@ class XmlRpc:
 
     def get_forced_skins(self) -> List[ForcedSkin]:
         """Get the current forced skins."""
-        return [ForcedSkin(result) for result in self.call_proxy.GetForcedSkins()]
+        return self.call_proxy.GetForcedSkins[List[ForcedSkin]]()
 
     def get_last_connection_error_message(self) -> str:
         """Returns the last error message for an internet connection. Only available to Admin."""
@@ -968,8 +976,7 @@ class XmlRpc:
         The first parameter specifies the maximum number of infos to be returned, and the second one the starting
         index in the selection. The list is an array of structures. Each structure contains the following fields :
         Name, UId, FileName, Environnement, Author, GoldTime and CopperPrice."""
-        return [ChallengeInfo(result) for result in
-                self.call_proxy.GetChallengeList(max_number_of_infos, starting_index)]
+        return self.call_proxy.GetChallengeList[List[ChallengeInfo]](max_number_of_infos, starting_index)
 
     def add_challenge(self, filename: str) -> bool:
         """Add the challenge with the specified filename at the end of the current selection.
@@ -979,7 +986,7 @@ class XmlRpc:
     def add_challenge_list(self, filenames: List[str]) -> int:
         """Add the list of challenges with the specified filenames at the end of the current selection.
         The list of challenges to add is an array of strings. Only available to Admin."""
-        return self.call_proxy.AddChallengeList[ChallengeInfo](filenames)
+        return self.call_proxy.AddChallengeList(filenames)
 
     def remove_challenge(self, filename: str) -> bool:
         """Remove the challenge with the specified filename from the current selection. Only available to Admin."""
@@ -988,7 +995,7 @@ class XmlRpc:
     def remove_challenge_list(self, filenames: List[str]) -> int:
         """Remove the list of challenges with the specified filenames from the current selection.
         The list of challenges to remove is an array of strings. Only available to Admin."""
-        return self.call_proxy.RemoveChallengeList[ChallengeInfo](filenames)
+        return self.call_proxy.RemoveChallengeList(filenames)
 
     def insert_challenge(self, filename: str) -> bool:
         """Insert the challenge with the specified filename after the current challenge. Only available to Admin."""
@@ -997,7 +1004,7 @@ class XmlRpc:
     def insert_challenge_list(self, filenames: List[str]) -> int:
         """Insert the list of challenges with the specified filenames after the current challenge.
         The list of challenges to insert is an array of strings. Only available to Admin."""
-        return self.call_proxy.InsertChallengeList[ChallengeInfo](filenames)
+        return self.call_proxy.InsertChallengeList(filenames)
 
     def choose_next_challenge(self, filename: str) -> bool:
         """Set as next challenge the one with the specified filename, if it is present in the selection.
@@ -1008,7 +1015,7 @@ class XmlRpc:
         """Set as next challenges the list of challenges with the specified filenames,
         if they are present in the selection. The list of challenges to choose is an array of strings.
         Only available to Admin."""
-        return self.call_proxy.ChooseNextChallengeList[ChallengeInfo](filenames)
+        return self.call_proxy.ChooseNextChallengeList(filenames)
 
     def load_match_settings(self, filename) -> int:
         """Set a list of challenges defined in the playlist with the specified filename as the current selection
@@ -1071,8 +1078,7 @@ class XmlRpc:
         SpectatorStatus = Spectator + TemporarySpectator * 10 + PureSpectator * 100 + AutoTarget * 1000 +
         CurrentTargetId * 10000
         """
-        return [PlayerInfo(result) for result in
-                self.call_proxy.GetPlayerList(max_number_of_infos, starting_index, compatibility)]
+        return self.call_proxy.GetPlayerList[List[PlayerInfo]](max_number_of_infos, starting_index, compatibility)
 
     def get_main_server_player_info(self, compatibility: int = 1) -> PlayerInfo:
         """
@@ -1096,15 +1102,14 @@ class XmlRpc:
         index in the ranking. The ranking returned is a list of structures. Each structure contains the following
         fields : Login, NickName, PlayerId, Rank, BestTime, Score, NbrLapsFinished and LadderScore.
         It also contains an array BestCheckpoints that contains the checkpoint times for the best race."""
-        return [PlayerRanking(result) for result in
-                self.call_proxy.GetCurrentRanking(max_number_of_infos, starting_index)]
+        return self.call_proxy.GetCurrentRanking[List[PlayerRanking]](max_number_of_infos, starting_index)
 
     def get_current_ranking_for_login(self, logins) -> List[PlayerRanking]:
         """Returns the current ranking for the race in progressof the player with the specified login
         (or list of comma-separated logins). The ranking returned is a list of structures, that contains the
         following fields : Login, NickName, PlayerId, Rank, BestTime, Score, NbrLapsFinished and LadderScore.
         It also contains an array BestCheckpoints that contains the checkpoint times for the best race."""
-        return [PlayerRanking(result) for result in self.call_proxy.GetCurrentRankingForLogin(logins)]
+        return self.call_proxy.GetCurrentRankingForLogin[List[PlayerRanking]](logins)
 
     def force_scores(self, player_score: PlayerScore, silent_mode: bool) -> bool:
         """Force the scores of the current game. Only available in rounds and team mode. You have to pass an
@@ -1219,22 +1224,30 @@ class XmlRpc:
 
 
 class Method:
-    def __init__(self, sender: Transport, name: str):
+    def __init__(self, sender: Transport, name: str, result_type=None):
         self.sender = sender
         self._name = name
+        self._result_type = result_type
 
     def __getattr__(self, name):
         return Method(self.sender, f'{self._name}.{name}')
 
+    def __getitem__(self, result_type):
+        """Method[List[PlayerInfo]](...) decodes the response straight into the given type."""
+        return Method(self.sender, self._name, result_type)
+
     def __call__(self, *args):
         request = dumps(args, self._name)
         time_start = time.time()
-        self.sender.send_request(request)
-        logger.debug(f'-> request sent: {self._name}, num: {self.sender.request_num}')
-        resp = self.sender.get_response()
+        request_num = self.sender.send_request(request)
+        logger.debug(f'-> request sent: {self._name}, num: {request_num}')
+        resp = self.sender.get_response(request_num)
         time_end = time.time()
         try:
-            response = loads(resp)[0][0]
+            if self._result_type:
+                response = decode_response(resp, self._result_type)
+            else:
+                response = loads(resp)[0][0]
         except Fault as ex:
             logger.error(str(ex))
             response = False
@@ -1242,20 +1255,289 @@ class Method:
         return response
 
 
+MULTICALL_REQUEST = ("<?xml version='1.0'?>\n<methodCall>\n<methodName>system.multicall</methodName>\n<params>\n"
+                     "<param>\n<value><array><data>\n{}</data></array></value>\n</param>\n</params>\n</methodCall>\n")
+PARAMS_HEADER = '<params>\n<param>\n'
+PARAMS_FOOTER = '</param>\n</params>\n'
+
+
+def marshal_value(value) -> str:
+    return Marshaller('utf-8').dumps((value,))[len(PARAMS_HEADER):-len(PARAMS_FOOTER)]
+
+
+class _MulticallMethod:
+    def __init__(self, multicall, name: str, result_type=None):
+        self._multicall = multicall
+        self._name = name
+        self._result_type = result_type
+
+    def __getattr__(self, name):
+        return _MulticallMethod(self._multicall, f'{self._name}.{name}')
+
+    def __getitem__(self, result_type):
+        return _MulticallMethod(self._multicall, self._name, result_type)
+
+    def __call__(self, *args):
+        self._multicall.add_call(self._name, args, self._result_type)
+
+
 class RpcMulticall:
+    """Collects calls and sends them as system.multicall requests. The calls are split into chunks smaller than
+    max_request_size bytes, all chunks are sent before the first response is read, and the results come back
+    as one list in call order. Each entry is the value (built by the type_factory builder of its type) or the
+    Fault of that single call, so one bad entry does not abort the others."""
+    max_request_size = 256 * 1024
+
     def __init__(self, rpc: XmlRpc):
-        self.multicall = MultiCall(rpc)
+        self.rpc = rpc
+        self.calls = []
 
     def __getattr__(self, attr):
-        return getattr(self.multicall, attr)
+        return _MulticallMethod(self, attr)
+
+    def add_call(self, method_name: str, params, result_type=None):
+        self.calls.append((method_name, params, result_type))
+
+    def _chunks(self, calls):
+        empty_request_size = len(MULTICALL_REQUEST) - 2
+        chunk, chunk_size = [], empty_request_size
+        for method_name, params, _ in calls:
+            value = marshal_value({'methodName': method_name, 'params': list(params)})
+            value_size = len(value.encode('utf-8'))
+            if chunk and chunk_size + value_size > self.max_request_size:
+                yield chunk
+                chunk, chunk_size = [], empty_request_size
+            chunk.append(value)
+            chunk_size += value_size
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _build(result, type_name):
+        if isinstance(result, Fault):
+            return result
+        if isinstance(result, dict):
+            return Fault(result['faultCode'], result['faultString'])
+        if type_name is None:
+            return result[0]
+        return get_builder(type_name)(result[0])
+
+    def _send(self, chunks):
+        """Sends every chunk, if one fails the responses to the chunks sent before it are discarded."""
+        request_numbers = []
+        try:
+            for chunk in chunks:
+                request_numbers.append(self.rpc.sender.send_request(MULTICALL_REQUEST.format(''.join(chunk))))
+        except Exception:
+            for request_number in request_numbers:
+                self.rpc.sender.discard_response(request_number)
+            raise
+        return request_numbers
+
+    def _receive(self, request_number, chunk):
+        try:
+            results = loads(self.rpc.sender.get_response(request_number))[0][0]
+        except Fault as ex:
+            logger.error(str(ex))
+            return [ex] * len(chunk)
+        if len(results) != len(chunk):
+            logger.error(f'Multicall response has {len(results)} result(s) for {len(chunk)} call(s)')
+            missing = Fault(-1, 'No result in the multicall response')
+            results = results[:len(chunk)] + [missing] * (len(chunk) - len(results))
+        return results
 
     def __call__(self, *types):
-        results = self.multicall()
-        if len(types) > 0:
-            return_values = []
-            for result, type_name in zip(results, types):
-                return_values.append(ObjectFactory(type_name, result).create())
-            return return_values
-        return results
+        calls, self.calls = self.calls, []
+        time_start = time.time()
+        chunks = list(self._chunks(calls))
+        request_numbers = self._send(chunks)
+        logger.debug(f'-> multicall of {len(calls)} call(s) sent in {len(chunks)} request(s)')
+
+        results = []
+        for request_number, chunk in zip(request_numbers, chunks):
+            results.extend(self._receive(request_number, chunk))
+        logger.debug('<- received multicall responses, took: {:.2f} ms'.format((time.time() - time_start) * 1000))
+
+        return_values = []
+        for index, ((_, _, result_type), result) in enumerate(zip(calls, results)):
+            if index < len(types):
+                result_type = types[index]
+            return_values.append(self._build(result, result_type))
+        return return_values
+
+
+class _RecordedMethod:
+    def __init__(self, recorder, name: str):
+        self._recorder = recorder
+        self._name = name
+
+    def __getitem__(self, result_type):
+        return self
+
+    def __call__(self, *args):
+        self._recorder.call = (self._name, args)
+        return dict()
+
+
+class _CallRecorder:
+    """Stands in for the XmlRpc instance, so running one of its methods only tells which remote method
+    would be called and with which parameters. The empty dict returned makes the typed wrappers a no-op."""
+
+    def __init__(self):
+        self.call_proxy = self
+        self.call = None
+
+    def __getattr__(self, name):
+        return _RecordedMethod(self, name)
+
+
+def record_call(xml_rpc_method, *args, **kwargs):
+    recorder = _CallRecorder()
+    xml_rpc_method(recorder, *args, **kwargs)
+    return recorder.call
+
+
+def is_tm_type(type_name):
+    type_in_list = typing.get_args(type_name)
+    if len(type_in_list) == 1:
+        type_name = type_in_list[0]
+    return isinstance(type_name, type) and issubclass(type_name, TmType)
+
 
+def xml_rpc_signature(name):
+    """Returns the XmlRpc method called `name` and the TmType based type it returns (None for plain values),
+    None when XmlRpc has no such method."""
+    xml_rpc_method = getattr(XmlRpc, name, None)
+    if xml_rpc_method is None or 'return' not in getattr(xml_rpc_method, '__annotations__', {}):
+        return None
+    result_type = xml_rpc_method.__annotations__['return']
+    return xml_rpc_method, result_type if is_tm_type(result_type) else None
 
+
+class AsyncMethod:
+    def __init__(self, sender: AsyncTransport, name: str, result_type=None):
+        self.sender = sender
+        self._name = name
+        self._result_type = result_type
+
+    def __getattr__(self, name):
+        return AsyncMethod(self.sender, f'{self._name}.{name}')
+
+    async def __call__(self, *args):
+        request = dumps(args, self._name)
+        time_start = time.time()
+        resp = await self.sender.request(request)
+        time_end = time.time()
+        try:
+            response = decode_response(resp, self._result_type)
+        except Fault as ex:
+            logger.error(str(ex))
+            return False
+        logger.debug('<- received response: {}, took: {:.2f} ms'.format(self._name, (time_end - time_start) * 1000))
+        return response
+
+
+class AsyncXmlRpc:
+    """Awaitable facade of XmlRpc. Every XmlRpc method is available under the same name as a coroutine
+    returning the same type, unknown names are sent as raw methods like in XmlRpc. Coroutines awaited
+    together (e.g. with asyncio.gather) are pipelined on the socket instead of waiting for each other."""
+
+    def __init__(self, transport: AsyncTransport):
+        self.sender = transport
+
+    def __getattr__(self, name):
+        signature = xml_rpc_signature(name)
+        if signature is None:
+            return AsyncMethod(self.sender, name)
+        xml_rpc_method, result_type = signature
+
+        def typed_method(*args, **kwargs):
+            method_name, params = record_call(xml_rpc_method, *args, **kwargs)
+            return AsyncMethod(self.sender, method_name, result_type)(*params)
+        return typed_method
+
+
+class RpcFuture(Future):
+    """Result of a call waiting in an RpcBatch. Asking for the result flushes the batch first."""
+
+    def __init__(self, batch):
+        super().__init__()
+        self._batch = batch
+
+    def result(self, timeout=None):
+        if not self.done():
+            self._batch.flush()
+        return super().result(timeout)
+
+
+class RpcBatch:
+    """Collects the calls made through it and sends them as a single system.multicall. It has the same methods
+    as XmlRpc, but each call returns an RpcFuture resolved on flush with the typed result, or with the Fault
+    of that entry. Used as `with rpc.batch() as batch:` it is flushed on exit, with a window a timer started by
+    the first pending call also flushes it `window` seconds later."""
+
+    def __init__(self, rpc: XmlRpc, window: float = 0):
+        self._rpc = rpc
+        self.window = window
+        self._calls = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __getattr__(self, name):
+        signature = xml_rpc_signature(name)
+        if signature is None:
+            return lambda *args: self._submit(name, args, None)
+        xml_rpc_method, result_type = signature
+
+        def typed_method(*args, **kwargs):
+            return self._submit(*record_call(xml_rpc_method, *args, **kwargs), result_type)
+        return typed_method
+
+    def _submit(self, method_name, params, result_type):
+        future = RpcFuture(self)
+        with self._lock:
+            if not self._calls and self.window:
+                self._timer = threading.Timer(self.window, self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+            self._calls.append((method_name, params, result_type, future))
+        return future
+
+    def _flush_due(self):
+        try:
+            self.flush()
+        except Exception as ex:
+            logger.error(f'Flushing the RPC batch failed: {ex}')
+
+    def flush(self):
+        with self._lock:
+            calls, self._calls = self._calls, []
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        if not calls:
+            return
+        multicall = RpcMulticall(self._rpc)
+        for method_name, params, result_type, _ in calls:
+            multicall.add_call(method_name, params, result_type)
+
+        try:
+            results = multicall()
+        except Exception as ex:
+            for _, _, _, future in calls:
+                future.set_exception(ex)
+            raise
+        for (_, _, _, future), result in zip(calls, results):
+            if isinstance(result, Fault):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
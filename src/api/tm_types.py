@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import typing
+from dataclasses import dataclass, field, fields, MISSING
 from src.utils import strip_size
 from typing import Any
 
@@ -8,60 +9,153 @@ from typing import Any
 from typing import List
 
 
+def _compile_constructor(cls):
+    """Generates `from_dict(d)` building `cls` from a server struct: members are looked up by their KEYS name,
+    nested TmTypes (also in lists) are built the same way and missing members get the field default."""
+    namespace = {'cls': cls, 'new': type.__call__}
+    arguments = []
+    fields_by_name = {tm_field.name: tm_field for tm_field in fields(cls)}
+    for index, (key, name) in enumerate(cls.KEYS.items()):
+        tm_field = fields_by_name[name]
+        if tm_field.default_factory is not MISSING:
+            namespace[f'factory{index}'] = tm_field.default_factory
+            default = f'factory{index}()'
+        else:
+            namespace[f'default{index}'] = tm_field.default
+            default = f'default{index}'
+
+        type_in_list = typing.get_args(tm_field.type)
+        if _is_tm_type(tm_field.type):
+            namespace[f'type{index}'] = tm_field.type
+            value = f'type{index}(d[{key!r}]) if {key!r} in d else {default}'
+        elif len(type_in_list) == 1 and _is_tm_type(type_in_list[0]):
+            namespace[f'type{index}'] = type_in_list[0]
+            value = f'[type{index}(item) for item in d[{key!r}]] if {key!r} in d else {default}'
+        else:
+            value = f'd.get({key!r}, {default})'
+        arguments.append(f'{name}=({value})')
+
+    source = f'def from_dict(d):\n    return new(cls, {", ".join(arguments)})\n'
+    exec(source, namespace)
+    return namespace['from_dict']
+
+
+def _is_tm_type(type_name):
+    return isinstance(type_name, type) and issubclass(type_name, TmType)
+
+
 class FromDictionary(type):
     def __call__(cls, *args, **kwargs):
         if len(args) == 1:
             if isinstance(args[0], dict):
-                return type.__call__(cls, *(args[0]).values())
+                return cls.from_dict(args[0])
         return type.__call__(cls, *args, **kwargs)
 
+    def from_dict(cls, value: dict):
+        constructor = cls.__dict__.get('_constructor')
+        if constructor is None:
+            constructor = _compile_constructor(cls)
+            setattr(cls, '_constructor', constructor)
+        return constructor(value)
+
+
+def tm_type(cls):
+    """dataclass with __slots__ holding the fields, what dataclass(slots=True) does since python 3.10."""
+    cls = dataclass(cls)
+    cls_dict = dict(cls.__dict__)
+    field_names = tuple(tm_field.name for tm_field in fields(cls))
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    cls_dict['__slots__'] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
 
 class TmType(metaclass=FromDictionary):
-    pass
+    """Base of the structures returned by the server. KEYS maps the server's struct member names to fields."""
+    __slots__ = ()
+    KEYS = {}
 
 
-@dataclass
+@tm_type
 class PlayerScore(TmType):
     player_id: int = 0
     score: int = 0
 
+    KEYS = {
+        'PlayerId': 'player_id',
+        'Score': 'score'
+    }
 
-@dataclass
+
+@tm_type
 class Avatar(TmType):
     file_name: str = ''
     checksum: str = ''
 
+    KEYS = {
+        'FileName': 'file_name',
+        'Checksum': 'checksum'
+    }
+
 
-@dataclass
+@tm_type
 class PackDesc(TmType):
     file_name: str = ''
     checksum: str = ''
 
+    KEYS = {
+        'FileName': 'file_name',
+        'Checksum': 'checksum'
+    }
 
-@dataclass
+
+@tm_type
 class Skins(TmType):
     environment: int = 0
-    pack_desc: PackDesc = PackDesc()
+    pack_desc: PackDesc = field(default_factory=PackDesc)
+
+    KEYS = {
+        'Environnement': 'environment',
+        'PackDesc': 'pack_desc'
+    }
 
 
-@dataclass
+@tm_type
 class Status(TmType):
     code: int = 0
     name: str = ''
 
+    KEYS = {
+        'Code': 'code',
+        'Name': 'name'
+    }
 
-@dataclass
+
+@tm_type
 class Version(TmType):
     name: str = ''
     version: str = ''
     build: str = ''
 
+    KEYS = {
+        'Name': 'name',
+        'Version': 'version',
+        'Build': 'build'
+    }
+
 
-@dataclass
+@tm_type
 class CallVoteRatio(TmType):
     command: str = ''
     ratio: float = 0
 
+    KEYS = {
+        'Command': 'command',
+        'Ratio': 'ratio'
+    }
+
     def as_dict(self):
         return {
             'Command': self.command,
@@ -69,29 +163,48 @@ class CallVoteRatio(TmType):
         }
 
 
-@dataclass
+@tm_type
 class ManialinkPageAnswers(TmType):
     login: str = ''
     player_id: int = 0
     result: bool = True
 
+    KEYS = {
+        'Login': 'login',
+        'PlayerId': 'player_id',
+        'Result': 'result'
+    }
 
-@dataclass
+
+@tm_type
 class BanItem(TmType):
     login: str = ''
     client_name: str = ''
     ip_address: str = ''
 
+    KEYS = {
+        'Login': 'login',
+        'ClientName': 'client_name',
+        'IPAddress': 'ip_address'
+    }
+
 
-@dataclass
+@tm_type
 class ForcedSkin(TmType):
     orig: str = ''
     name: str = ''
     checksum: str = ''
     url: str = ''
 
+    KEYS = {
+        'Orig': 'orig',
+        'Name': 'name',
+        'Checksum': 'checksum',
+        'Url': 'url'
+    }
 
-@dataclass
+
+@tm_type
 class PlayerInfo(TmType):
     login: str = ''
     nickname: str = ''
@@ -101,8 +214,18 @@ class PlayerInfo(TmType):
     ladder_ranking: int = 0
     flags: int = 0
 
+    KEYS = {
+        'Login': 'login',
+        'NickName': 'nickname',
+        'PlayerId': 'player_id',
+        'TeamId': 'team_id',
+        'SpectatorStatus': 'spectator_status',
+        'LadderRanking': 'ladder_ranking',
+        'Flags': 'flags'
+    }
+
 
-@dataclass
+@tm_type
 class PlayerRanking(TmType):
     login: str = ''
     nickname: str = ''
@@ -114,28 +237,57 @@ class PlayerRanking(TmType):
     nbr_laps_finished: int = 0
     ladder_score: int = 0
 
+    KEYS = {
+        'Login': 'login',
+        'NickName': 'nickname',
+        'PlayerId': 'player_id',
+        'Rank': 'rank',
+        'BestTime': 'best_time',
+        'BestCheckpoints': 'best_checkpoints',
+        'Score': 'score',
+        'NbrLapsFinished': 'nbr_laps_finished',
+        'LadderScore': 'ladder_score'
+    }
 
-@dataclass
+
+@tm_type
 class CurrentCallVote(TmType):
     caller_login: str = ''
     cmd_name: str = ''
     cmd_param: str = ''
 
+    KEYS = {
+        'CallerLogin': 'caller_login',
+        'CmdName': 'cmd_name',
+        'CmdParam': 'cmd_param'
+    }
+
 
-@dataclass
+@tm_type
 class StateValue(TmType):
     current_value: Any = 1
     next_value: Any = 1
 
+    KEYS = {
+        'CurrentValue': 'current_value',
+        'NextValue': 'next_value'
+    }
 
-@dataclass
+
+@tm_type
 class BillState(TmType):
     state: bool = True
     state_name: str = ''
     transaction_id: int = 0
 
+    KEYS = {
+        'State': 'state',
+        'StateName': 'state_name',
+        'TransactionId': 'transaction_id'
+    }
+
 
-@dataclass
+@tm_type
 class SystemInfo(TmType):
     published_ip: str = ''
     port: int = 0
@@ -145,15 +297,30 @@ class SystemInfo(TmType):
     connection_download_rate: float = 0
     connection_upload_rate: float = 0
 
+    KEYS = {
+        'PublishedIp': 'published_ip',
+        'Port': 'port',
+        'P2PPort': 'p2p_port',
+        'ServerLogin': 'server_login',
+        'ServerPlayerId': 'server_player_id',
+        'ConnectionDownloadRate': 'connection_download_rate',
+        'ConnectionUploadRate': 'connection_upload_rate'
+    }
+
 
-@dataclass
+@tm_type
 class LadderServerLimits(TmType):
     ladder_limit_min: int = 0
     ladder_limit_max: int = 0
 
+    KEYS = {
+        'LadderServerLimitMin': 'ladder_limit_min',
+        'LadderServerLimitMax': 'ladder_limit_max'
+    }
+
 
 # aligned to FOREVER version
-@dataclass
+@tm_type
 class ServerOptions(TmType):
     name: str = ''
     comment: str = ''
@@ -183,6 +350,36 @@ class ServerOptions(TmType):
     current_use_changing_validation_seed: bool = True
     next_use_changing_validation_seed: bool = True
 
+    KEYS = {
+        'Name': 'name',
+        'Comment': 'comment',
+        'Password': 'password',
+        'PasswordForSpectator': 'password_for_spectator',
+        'HideServer': 'hide_server',
+        'CurrentMaxPlayers': 'current_max_players',
+        'NextMaxPlayers': 'next_max_players',
+        'CurrentMaxSpectators': 'current_max_spectators',
+        'NextMaxSpectators': 'next_max_spectators',
+        'IsP2PUpload': 'is_p2p_upload',
+        'IsP2PDownload': 'is_p2p_download',
+        'CurrentLadderMode': 'current_ladder_mode',
+        'NextLadderMode': 'next_ladder_mode',
+        'LadderServerLimitMax': 'ladder_server_limit_max',
+        'LadderServerLimitMin': 'ladder_server_limit_min',
+        'CurrentVehicleNetQuality': 'current_vehicle_net_quality',
+        'NextVehicleNetQuality': 'next_vehicle_net_quality',
+        'CurrentCallVoteTimeOut': 'current_callvote_timeout',
+        'NextCallVoteTimeOut': 'next_callvote_timeout',
+        'CallVoteRatio': 'callvote_ratio',
+        'AllowChallengeDownload': 'allow_challenge_download',
+        'AutoSaveReplays': 'autosave_replays',
+        'AutoSaveValidationReplays': 'autosave_validation_replays',
+        'RefereePassword': 'referee_password',
+        'RefereeMode': 'referee_mode',
+        'CurrentUseChangingValidationSeed': 'current_use_changing_validation_seed',
+        'NextUseChangingValidationSeed': 'next_use_changing_validation_seed'
+    }
+
     def as_dict(self):
         return {
             'Name': self.name,
@@ -207,26 +404,42 @@ class ServerOptions(TmType):
         }
 
 
-@dataclass
+@tm_type
 class Mods(TmType):
     env_name: str = ''
     url: str = ''
 
+    KEYS = {
+        'EnvName': 'env_name',
+        'Url': 'url'
+    }
 
-@dataclass
+
+@tm_type
 class ForcedMods(TmType):
     is_override: bool = True
     mods_list: list = list
 
+    KEYS = {
+        'Override': 'is_override',
+        'Mods': 'mods_list'
+    }
+
 
-@dataclass
+@tm_type
 class ForcedMusic(TmType):
     is_override: bool = True
     url: str = ''
     file: str = ''
 
+    KEYS = {
+        'Override': 'is_override',
+        'Url': 'url',
+        'File': 'file'
+    }
 
-@dataclass
+
+@tm_type
 class GameInfo(TmType):
     game_mode: int = 0
     chat_time: int = 0
@@ -243,6 +456,23 @@ class GameInfo(TmType):
     laps_time_limit: int = 0
     finish_timeout: int = 0
 
+    KEYS = {
+        'GameMode': 'game_mode',
+        'ChatTime': 'chat_time',
+        'NbChallenge': 'nb_challenge',
+        'RoundsPointsLimit': 'rounds_points_limit',
+        'RoundsUseNewRules': 'rounds_use_new_rules',
+        'RoundsForcedLaps': 'rounds_forced_laps',
+        'TimeAttackLimit': 'timeattack_limit',
+        'TimeAttackSynchStartPeriod': 'timeattack_synch_start_period',
+        'TeamPointsLimit': 'team_points_limit',
+        'TeamMaxPoints': 'team_max_points',
+        'TeamUseNewRules': 'team_use_new_rules',
+        'LapsNbLaps': 'laps_nb_laps',
+        'LapsTimeLimit': 'laps_time_limit',
+        'FinishTimeout': 'finish_timeout'
+    }
+
     def as_dict(self):
         return {
             'GameMode': self.game_mode,
@@ -261,7 +491,7 @@ class GameInfo(TmType):
         }
 
 
-@dataclass
+@tm_type
 class ChallengeInfo(TmType):
     uid: int = 0
     name: str = ''
@@ -278,16 +508,40 @@ class ChallengeInfo(TmType):
     nb_laps: int = 0
     nb_checkpoints: int = 0
 
-
-@dataclass
+    KEYS = {
+        'UId': 'uid',
+        'Name': 'name',
+        'FileName': 'filename',
+        'Author': 'author',
+        'Environnement': 'environment',
+        'Mood': 'mood',
+        'BronzeTime': 'bronze_time',
+        'SilverTime': 'silver_time',
+        'GoldTime': 'gold_time',
+        'AuthorTime': 'author_time',
+        'CopperPrice': 'copper_price',
+        'LapRace': 'lap_race',
+        'NbLaps': 'nb_laps',
+        'NbCheckpoints': 'nb_checkpoints'
+    }
+
+
+@tm_type
 class LadderRanking(TmType):
     path: str = ''
     score: float = 0
     ranking: int = 0
     total_count: int = 0
 
+    KEYS = {
+        'Path': 'path',
+        'Score': 'score',
+        'Ranking': 'ranking',
+        'TotalCount': 'total_count'
+    }
+
 
-@dataclass
+@tm_type
 class LadderStats(TmType):
     last_match_score: float = 0
     nbr_match_wins: int = 0
@@ -297,8 +551,18 @@ class LadderStats(TmType):
     player_rankings: List[LadderRanking] = list
     TeamRankings: list = list
 
+    KEYS = {
+        'LastMatchScore': 'last_match_score',
+        'NbrMatchWins': 'nbr_match_wins',
+        'NbrMatchDraws': 'nbr_match_draws',
+        'NbrMatchLosses': 'nbr_match_losses',
+        'TeamName': 'team_name',
+        'PlayerRankings': 'player_rankings',
+        'TeamRankings': 'TeamRankings'
+    }
 
-@dataclass
+
+@tm_type
 class DetailedPlayerInfo(TmType):
     login: str = ''
     nickname: str = ''
@@ -313,14 +577,35 @@ class DetailedPlayerInfo(TmType):
     is_spectator: bool = True
     is_in_official_mode: bool = True
     is_referee: bool = True
-    avatar: Avatar = Avatar()
-    skins: Skins = Skins()
-    ladder_stats: LadderStats = LadderStats()
+    avatar: Avatar = field(default_factory=Avatar)
+    skins: Skins = field(default_factory=Skins)
+    ladder_stats: LadderStats = field(default_factory=LadderStats)
     hours_since_zone_inscription: int = 0
     online_rights: int = 0
 
-
-@dataclass
+    KEYS = {
+        'Login': 'login',
+        'NickName': 'nickname',
+        'PlayerId': 'player_id',
+        'TeamId': 'team_id',
+        'Path': 'path',
+        'Language': 'language',
+        'ClientVersion': 'client_version',
+        'IPAddress': 'ip_address',
+        'DownloadRate': 'download_rate',
+        'UploadRate': 'upload_rate',
+        'IsSpectator': 'is_spectator',
+        'IsInOfficialMode': 'is_in_official_mode',
+        'IsReferee': 'is_referee',
+        'Avatar': 'avatar',
+        'Skins': 'skins',
+        'LadderStats': 'ladder_stats',
+        'HoursSinceZoneInscription': 'hours_since_zone_inscription',
+        'OnlineRights': 'online_rights'
+    }
+
+
+@tm_type
 class PlayerNetInfos(TmType):
     login: str = ''
     ip_address: str = ''
@@ -328,8 +613,16 @@ class PlayerNetInfos(TmType):
     delta_between_two_last_net_state: int = 0
     packet_loss_rate: float = 0
 
+    KEYS = {
+        'Login': 'login',
+        'IPAddress': 'ip_address',
+        'LastTransferTime': 'last_transfer_time',
+        'DeltaBetweenTwoLastNetState': 'delta_between_two_last_net_state',
+        'PacketLossRate': 'packet_loss_rate'
+    }
 
-@dataclass
+
+@tm_type
 class NetworkStats(TmType):
     uptime: int = 0
     nbr_connection: int = 0
@@ -339,14 +632,31 @@ class NetworkStats(TmType):
     send_net_rate: float = 0
     total_receiving_size: int = 0
     total_sending_size: int = 0
-    player_net_infos: PlayerNetInfos = PlayerNetInfos()
-
-
-@dataclass
+    player_net_infos: List[PlayerNetInfos] = field(default_factory=list)
+
+    KEYS = {
+        'Uptime': 'uptime',
+        'NbrConnection': 'nbr_connection',
+        'MeanConnectionTime': 'mean_connection_time',
+        'MeanNbrPlayer': 'mean_nbr_player',
+        'RecvNetRate': 'recv_net_rate',
+        'SendNetRate': 'send_net_rate',
+        'TotalReceivingSize': 'total_receiving_size',
+        'TotalSendingSize': 'total_sending_size',
+        'PlayerNetInfos': 'player_net_infos'
+    }
+
+
+@tm_type
 class TextWithLanguage(TmType):
     lang: str = ''
     text: str = ''
 
+    KEYS = {
+        'Lang': 'lang',
+        'Text': 'text'
+    }
+
     def as_dict(self):
         return {
             'Lang': self.lang,
@@ -0,0 +1,89 @@
+import threading
+import time
+from xmlrpc.client import Fault
+
+from src.api.tm_requests import XmlRpc, RpcMulticall
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ChatQueue:
+    """Outbound chat messages, sent once per tick. Messages sent to logins are merged by text, one
+    ChatSendServerMessageToLogin gets the comma separated list of all their logins. The calls of a tick go in a
+    single multicall. With a `messages_per_second` budget the calls over it wait for the next ticks, in order,
+    unless the flush ignores the budget (e.g. at exit)."""
+
+    def __init__(self, rpc: XmlRpc, messages_per_second: float = 0):
+        self.rpc = rpc
+        self.messages_per_second = messages_per_second
+        self.sent = 0
+        self.merged = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._tokens = max(messages_per_second, 1)
+        self._last_refill = time.monotonic()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def send(self, message: str, login: str = None):
+        """Queues a message to everybody, or to the login(s) given."""
+        with self._lock:
+            self._pending.append((message, (login,) if login else None))
+
+    def _merge(self, pending):
+        calls = []
+        to_logins = dict()
+        for message, logins in pending:
+            if logins is None:
+                calls.append((message, None))
+            elif message in to_logins:
+                to_logins[message].update(dict.fromkeys(logins))
+                self.merged += 1
+            else:
+                to_logins[message] = dict.fromkeys(logins)
+                calls.append((message, to_logins[message]))
+        return [(message, tuple(logins) if logins is not None else None) for message, logins in calls]
+
+    def _budget(self):
+        if not self.messages_per_second:
+            return None
+        now = time.monotonic()
+        self._tokens = min(max(self.messages_per_second, 1),
+                           self._tokens + (now - self._last_refill) * self.messages_per_second)
+        self._last_refill = now
+        return int(self._tokens)
+
+    def flush(self, use_budget: bool = True):
+        with self._lock:
+            calls = self._merge(self._pending)
+            budget = self._budget() if use_budget else None
+            if budget is not None and len(calls) > budget:
+                calls, self._pending = calls[:budget], calls[budget:]
+                logger.debug(f'Chat budget reached, {len(self._pending)} message(s) delayed')
+            else:
+                self._pending = []
+            if budget is not None:
+                self._tokens -= len(calls)
+        if not calls:
+            return
+        self.sent += len(calls)
+
+        if len(calls) == 1:
+            message, logins = calls[0]
+            if logins is None:
+                self.rpc.chat_send_server_message(message)
+            else:
+                self.rpc.chat_send_server_message_to_login(message, ','.join(logins))
+            return
+
+        multicall = RpcMulticall(self.rpc)
+        for message, logins in calls:
+            if logins is None:
+                multicall.ChatSendServerMessage(message)
+            else:
+                multicall.ChatSendServerMessageToLogin(message, ','.join(logins))
+        for (message, _), result in zip(calls, multicall()):
+            if isinstance(result, Fault):
+                logger.error(f'Sending "{message}" failed: {result}')
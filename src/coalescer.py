@@ -0,0 +1,47 @@
+import traceback
+from collections import defaultdict
+
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class EventCoalescer:
+    """Collects the events listened to in batches and delivers them once per tick. A batch listener gets one call
+    with the list of all events of its type received since the previous tick, grouped by login: events of one
+    player are next to each other in the order they came, players in the order of their first event."""
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self._listeners = defaultdict(set)
+        self._pending = dict()
+
+    def __contains__(self, event_name):
+        return event_name in self._listeners
+
+    def register(self, event_name: str, listener_method):
+        self._listeners[event_name].add(listener_method)
+
+    def add(self, event):
+        """Keeps the event for the next tick, returns False if nobody listens to its batches."""
+        if event.name not in self._listeners:
+            return False
+        by_login = self._pending.setdefault(event.name, dict())
+        by_login.setdefault(getattr(event.data, 'login', None), []).append(event.data)
+        return True
+
+    def pending(self):
+        return sum(len(events) for by_login in self._pending.values() for events in by_login.values())
+
+    def flush(self):
+        pending, self._pending = self._pending, dict()
+        for event_name, by_login in pending.items():
+            batch = [data for events in by_login.values() for data in events]
+            for listener_method in self._listeners[event_name]:
+                try:
+                    if self.profiler:
+                        self.profiler.call(event_name, listener_method, batch)
+                    else:
+                        listener_method(batch)
+                except Exception:
+                    logger.error(f'Batch of {len(batch)} {event_name} failed:\n{traceback.format_exc()}')
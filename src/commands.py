@@ -0,0 +1,101 @@
+import inspect
+import shlex
+
+from src.errors import WrongCommand, WrongNumberOfParams, WrongParamType
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _to_bool(text: str) -> bool:
+    if text.lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if text.lower() in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f'"{text}" is not a boolean')
+
+
+CONVERTERS = {
+    int: int,
+    float: float,
+    bool: _to_bool,
+}
+
+
+class Command:
+    """Chat command bound to its handler, with the arity and argument converters read once from its signature.
+    The handler takes the login of the player who sent the command first, then the command params."""
+    __slots__ = ('name', 'handler', 'min_args', 'max_args', 'converters')
+
+    def __init__(self, name: str, handler):
+        self.name = name
+        self.handler = handler
+        parameters = list(inspect.signature(handler).parameters.values())
+        positional = [parameter for parameter in parameters
+                      if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)][1:]
+        self.min_args = sum(1 for parameter in positional if parameter.default is parameter.empty)
+        has_varargs = any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters)
+        self.max_args = None if has_varargs else len(positional)
+        self.converters = tuple(CONVERTERS.get(parameter.annotation) for parameter in positional)
+
+    def __call__(self, caller, args):
+        if len(args) < self.min_args or (self.max_args is not None and len(args) > self.max_args):
+            raise WrongNumberOfParams(f'*{self.name} takes {self._arity()} param(s), {len(args)} given')
+        if any(self.converters):
+            try:
+                args = [converter(arg) if converter else arg
+                        for converter, arg in zip(self.converters, args)] + list(args[len(self.converters):])
+            except ValueError as ex:
+                raise WrongParamType(f'*{self.name}: {ex}')
+        return self.handler(caller, *args)
+
+    def _arity(self):
+        if self.max_args is None:
+            return f'at least {self.min_args}'
+        if self.max_args == self.min_args:
+            return str(self.min_args)
+        return f'{self.min_args} to {self.max_args}'
+
+
+class CommandRegistry:
+    """Chat commands by name. Commands are inspected once when registered, so handling a chat line is a split and
+    a dict lookup. Quoted params ("two words") are kept together like shlex does."""
+
+    def __init__(self, prefix: str = '*'):
+        self.prefix = prefix
+        self._commands = dict()
+
+    def __contains__(self, name):
+        return name in self._commands
+
+    def __len__(self):
+        return len(self._commands)
+
+    def register(self, name: str, handler):
+        if name in self._commands:
+            logger.warning(f'Command {self.prefix}{name} of {self._commands[name].handler} replaced by {handler}')
+        self._commands[name] = Command(name, handler)
+
+    def register_controller(self, controller):
+        """Registers every public method of the controller as a command named like the method."""
+        for name, handler in inspect.getmembers(controller, predicate=inspect.ismethod):
+            if not name.startswith('_'):
+                self.register(name, handler)
+
+    def parse(self, line: str):
+        name, *params = line.lstrip().lstrip(self.prefix).split(None, 1)[:2] or ['']
+        command = self._commands.get(name)
+        if command is None:
+            raise WrongCommand(f'Unknown command {self.prefix}{name}')
+        if not params:
+            return command, ()
+        if '"' not in params[0] and "'" not in params[0]:
+            return command, tuple(params[0].split())
+        try:
+            return command, tuple(shlex.split(params[0]))
+        except ValueError as ex:
+            raise WrongCommand(f'{self.prefix}{name}: {ex}')
+
+    def dispatch(self, line: str, caller: str):
+        command, args = self.parse(line)
+        return command(caller, args)
@@ -2,7 +2,7 @@ from src.controllers.controller import Controller
 
 
 class AdminController(Controller):
-    def kick(self, login, message):
+    def kick(self, caller, login, message):
         if self.pyseco.is_player_on_server(login):
             self.pyseco.rpc.kick(login, message)
             self.pyseco.server_message(f'{login} was kicked')
@@ -10,11 +10,17 @@ class AdminController(Controller):
             self.pyseco.server_message(f'{login} not found')
 
 
-    def restart_challenge(self):
+    def restart_challenge(self, caller):
         self.pyseco.rpc.restart_challenge()
         self.pyseco.server_message(f'Challenge was restarted')
 
-    def skip(self):
+    def skip(self, caller):
         self.pyseco.rpc.next_challenge()
         self.pyseco.server_message(f'Challenge was skipped')
 
+    def profile(self, caller):
+        report = self.pyseco.profiler.report(5)
+        if not report:
+            self.pyseco.server_message('No handler profiled yet')
+        for line in report + self.pyseco.dispatcher.report():
+            self.pyseco.server_message(line)
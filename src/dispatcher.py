@@ -0,0 +1,144 @@
+import threading
+import time
+import traceback
+import zlib
+from dataclasses import dataclass
+from queue import Queue
+
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+_STOP = object()
+
+
+def run_listeners(event, listeners, profiler=None):
+    args = (event.data,) if event.data else ()
+    for listener_method in listeners:
+        if profiler:
+            profiler.call(event.name, listener_method, *args)
+        else:
+            listener_method(*args)
+
+
+@dataclass
+class ShardStats:
+    shard: int
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    handled: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.handled if self.handled else 0.0
+
+
+class _Shard:
+    def __init__(self, index: int, profiler=None):
+        self.queue = Queue()
+        self.profiler = profiler
+        self.stats = ShardStats(index)
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self._work, name=f'dispatcher-{index}', daemon=True)
+        self.thread.start()
+
+    def put(self, event, listeners, barrier=None):
+        self.queue.put((event, listeners, barrier))
+        with self._lock:
+            self.stats.queue_depth = self.queue.qsize()
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.stats.queue_depth)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is _STOP:
+                self.queue.task_done()
+                return
+            event, listeners, barrier = job
+            time_start = time.perf_counter()
+            try:
+                if barrier:
+                    barrier.wait()
+                else:
+                    run_listeners(event, listeners, self.profiler)
+            except Exception:
+                logger.error(f'Handling {event.name} failed:\n{traceback.format_exc()}')
+            latency = time.perf_counter() - time_start
+            with self._lock:
+                self.stats.queue_depth = self.queue.qsize()
+                self.stats.handled += 1
+                self.stats.total_latency += latency
+                self.stats.max_latency = max(self.stats.max_latency, latency)
+            self.queue.task_done()
+
+    def snapshot(self) -> ShardStats:
+        with self._lock:
+            return ShardStats(**vars(self.stats))
+
+
+class EventDispatcher:
+    """Runs the listeners of events on a pool of worker threads. Events are sharded by the login they carry, each
+    shard is handled by one thread, so events of a player keep their order while different players are handled
+    in parallel. Events without a login (challenge, race, status...) are queued to every shard behind a barrier:
+    the last shard reaching it runs their listeners, after everything received before them, and the shards go
+    on once they are done. The calling thread never waits for the workers. With no workers everything runs on
+    the calling thread, in order."""
+
+    def __init__(self, workers: int = 0, profiler=None):
+        self.profiler = profiler
+        self._shards = [_Shard(index, profiler) for index in range(workers)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._shards)
+
+    def shard_of(self, login: str) -> int:
+        return zlib.crc32(login.encode('utf-8')) % len(self._shards)
+
+    def dispatch(self, event, listeners):
+        login = getattr(event.data, 'login', None)
+        if not self._shards or not listeners:
+            run_listeners(event, listeners, self.profiler)
+        elif login is None:
+            self._dispatch_to_all(event, tuple(listeners))
+        else:
+            self._shards[self.shard_of(login)].put(event, tuple(listeners))
+
+    def _dispatch_to_all(self, event, listeners):
+        def run():
+            try:
+                run_listeners(event, listeners, self.profiler)
+            except Exception:
+                logger.error(f'Handling {event.name} failed:\n{traceback.format_exc()}')
+
+        barrier = threading.Barrier(len(self._shards), action=run)
+        # every shard must get the barriers in the same order, or two of them could wait on each other
+        with self._lock:
+            for shard in self._shards:
+                shard.put(event, listeners, barrier)
+
+    def join(self):
+        """Waits until all dispatched events have been handled."""
+        for shard in self._shards:
+            shard.queue.join()
+
+    def stats(self):
+        return [shard.snapshot() for shard in self._shards]
+
+    def report(self):
+        return [f'shard {stats.shard}: depth {stats.queue_depth} (max {stats.max_queue_depth}), '
+                f'handled {stats.handled}, latency mean {stats.mean_latency * 1000:.2f} ms, '
+                f'max {stats.max_latency * 1000:.2f} ms' for stats in self.stats()]
+
+    def log_stats(self):
+        for line in self.report():
+            logger.info(line)
+
+    def shutdown(self):
+        for shard in self._shards:
+            shard.queue.put(_STOP)
+        for shard in self._shards:
+            shard.thread.join()
+        self._shards = []
@@ -24,3 +24,7 @@ class WrongNumberOfParams(PysecoException):
 
 class InconsistentTypesError(PysecoException):
     pass
+
+
+class WrongParamType(PysecoException):
+    pass
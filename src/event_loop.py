@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import selectors
+import socket
+import time
+import traceback
+from collections import deque
+
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Timer:
+    def __init__(self, when: float, interval: float, callback, args):
+        self.when = when
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventLoop:
+    """Single threaded loop built on selectors. It waits at once for the registered sockets, the closest timer
+    and an internal wakeup socket, so jobs can be scheduled (also from other threads) without extra threads
+    and without polling."""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._timers = []
+        self._sequence = itertools.count()
+        self._ready = deque()
+        self._idle_callbacks = []
+        self._running = False
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, self._drain_wakeup)
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def wakeup(self):
+        """Makes a waiting loop run an iteration, safe to call from any thread."""
+        try:
+            self._wakeup_writer.send(b'\0')
+        except BlockingIOError:
+            pass
+
+    def _push_timer(self, timer: Timer):
+        heapq.heappush(self._timers, (timer.when, next(self._sequence), timer))
+
+    def _timeout(self):
+        if self._ready:
+            return 0
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        if self._timers:
+            return max(0, self._timers[0][0] - time.monotonic())
+        return None
+
+    def _run_timers(self):
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            if timer.interval:
+                timer.when = max(timer.when + timer.interval, now)
+                self._push_timer(timer)
+            self._run_job(timer.callback, timer.args)
+
+    @staticmethod
+    def _run_job(callback, args):
+        try:
+            callback(*args)
+        except Exception:
+            logger.error(f'Scheduled job {getattr(callback, "__name__", callback)} failed\n{traceback.format_exc()}')
+
+    def add_reader(self, fileobj, callback):
+        self._selector.register(fileobj, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fileobj):
+        self._selector.unregister(fileobj)
+
+    def add_idle_callback(self, callback):
+        """Registers a callback run after every loop iteration, right before waiting for the next one."""
+        self._idle_callbacks.append(callback)
+
+    def call_later(self, delay: float, callback, *args) -> Timer:
+        timer = Timer(time.monotonic() + delay, 0, callback, args)
+        self._push_timer(timer)
+        return timer
+
+    def call_every(self, interval: float, callback, *args) -> Timer:
+        timer = Timer(time.monotonic() + interval, interval, callback, args)
+        self._push_timer(timer)
+        return timer
+
+    def call_soon_threadsafe(self, callback, *args):
+        self._ready.append((callback, args))
+        self.wakeup()
+
+    def run_once(self, timeout=None):
+        wait_time = self._timeout()
+        if timeout is not None:
+            wait_time = timeout if wait_time is None else min(wait_time, timeout)
+        for key, _ in self._selector.select(wait_time):
+            key.data()
+        self._run_timers()
+        while self._ready:
+            self._run_job(*self._ready.popleft())
+        for callback in self._idle_callbacks:
+            callback()
+
+    def run_forever(self):
+        self._running = True
+        while self._running:
+            self.run_once()
+
+    def stop(self):
+        self._running = False
+        self.wakeup()
+
+    def close(self):
+        self._selector.close()
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
@@ -17,6 +17,24 @@ class Config(object):
     db_name: str
     db_charset: str
     db_hostname: str
+    db_pool_size: int
+    db_ping_interval: float
+    db_write_batch: int
+    rpc_threaded: bool
+    event_workers: int
+    dispatcher_stats_interval: float
+    events_queue_size: int
+    events_queue_policies: dict
+    event_tick: float
+    events_journal: str
+    events_journal_max_bytes: int
+    events_journal_backups: int
+    slow_handler_threshold: float
+    profiler_dump: str
+    chat_messages_per_second: float
+    local_records: int
+    min_rank_records: int
+    karma_flush_interval: float
 
     def __init__(self, config_file):
         self._config = yaml.safe_load(open(config_file))
@@ -31,4 +49,22 @@ class Config(object):
         self.db_password = self._config['db_password']
         self.db_name = self._config['db_name']
         self.db_charset = self._config['db_charset']
-        self.db_hostname = self._config['db_hostname']
\ No newline at end of file
+        self.db_hostname = self._config['db_hostname']
+        self.db_pool_size = self._config.get('db_pool_size', 4)
+        self.db_ping_interval = self._config.get('db_ping_interval', 30)
+        self.db_write_batch = self._config.get('db_write_batch', 500)
+        self.rpc_threaded = self._config.get('rpc_threaded', False)
+        self.event_workers = self._config.get('event_workers', 0)
+        self.dispatcher_stats_interval = self._config.get('dispatcher_stats_interval', 300)
+        self.events_queue_size = self._config.get('events_queue_size', 10000)
+        self.events_queue_policies = self._config.get('events_queue_policies', dict())
+        self.event_tick = self._config.get('event_tick', 0.1)
+        self.events_journal = self._config.get('events_journal', '')
+        self.events_journal_max_bytes = self._config.get('events_journal_max_bytes', 64 * 1024 * 1024)
+        self.events_journal_backups = self._config.get('events_journal_backups', 5)
+        self.slow_handler_threshold = self._config.get('slow_handler_threshold', 0.1)
+        self.profiler_dump = self._config.get('profiler_dump', '')
+        self.chat_messages_per_second = self._config.get('chat_messages_per_second', 20)
+        self.local_records = self._config.get('local_records', 50)
+        self.min_rank_records = self._config.get('min_rank_records', 3)
+        self.karma_flush_interval = self._config.get('karma_flush_interval', 60)
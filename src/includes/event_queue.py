@@ -0,0 +1,136 @@
+import threading
+from collections import Counter, OrderedDict
+from queue import Empty
+
+from src.includes.log import setup_logger
+from src.utils import peek_method_name, peek_login
+
+logger = setup_logger(__name__)
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+DEFAULT_POLICIES = {
+    'TrackMania.PlayerCheckpoint': COALESCE,
+    'TrackMania.PlayerInfoChanged': COALESCE,
+}
+
+
+class BoundedEventQueue:
+    """Queue of raw callback frames holding at most `maxsize` of them, used like queue.Queue. What happens to a
+    callback arriving at a full queue depends on the policy of its method:
+    - block: the producer waits up to `block_timeout` seconds for room, then the oldest callback is dropped.
+      The thread consuming the queue never waits on itself, it drops the oldest callback right away.
+    - drop_oldest: the oldest callback is dropped.
+    - coalesce: once the queue is above its high water mark, a callback waiting in the queue for the same
+      method and login is removed and the new one is queued at the tail, so the callbacks of a login keep
+      their order. Without one, the oldest callback is dropped when the queue is full.
+    Dropped and coalesced callbacks are counted per method name."""
+
+    def __init__(self, maxsize: int = 10000, policies: dict = None, default_policy: str = BLOCK,
+                 block_timeout: float = 1.0, high_water: float = 0.8):
+        self.maxsize = maxsize
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.default_policy = default_policy
+        for policy in [default_policy, *self.policies.values()]:
+            if policy not in POLICIES:
+                raise ValueError(f'Unknown event queue policy "{policy}", expected one of {POLICIES}')
+        self.block_timeout = block_timeout
+        self.high_water = max(1, int(maxsize * high_water))
+        self.high_water_mark = 0
+        self.dropped = Counter()
+        self.coalesced = Counter()
+        self._above_high_water = False
+        self._entries = OrderedDict()
+        self._coalesce_keys = dict()
+        self._next_id = 0
+        self._consumer = None
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def qsize(self):
+        return len(self._entries)
+
+    def empty(self):
+        return not self._entries
+
+    def full(self):
+        return len(self._entries) >= self.maxsize
+
+    def put(self, msg, block=True, timeout=None):
+        method_name = peek_method_name(msg)
+        policy = self.policies.get(method_name, self.default_policy)
+        key = (method_name, peek_login(msg)) if policy == COALESCE else None
+        with self._lock:
+            if key in self._coalesce_keys and len(self._entries) >= self.high_water:
+                del self._entries[self._coalesce_keys.pop(key)]
+                self.coalesced[method_name] += 1
+                self._append(key, msg)
+                return
+            if self.full() and policy == BLOCK and block and self._consumer is not threading.current_thread():
+                self._not_full.wait_for(lambda: not self.full(), self.block_timeout if timeout is None else timeout)
+            if self.full():
+                self._drop_oldest()
+            self._append(key, msg)
+
+    def put_nowait(self, msg):
+        self.put(msg, block=False)
+
+    def _append(self, key, msg):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (key, msg)
+        if key:
+            self._coalesce_keys[key] = entry_id
+        self._track_size()
+        self._not_empty.notify()
+
+    def _pop_oldest(self):
+        entry_id, (key, msg) = self._entries.popitem(last=False)
+        if key and self._coalesce_keys.get(key) == entry_id:
+            del self._coalesce_keys[key]
+        return msg
+
+    def _drop_oldest(self):
+        method_name = peek_method_name(self._pop_oldest())
+        self.dropped[method_name] += 1
+        logger.debug(f'Event queue full, dropped {method_name}')
+
+    def _track_size(self):
+        size = len(self._entries)
+        if size > self.high_water_mark:
+            self.high_water_mark = size
+        if size >= self.high_water and not self._above_high_water:
+            self._above_high_water = True
+            logger.warning(f'Event queue above high water ({size}/{self.maxsize}), '
+                           f'dropped: {sum(self.dropped.values())}, coalesced: {sum(self.coalesced.values())}')
+        elif size < self.high_water // 2 and self._above_high_water:
+            self._above_high_water = False
+            logger.info(f'Event queue back to {size}/{self.maxsize}')
+
+    def get(self, block=True, timeout=None):
+        with self._lock:
+            self._consumer = threading.current_thread()
+            if block:
+                self._not_empty.wait_for(lambda: self._entries, timeout)
+            if not self._entries:
+                raise Empty()
+            msg = self._pop_oldest()
+            self._track_size()
+            self._not_full.notify()
+            return msg
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'high_water_mark': self.high_water_mark,
+                'dropped': dict(self.dropped),
+                'coalesced': dict(self.coalesced),
+            }
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import List
 
+from src.api.tm_types import PlayerInfo
+
 
 def init_from_list(class_name, items):
     return [class_name(*item.values()) for item in items]
@@ -198,24 +200,17 @@ class EventChallengeListModified:
     is_list_modified: bool
 
 
-@dataclass
-class PlayerInfo:
-    login: str
-    nickname: str
-    player_id: int
-    team_id: int
-    spectator_status: int
-    ladder_ranking: int
-    flags: int
-
-
 @event_decorator
 @dataclass
 class EventPlayerInfoChanged:
     player_info: PlayerInfo
 
     def __init__(self, player_info):
-        self.player_info = PlayerInfo(*player_info.values())
+        self.player_info = PlayerInfo.from_dict(player_info)
+
+    @property
+    def login(self):
+        return self.player_info.login
 
 
 @event_decorator
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from struct import Struct
+
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+MAGIC = b'PYSECOJ1'
+RECORD_HEADER = Struct('<dL')
+
+
+def journal_files(path: str):
+    """Files of a rotated journal, oldest first."""
+    backups = []
+    index = 1
+    while os.path.exists(f'{path}.{index}'):
+        backups.append(f'{path}.{index}')
+        index += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_journal(path: str):
+    """Yields (timestamp, frame) of every record of a journal file and its backups, oldest first. A record cut
+    by a crash at the end of a file is ignored. The time.monotonic() timestamps of a run have no meaning in the
+    next one, so each run is shifted to start when the previous one ended."""
+    offset = 0
+    last_timestamp = None
+    for file_name in journal_files(path):
+        with open(file_name, 'rb') as journal:
+            if journal.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{file_name} is not an events journal')
+            while True:
+                header = journal.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                timestamp, size = RECORD_HEADER.unpack(header)
+                frame = journal.read(size)
+                if len(frame) < size:
+                    logger.warning(f'{file_name} ends with a truncated record')
+                    break
+                if not size:
+                    offset = last_timestamp - timestamp if last_timestamp is not None else 0
+                    continue
+                last_timestamp = timestamp + offset
+                yield last_timestamp, frame
+
+
+class EventJournal:
+    """Append-only journal of raw callback frames. Each record is the time.monotonic() of its arrival, the frame
+    size and the frame bytes, an empty record marks the start of a run. Once the file grows over `max_bytes` it
+    is rotated like logging rotates its files: path becomes path.1, path.1 becomes path.2... and the ones over
+    `backup_count` are removed. The transport reader thread may write while the main loop flushes, the file is
+    locked."""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self._open()
+        self.write(b'')
+
+    def _open(self):
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+        if not self._size:
+            self._file.write(MAGIC)
+            self._size = len(MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{index}'):
+                os.replace(f'{self.path}.{index}', f'{self.path}.{index + 1}')
+        if self.backup_count:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        logger.debug(f'Rotated events journal {self.path}')
+        self._open()
+
+    def write(self, frame):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._size >= self.max_bytes:
+                self._rotate()
+            self._file.write(RECORD_HEADER.pack(time.monotonic(), len(frame)))
+            self._file.write(frame)
+            self._size += RECORD_HEADER.size + len(frame)
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
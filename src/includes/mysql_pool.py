@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from pymysql import OperationalError, InterfaceError
+
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+CONNECTION_ERRORS = (OperationalError, InterfaceError)
+
+
+class ConnectionPool:
+    """Up to `size` connections made by `connect()`, opened when first needed. A connection idle for longer than
+    `ping_interval` seconds is pinged, and reconnected, before it is handed out; one which failed with a
+    connection error is dropped instead of going back to the pool."""
+
+    def __init__(self, connect, size: int = 4, ping_interval: float = 30.0, timeout: float = 10.0):
+        self._connect = connect
+        self.size = size
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            connection, idle_since = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._open_new()
+            if connection is not None:
+                return connection
+            connection, idle_since = self._wait_for_idle()
+        if time.monotonic() - idle_since > self.ping_interval:
+            self._ping(connection)
+        return connection
+
+    def _open_new(self):
+        """A new connection, None when `size` of them are open already."""
+        with self._lock:
+            if self._opened >= self.size:
+                return None
+            self._opened += 1
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _wait_for_idle(self):
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise OperationalError(f'No database connection free after {self.timeout} s')
+
+    def _ping(self, connection):
+        try:
+            connection.ping(reconnect=True)
+        except CONNECTION_ERRORS:
+            self._discard(connection)
+            raise
+
+    def _discard(self, connection):
+        with self._lock:
+            self._opened -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def open(self, count: int = 1):
+        """Opens `count` connections now, so a database which cannot be reached fails early."""
+        for _ in range(count):
+            self.release(self._acquire())
+
+    def release(self, connection):
+        self._idle.put((connection, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        connection = self._acquire()
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            self._discard(connection)
+            raise
+        except BaseException:
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    def run(self, operation, retries: int = 1):
+        """Returns operation(connection), the operation is retried on a new connection after a connection error."""
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as connection:
+                    return operation(connection)
+            except CONNECTION_ERRORS as ex:
+                if attempt == retries:
+                    raise
+                logger.warning(f'Database connection lost ({ex}), retrying')
+
+    def close(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(connection)
+
+
+class WriteBehind:
+    """Runs INSERT/UPDATE/DELETE statements on a background thread so callers never wait for the database.
+    Statements are taken up to `max_batch` at a time, runs of the same SQL are sent with executemany and every
+    batch is committed in one transaction. A batch failing on a lost connection is retried once on a new one,
+    other failures are logged and the batch is dropped."""
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 500):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name='mysql-write-behind', daemon=True)
+        self._thread.start()
+
+    def execute(self, sql: str, params=()):
+        self._queue.put((sql, params))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _runs(statements):
+        """Groups consecutive statements with the same SQL: [(sql, [params...]), ...]."""
+        runs = []
+        for sql, params in statements:
+            if runs and runs[-1][0] == sql:
+                runs[-1][1].append(params)
+            else:
+                runs.append((sql, [params]))
+        return runs
+
+    def _write(self, connection, runs):
+        connection.begin()
+        try:
+            with connection.cursor() as cursor:
+                for sql, params_list in runs:
+                    if len(params_list) == 1:
+                        cursor.execute(sql, params_list[0])
+                    else:
+                        cursor.executemany(sql, params_list)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def _work(self):
+        while True:
+            batch = self._take_batch()
+            stop = batch[-1] is None
+            statements = [statement for statement in batch if statement is not None]
+            if statements:
+                try:
+                    self.pool.run(lambda connection: self._write(connection, self._runs(statements)))
+                    self.written += len(statements)
+                except Exception:
+                    self.failed += len(statements)
+                    logger.error(f'Dropped {len(statements)} database write(s):\n{traceback.format_exc()}')
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Waits until every statement queued so far is written."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
@@ -1,5 +1,6 @@
 import pymysql
 from src.includes.config import Config
+from src.includes.mysql_pool import ConnectionPool, WriteBehind
 
 
 class MySqlWrapper:
@@ -11,21 +12,122 @@ class MySqlWrapper:
     RS_TIMES = 'rs_times'
 
     def __init__(self, config: Config):
-        self._connection = pymysql.connect(host=config.db_hostname,
-                                           user=config.db_user,
-                                           password=config.db_password,
-                                           db=config.db_name,
-                                           charset=config.db_charset,
-                                           cursorclass=pymysql.cursors.DictCursor)
+        self._config = config
+        self._pool = ConnectionPool(self._connect, config.db_pool_size, config.db_ping_interval)
+        self.writes = WriteBehind(self._pool, config.db_write_batch)
+
+    def connect(self):
+        """Opens a first connection to check the database. Without it connections are opened when needed."""
+        self._pool.open()
+
+    def _connect(self):
+        return pymysql.connect(host=self._config.db_hostname,
+                               user=self._config.db_user,
+                               password=self._config.db_password,
+                               db=self._config.db_name,
+                               charset=self._config.db_charset,
+                               cursorclass=pymysql.cursors.DictCursor,
+                               autocommit=True)
+
+    def _query(self, sql, params=()):
+        def query(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+        return self._pool.run(query)
 
     def _get_all_from(self, table):
-        with self._connection.cursor() as cursor:
-            sql = f'SELECT * from {table}'
-            cursor.execute(sql)
-            return cursor.fetchall()
+        return self._query(f'SELECT * from {table}')
+
+    def iter_batches(self, table, columns=None, batch_size: int = 1000, tuples: bool = False):
+        """Yields the rows of a table in lists of up to `batch_size`, read with a server side cursor so only one
+        batch is in memory at a time. Rows are dicts, or tuples in the `columns` order with `tuples`."""
+        selected = ', '.join(f'`{column}`' for column in columns) if columns else '*'
+        return self.iter_query_batches(f'SELECT {selected} FROM {table}', (), batch_size, tuples)
+
+    def iter_query_batches(self, sql, params=(), batch_size: int = 1000, tuples: bool = False):
+        """Rows of a query in lists of up to `batch_size`, see iter_batches."""
+        cursor_class = pymysql.cursors.SSCursor if tuples else pymysql.cursors.SSDictCursor
+        with self._pool.connection() as connection:
+            with connection.cursor(cursor_class) as cursor:
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+
+    def iter_rows(self, table, columns=None, batch_size: int = 1000, tuples: bool = False):
+        """Rows of a table one by one, see iter_batches."""
+        for rows in self.iter_batches(table, columns, batch_size, tuples):
+            yield from rows
+
+    def execute_later(self, sql, params=()):
+        """Queues a write, it is run in a batch on the write-behind thread."""
+        self.writes.execute(sql, params)
+
+    def insert_later(self, table, row: dict):
+        columns = ', '.join(f'`{column}`' for column in row)
+        placeholders = ', '.join(['%s'] * len(row))
+        self.execute_later(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', tuple(row.values()))
+
+    def flush(self):
+        self.writes.flush()
+
+    def close(self):
+        self.writes.close()
+        self._pool.close()
 
     def get_players(self):
         return self._get_all_from(self.PLAYERS)
 
     def get_challenges(self):
         return self._get_all_from(self.CHALLENGES)
+
+    def get_records(self, challenge_uid, limit):
+        """Best (Login, Score) of a challenge, best first."""
+        return self._query(f'SELECT p.Login, r.Score FROM {self.RECORDS} r '
+                           f'JOIN {self.PLAYERS} p ON p.Id = r.PlayerId '
+                           f'JOIN {self.CHALLENGES} c ON c.Id = r.ChallengeId '
+                           f'WHERE c.Uid = %s ORDER BY r.Score, r.Date LIMIT %s', (challenge_uid, limit))
+
+    def save_records_later(self, challenge_uid, records):
+        """Queues the (login, score) records of a challenge, a stored record is only replaced by a better one."""
+        for login, score in records:
+            self.execute_later(f'INSERT INTO {self.RECORDS} (ChallengeId, PlayerId, Score, Date, Checkpoints) '
+                               f"SELECT c.Id, p.Id, %s, NOW(), '' FROM {self.CHALLENGES} c, {self.PLAYERS} p "
+                               f'WHERE c.Uid = %s AND p.Login = %s '
+                               f'ON DUPLICATE KEY UPDATE Date = IF(VALUES(Score) < Score, VALUES(Date), Date), '
+                               f'Score = LEAST(Score, VALUES(Score))', (score, challenge_uid, login))
+
+    def iter_record_rankings(self, batch_size: int = 10000):
+        """(challenge Uid, Login) of all records, by challenge then best first, streamed."""
+        for rows in self.iter_query_batches(f'SELECT c.Uid, p.Login FROM {self.RECORDS} r '
+                                            f'JOIN {self.PLAYERS} p ON p.Id = r.PlayerId '
+                                            f'JOIN {self.CHALLENGES} c ON c.Id = r.ChallengeId '
+                                            f'ORDER BY r.ChallengeId, r.Score, r.Date', (), batch_size, True):
+            yield from rows
+
+    def save_ranks_later(self, ranks):
+        """Queues the (login, average * 10000) server ranks, a None average removes the rank."""
+        for login, average in ranks:
+            if average is None:
+                self.execute_later(f'DELETE rk FROM {self.RS_RANK} rk JOIN {self.PLAYERS} p ON p.Id = rk.playerID '
+                                   f'WHERE p.Login = %s', (login,))
+            else:
+                self.execute_later(f'INSERT INTO {self.RS_RANK} (playerID, avg) SELECT Id, %s FROM {self.PLAYERS} '
+                                   f'WHERE Login = %s ON DUPLICATE KEY UPDATE avg = VALUES(avg)', (average, login))
+
+    def get_karma(self, challenge_uid):
+        """(Login, Score) karma votes of a challenge."""
+        return self._query(f'SELECT p.Login, k.Score FROM {self.RS_KARMA} k '
+                           f'JOIN {self.PLAYERS} p ON p.Id = k.PlayerId '
+                           f'JOIN {self.CHALLENGES} c ON c.Id = k.ChallengeId WHERE c.Uid = %s', (challenge_uid,))
+
+    def save_karma_later(self, challenge_uid, votes):
+        """Queues the (login, score) karma votes of a challenge."""
+        for login, score in votes:
+            self.execute_later(f'INSERT INTO {self.RS_KARMA} (ChallengeId, PlayerId, Score) '
+                               f'SELECT c.Id, p.Id, %s FROM {self.CHALLENGES} c, {self.PLAYERS} p '
+                               f'WHERE c.Uid = %s AND p.Login = %s '
+                               f'ON DUPLICATE KEY UPDATE Score = VALUES(Score)', (score, challenge_uid, login))
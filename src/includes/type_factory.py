@@ -17,7 +17,7 @@ class TmTypeBuilder(TypeBuilder):
     def build(self, value):
         if not isinstance(value, dict):
             raise InconsistentTypesError(f'dict expected, given: {type(value).__name__}')
-        return self.type_to_build(value)
+        return self.type_to_build.from_dict(value)
 
 
 class PrimitiveTypeBuilder(TypeBuilder):
@@ -27,48 +27,58 @@ class PrimitiveTypeBuilder(TypeBuilder):
         return self.type_to_build(value)
 
 
-class Factory:
-    @abstractmethod
-    def create(self):
-        pass
+class AnyTypeBuilder(TypeBuilder):
+    def build(self, value):
+        return value
 
 
-class WithBuilder:
-    def __init__(self, type_to_build, value):
-        self.type_to_build = type_to_build
-        self.value = value
-        self.builder = self._get_builder()
+class ListTypeBuilder(TypeBuilder):
+    def __init__(self, type_to_build):
+        super().__init__(type_to_build)
+        self._build_item = get_builder(type_to_build)
 
-    def _get_builder(self):
-        if issubclass(self.type_to_build, TmType):
-            return TmTypeBuilder(self.type_to_build)
-        return PrimitiveTypeBuilder(self.type_to_build)
+    def build(self, value):
+        if not isinstance(value, list):
+            raise InconsistentTypesError(f'expected list, given: {type(value).__name__}')
+        build_item = self._build_item
+        return [build_item(item) for item in value]
 
 
-class ListTypeObjectFactory(Factory, WithBuilder):
-    def create(self):
-        if not isinstance(self.value, list):
-            raise InconsistentTypesError(f'expected list, given: {type(self.value).__name__}')
-        return [self.builder.build(item) for item in self.value]
+_BUILDERS = dict()
 
 
-class TypeObjectFactory(Factory, WithBuilder):
+def _make_builder(type_name):
+    type_in_list = typing.get_args(type_name)
+    if len(type_in_list) == 1:
+        return ListTypeBuilder(*type_in_list)
+    if not isinstance(type_name, type):
+        return AnyTypeBuilder(type_name)
+    if issubclass(type_name, TmType):
+        return TmTypeBuilder(type_name)
+    return PrimitiveTypeBuilder(type_name)
+
+
+def get_builder(type_name):
+    """Returns the function building values of the given annotation (a TmType, a primitive or List[...] of them).
+    The type dispatch is done once per annotation, the builders are kept for the next values."""
+    try:
+        return _BUILDERS[type_name]
+    except KeyError:
+        _BUILDERS[type_name] = _make_builder(type_name).build
+        return _BUILDERS[type_name]
+
+
+class Factory:
+    @abstractmethod
     def create(self):
-        return self.builder.build(self.value)
+        pass
 
 
 class ObjectFactory(Factory):
     def __init__(self, type_name, value):
         self._type_name = type_name
         self._value = value
-        self._factory = self._get_factory()
-
-    def _get_factory(self):
-        type_in_list = typing.get_args(self._type_name)
-        if len(type_in_list) == 1:
-            return ListTypeObjectFactory(*type_in_list, self._value)
-        return TypeObjectFactory(self._type_name, self._value)
+        self._build = get_builder(type_name)
 
     def create(self):
-        return self._factory.create()
-
+        return self._build(self._value)
@@ -0,0 +1,54 @@
+from typing import Dict, List, Tuple
+
+
+class KarmaVotes:
+    """Karma of one challenge: the vote of each login (+1 or -1) and the plus and minus counts, kept up to date
+    on every vote. The logins which voted since the last `take_changed()` are remembered for saving."""
+
+    def __init__(self, challenge_uid: str):
+        self.challenge_uid = challenge_uid
+        self.plus = 0
+        self.minus = 0
+        self._votes: Dict[str, int] = dict()
+        self._changed = set()
+
+    def __len__(self):
+        return len(self._votes)
+
+    @property
+    def karma(self) -> int:
+        return self.plus - self.minus
+
+    def load(self, votes):
+        """Fills the counters with the stored (login, score) votes."""
+        for login, score in votes:
+            self._count(self._votes.get(login), score)
+            self._votes[login] = score
+
+    def _count(self, previous, score):
+        if previous == 1:
+            self.plus -= 1
+        elif previous == -1:
+            self.minus -= 1
+        if score == 1:
+            self.plus += 1
+        elif score == -1:
+            self.minus += 1
+
+    def vote_of(self, login: str) -> int:
+        return self._votes.get(login, 0)
+
+    def vote(self, login: str, score: int) -> bool:
+        """Sets the vote of the login, returns False if it did not change."""
+        previous = self._votes.get(login)
+        if previous == score:
+            return False
+        self._count(previous, score)
+        self._votes[login] = score
+        self._changed.add(login)
+        return True
+
+    def take_changed(self) -> List[Tuple[str, int]]:
+        """(login, score) of the votes changed since the previous call."""
+        changed, self._changed = self._changed, set()
+        return [(login, self._votes[login]) for login in changed]
@@ -0,0 +1,67 @@
+import threading
+
+from src.includes.events_types import *
+from src.includes.log import setup_logger
+from src.karma import KarmaVotes
+from src.pyseco import Listener
+
+logger = setup_logger(__name__)
+
+VOTES = {'++': 1, '--': -1}
+
+
+class KarmaListener(Listener):
+    """Karma votes, `++` and `--` in the chat. The votes of the current and the next challenge are kept in
+    memory, a vote only updates the counters and the changed votes are saved in batches by the database
+    write-behind thread, every karma_flush_interval seconds and when the challenge changes."""
+
+    def __init__(self, name: str, pyseco_instance):
+        super(KarmaListener, self).__init__(name, pyseco_instance)
+        self.current = None
+        self.next = None
+        self._lock = threading.Lock()
+        self.pyseco.register(EventPlayerChat.name, self.on_player_chat)
+        self.pyseco.register(EventBeginChallenge.name, self.on_begin_challenge)
+        self.pyseco.register(EventEndChallenge.name, self.on_end_challenge)
+        self.pyseco.schedule_periodic(self.pyseco.config.karma_flush_interval, self.save)
+
+    def load(self, challenge_uid) -> KarmaVotes:
+        votes = KarmaVotes(challenge_uid)
+        if self.pyseco.mysql:
+            votes.load([(row['Login'], row['Score']) for row in self.pyseco.mysql.get_karma(challenge_uid)])
+        logger.debug(f'{len(votes)} karma vote(s) loaded for {challenge_uid}')
+        return votes
+
+    def save(self, karmas=None):
+        with self._lock:
+            karmas = karmas or (self.current, self.next)
+            changed = [(votes.challenge_uid, votes.take_changed()) for votes in karmas if votes]
+        for challenge_uid, votes in changed:
+            if votes and self.pyseco.mysql:
+                self.pyseco.mysql.save_karma_later(challenge_uid, votes)
+                logger.debug(f'{len(votes)} karma vote(s) of {challenge_uid} queued for saving')
+
+    def on_begin_challenge(self, data: EventBeginChallenge):
+        uid = data.challenge.uid
+        current = self.next if self.next and self.next.challenge_uid == uid else self.load(uid)
+        next_uid = self.pyseco.rpc.get_next_challenge_info().uid
+        upcoming = current if next_uid == uid else self.load(next_uid)
+        with self._lock:
+            previous = (self.current, self.next)
+            self.current, self.next = current, upcoming
+        self.save(previous)
+
+    def on_end_challenge(self, data: EventEndChallenge):
+        self.save()
+
+    def on_player_chat(self, data: EventPlayerChat):
+        score = VOTES.get(data.text.strip())
+        if score is None:
+            return
+        with self._lock:
+            if self.current is None:
+                self.current = self.load(self.pyseco.server.current_challenge.uid)
+            changed = self.current.vote(data.login, score)
+            plus, minus = self.current.plus, self.current.minus
+        if changed:
+            self.pyseco.server_message_to_login(data.login, f'Karma of this challenge: $0f0+{plus} $f00-{minus}')
@@ -0,0 +1,118 @@
+import threading
+import time
+import traceback
+
+from src.includes.events_types import *
+from src.includes.log import setup_logger
+from src.pyseco import Listener
+from src.ranks import RankEngine
+from src.records import LocalRecords
+from src.utils import strip_size, format_time
+
+logger = setup_logger(__name__)
+
+
+class RecordsListener(Listener):
+    """Local records of the current challenge. They are read in one query when the challenge begins, finishes
+    are checked against the cache only and the improved records are saved when the challenge ends. Finishes
+    may be handled by several event workers at once, the cache is locked. Server ranks (rs_rank) are built from
+    all records once, on a background thread started with the listener, and follow the record changes of the
+    current challenge. Rankings changed before the build is done are kept and applied to the built ranks."""
+
+    def __init__(self, name: str, pyseco_instance):
+        super(RecordsListener, self).__init__(name, pyseco_instance)
+        self.records = None
+        self.ranks = RankEngine(self.pyseco.config.local_records, self.pyseco.config.min_rank_records)
+        self.ranks_ready = threading.Event()
+        self._pending_rankings = dict()
+        self._building = False
+        self._lock = threading.Lock()
+        self.pyseco.register(EventBeginChallenge.name, self.on_begin_challenge)
+        self.pyseco.register(EventPlayerFinish.name, self.on_player_finish)
+        self.pyseco.register(EventEndChallenge.name, self.on_end_challenge)
+        self.pyseco.register_command('rank', self.rank)
+        self.start_build()
+
+    def start_build(self):
+        """Builds the ranks on a background thread, unless they are built or being built already."""
+        if self.ranks_ready.is_set() or self._building:
+            return
+        self._building = True
+        threading.Thread(target=self.build_ranks, name='ranks-build', daemon=True).start()
+
+    def build_ranks(self):
+        ranks = RankEngine(self.ranks.max_records, self.ranks.min_records)
+        time_start = time.perf_counter()
+        try:
+            if self.pyseco.mysql:
+                ranks.build(self.pyseco.mysql.iter_record_rankings())
+        except Exception:
+            logger.error(f'Building the server ranks failed, retried on the next challenge:\n{traceback.format_exc()}')
+            with self._lock:
+                self._building = False
+            return
+        with self._lock:
+            for challenge_uid, logins in self._pending_rankings.items():
+                ranks.set_ranking(challenge_uid, logins)
+            self._pending_rankings.clear()
+            self.ranks = ranks
+            self._building = False
+            self.ranks_ready.set()
+        logger.info(f'{len(ranks)} server rank(s) built in {time.perf_counter() - time_start:.2f} s')
+
+    def load(self, challenge_uid):
+        self.records = LocalRecords(challenge_uid, self.pyseco.config.local_records)
+        if self.pyseco.mysql:
+            rows = self.pyseco.mysql.get_records(challenge_uid, self.records.max_records)
+            self.records.load([(row['Login'], row['Score']) for row in rows])
+        logger.debug(f'{len(self.records)} local record(s) loaded for {challenge_uid}')
+
+    def save(self):
+        changed = self.records.take_changed() if self.records else []
+        if changed and self.pyseco.mysql:
+            self.pyseco.mysql.save_records_later(self.records.challenge_uid, changed)
+            logger.debug(f'{len(changed)} local record(s) of {self.records.challenge_uid} queued for saving')
+        changed_ranks = self.ranks.take_changed() if self.ranks_ready.is_set() else []
+        if changed_ranks and self.pyseco.mysql:
+            self.pyseco.mysql.save_ranks_later(changed_ranks)
+            logger.debug(f'{len(changed_ranks)} server rank(s) queued for saving')
+
+    def on_begin_challenge(self, data: EventBeginChallenge):
+        with self._lock:
+            self.save()
+            self.load(data.challenge.uid)
+            self.start_build()
+
+    def on_player_finish(self, data: EventPlayerFinish):
+        with self._lock:
+            if self.records is None:
+                self.load(self.pyseco.server.current_challenge.uid)
+            rank = self.records.finish(data.login, data.time_or_score)
+            if rank is not None:
+                logins = [login for login, _ in self.records.records()]
+                if self.ranks_ready.is_set():
+                    self.ranks.set_ranking(self.records.challenge_uid, logins)
+                else:
+                    self._pending_rankings[self.records.challenge_uid] = logins
+        if rank is None:
+            return
+        player = self.pyseco.players.get(data.login)
+        nickname = player.info.nickname if player else data.login
+        self.pyseco.server_message(f'{strip_size(nickname)}$z$s$888 secured the {rank}. local record '
+                                   f'{format_time(data.time_or_score)}')
+
+    def on_end_challenge(self, data: EventEndChallenge):
+        with self._lock:
+            self.save()
+
+    def rank(self, caller, login=None):
+        login = login or caller
+        if not self.ranks_ready.is_set():
+            self.pyseco.server_message_to_login(caller, 'Server ranks are still being computed, try again later')
+            return
+        with self._lock:
+            rank, average = self.ranks.rank_of(login), self.ranks.average(login)
+        if rank is None:
+            self.pyseco.server_message_to_login(caller, f'{login} has no server rank yet')
+        else:
+            self.pyseco.server_message_to_login(caller, f'{login} is ranked {rank}/{len(self.ranks)}, average {average:.1f}')
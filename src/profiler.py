@@ -0,0 +1,139 @@
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+
+from src.includes.log import setup_logger
+
+logger = setup_logger(__name__)
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _listener_key(event_name: str, listener_method):
+    """Bound methods are created on every attribute access, they are told apart by their function and instance."""
+    return (event_name, id(getattr(listener_method, '__func__', listener_method)),
+            id(getattr(listener_method, '__self__', None)))
+
+
+def listener_name(listener_method) -> str:
+    return getattr(listener_method, '__qualname__', None) or repr(listener_method)
+
+
+class LatencyHistogram:
+    """Counts of handler run times in the fixed BUCKETS (upper bounds in seconds), the last one is for longer."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed: float):
+        self.counts[bisect_left(BUCKETS, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket holding the given percentile, the max for the overflow bucket."""
+        wanted = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return 0.0
+
+
+class HandlerProfiler:
+    """Keeps a latency histogram of every (event, listener) pair it runs. Its watchdog thread checks the running
+    handlers every `slow_threshold` / 2 seconds and logs the stack of the ones running for longer than
+    `slow_threshold`, once per call."""
+
+    def __init__(self, slow_threshold: float = 0.1):
+        self.slow_threshold = slow_threshold
+        self.slow_calls = 0
+        self._histograms = dict()
+        self._running = dict()
+        self._reported = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def call(self, event_name: str, listener_method, *args):
+        thread_id = threading.get_ident()
+        time_start = time.perf_counter()
+        self._running[thread_id] = (event_name, listener_method, time_start)
+        try:
+            return listener_method(*args)
+        finally:
+            elapsed = time.perf_counter() - time_start
+            del self._running[thread_id]
+            key = _listener_key(event_name, listener_method)
+            with self._lock:
+                entry = self._histograms.get(key)
+                if entry is None:
+                    entry = self._histograms[key] = (listener_method, LatencyHistogram())
+                entry[1].add(elapsed)
+
+    def histogram(self, event_name: str, listener_method) -> LatencyHistogram:
+        entry = self._histograms.get(_listener_key(event_name, listener_method))
+        return entry[1] if entry else None
+
+    def check_running(self):
+        now = time.perf_counter()
+        frames = None
+        running = set()
+        for thread_id, (event_name, listener_method, time_start) in list(self._running.items()):
+            running.add((thread_id, time_start))
+            if now - time_start < self.slow_threshold or (thread_id, time_start) in self._reported:
+                continue
+            frames = frames or sys._current_frames()
+            frame = frames.get(thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else ''
+            logger.warning(f'{listener_name(listener_method)} handling {event_name} runs for '
+                           f'{(now - time_start) * 1000:.0f} ms:\n{stack}')
+            self._reported.add((thread_id, time_start))
+            self.slow_calls += 1
+        self._reported &= running
+
+    def _watch(self):
+        while not self._stop.wait(max(self.slow_threshold / 2, 0.01)):
+            self.check_running()
+
+    def start_watchdog(self):
+        if self._watchdog is None:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name='handler-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def stop_watchdog(self):
+        if self._watchdog is not None:
+            self._stop.set()
+            self._watchdog.join()
+            self._watchdog = None
+
+    def top(self, count: int = 10):
+        """(event name, listener, histogram) of the `count` pairs which took the most time in total."""
+        with self._lock:
+            items = [(event_name, listener_method, histogram)
+                     for (event_name, *_), (listener_method, histogram) in self._histograms.items()]
+        return sorted(items, key=lambda item: item[2].total, reverse=True)[:count]
+
+    def report(self, count: int = 10):
+        return [f'{event_name} {listener_name(listener_method)}: {histogram.count} call(s), '
+                f'total {histogram.total * 1000:.1f} ms, mean {histogram.mean * 1000:.2f} ms, '
+                f'p95 {histogram.percentile(95) * 1000:.1f} ms, max {histogram.max * 1000:.1f} ms'
+                for event_name, listener_method, histogram in self.top(count)]
+
+    def dump(self, path: str, count: int = 50):
+        with open(path, 'w') as dump_file:
+            dump_file.write('\n'.join(self.report(count)) + '\n')
+        logger.info(f'Handler profile written to {path}')
@@ -1,40 +1,63 @@
 import time
 import traceback
 from collections import defaultdict
-from queue import Queue
-from xmlrpc.client import loads
+from typing import List
+from xmlrpc.client import loads, Fault
 
 from pymysql import OperationalError
 
 from src.api.tm_requests import XmlRpc
+from src.api.tm_types import DetailedPlayerInfo, PlayerRanking
+from src.chat_queue import ChatQueue
+from src.coalescer import EventCoalescer
+from src.commands import CommandRegistry
+from src.dispatcher import EventDispatcher
+from src.event_loop import EventLoop, Timer
 from src.errors import PlayerNotFound, NotAnEvent, EventDiscarded, PysecoException
 from src.includes.config import Config
-from src.includes.events_types import EventData
+from src.includes.event_queue import BoundedEventQueue
+from src.includes.journal import EventJournal, read_journal
+from src.includes.events_types import EventData, EVENTS_MAP
 from src.includes.log import setup_logger
 from src.includes.mysql_wrapper import MySqlWrapper
 from src.player import Player
+from src.profiler import HandlerProfiler
 from src.server_context import ServerCtx
-from src.transport import Transport
-from src.utils import is_bound, strip_size
+from src.transport import Transport, ThreadedTransport
+from src.utils import is_bound, strip_size, peek_method_name
 
 logger = setup_logger(__name__)
 
 
 class Pyseco:
     def __init__(self, config_file):
-        self.events_queue = Queue()
         self.config = Config(config_file)
-        self.transport = Transport(
-            self.config.rcp_ip, self.config.rcp_port, self.events_queue)
+        self.events_queue = BoundedEventQueue(self.config.events_queue_size, self.config.events_queue_policies)
+        transport_class = ThreadedTransport if self.config.rpc_threaded or self.config.event_workers else Transport
+        self.transport = transport_class(self.config.rcp_ip, self.config.rcp_port, self.events_queue)
         self.rpc = XmlRpc(self.transport)
+        self.loop = EventLoop()
 
         self.events_matrix = defaultdict(set)
+        self.profiler = HandlerProfiler(self.config.slow_handler_threshold)
+        self.dispatcher = EventDispatcher(self.config.event_workers, self.profiler)
+        self.coalescer = EventCoalescer(self.profiler)
+        self.commands = CommandRegistry()
+        self.chat = ChatQueue(self.rpc, self.config.chat_messages_per_second)
+        self.journal = None
+        if self.config.events_journal:
+            self.journal = EventJournal(self.config.events_journal, self.config.events_journal_max_bytes,
+                                        self.config.events_journal_backups)
+            self.transport.journal = self.journal
         self.server = ServerCtx(self.rpc, self.config)
         self.players = dict()
+        self.skipped_callbacks = 0
+        self._disconnected = False
+        self.mysql = MySqlWrapper(self.config)
         try:
-            self.mysql = MySqlWrapper(self.config)
+            self.mysql.connect()
         except OperationalError as e:
-            logger.debug(f'Cannot connect to database, error: {e}')
+            logger.warning(f'Cannot connect to database, it will be tried again when needed, error: {e}')
 
     def __enter__(self):
         return self
@@ -43,28 +66,81 @@ class Pyseco:
         self.disconnect()
 
     def _prepare_event(self, msg):
-        event = EventData(*loads(msg))
-        if not event.name:
+        method_name = peek_method_name(msg)
+        if not method_name:
             raise NotAnEvent('Not an event')
 
-        if event.name not in self.events_matrix:
-            raise EventDiscarded(f'No method registered for {event.name}')
+        event_type = EVENTS_MAP.get(method_name)
+        if event_type is None or (event_type.name not in self.events_matrix and event_type.name not in self.coalescer):
+            self.skipped_callbacks += 1
+            raise EventDiscarded(f'No method registered for {method_name}')
 
-        return event
+        return EventData(*loads(msg))
 
     def synchronize_players(self):
-        for player in self.rpc.get_player_list(self.server.max_players.current_value):
-            self.add_player(login=player.login)
+        self.add_players([player.login for player in self.rpc.get_player_list(self.server.max_players.current_value)])
 
     def start_listening(self):
         logger.info('Waiting for events...')
+        self.transport.attach(self.loop)
+        self.loop.add_idle_callback(self._handle_pending_events)
+        self.schedule_periodic(self.config.event_tick, self.coalescer.flush)
+        self.schedule_periodic(self.config.event_tick, self.chat.flush)
+        if self.config.event_workers and self.config.dispatcher_stats_interval:
+            self.schedule_periodic(self.config.dispatcher_stats_interval, self.dispatcher.log_stats)
+        if self.config.slow_handler_threshold > 0:
+            self.profiler.start_watchdog()
+        self._handle_pending_events()
+        self.loop.run_forever()
+
+    def _handle_pending_events(self):
+        """Handles the events buffered during RPC calls and the ones already received, oldest first."""
         while True:
             if self.events_queue.qsize():
-                logger.debug(
-                    f'Handling buffered {self.events_queue.qsize()} event(s)')
+                logger.debug(f'Handling buffered {self.events_queue.qsize()} event(s)')
                 while self.events_queue.qsize():
                     self.handle_event(self.events_queue.get())
-            self.handle_event(self.transport.get_any_message())
+            msg = self.transport.poll_message()
+            if msg is None:
+                break
+            self.handle_event(msg)
+        if self.journal:
+            self.journal.flush()
+
+    def replay(self, path: str, realtime: bool = False) -> int:
+        """Feeds the callbacks of an events journal through handle_event, with the delays they were recorded with
+        or as fast as possible. Batch listeners get their events every event_tick of the recorded time."""
+        logger.info(f'Replaying events journal {path}')
+        replay_start = time.monotonic()
+        first_timestamp = last_tick = None
+        replayed = 0
+        for timestamp, frame in read_journal(path):
+            if first_timestamp is None:
+                first_timestamp = last_tick = timestamp
+            if realtime:
+                delay = (timestamp - first_timestamp) - (time.monotonic() - replay_start)
+                if delay > 0:
+                    time.sleep(delay)
+            if timestamp - last_tick >= self.config.event_tick:
+                self.coalescer.flush()
+                last_tick = timestamp
+            try:
+                self.handle_event(frame)
+            except Exception:
+                logger.error(f'Replaying event failed:\n{traceback.format_exc()}')
+            replayed += 1
+        self.coalescer.flush()
+        self.dispatcher.join()
+        logger.info(f'Replayed {replayed} event(s) in {time.monotonic() - replay_start:.2f} s')
+        return replayed
+
+    def schedule(self, delay: float, callback, *args) -> Timer:
+        """Runs callback(*args) once after `delay` seconds on the main loop."""
+        return self.loop.call_later(delay, callback, *args)
+
+    def schedule_periodic(self, interval: float, callback, *args) -> Timer:
+        """Runs callback(*args) every `interval` seconds on the main loop until the returned timer is cancelled."""
+        return self.loop.call_every(interval, callback, *args)
 
     def connect(self):
         self.transport.connect()
@@ -77,7 +153,25 @@ class Pyseco:
                 logger.info(f'Server is not ready: {status.name}')
 
     def disconnect(self):
+        if self._disconnected:
+            return
+        self._disconnected = True
+        self.loop.stop()
+        self.dispatcher.log_stats()
+        self.dispatcher.shutdown()
+        self.profiler.stop_watchdog()
+        if self.config.profiler_dump:
+            self.profiler.dump(self.config.profiler_dump)
+        if self.mysql:
+            self.mysql.close()
+        try:
+            self.chat.flush(use_budget=False)
+        except Exception as ex:
+            logger.warning(f'Chat messages queued at exit not sent: {ex}')
         self.transport.disconnect()
+        if self.journal:
+            self.journal.close()
+        self.loop.close()
 
     def register_listener(self, class_name, listener_name):
         class_name(listener_name, self)
@@ -92,12 +186,32 @@ class Pyseco:
             f'Registering {listener_method.__name__} for event {event}')
         self.events_matrix[event].add(listener_method)
 
+    def register_batch(self, event, listener_method):
+        """Registers a listener called once per tick with the list of all `event`s received since the last one."""
+        if not is_bound(listener_method):
+            logger.error(
+                f'This is not a bound method "{listener_method.__name__}"')
+            return
+
+        logger.debug(
+            f'Registering {listener_method.__name__} for batches of event {event}')
+        self.coalescer.register(event, listener_method)
+
+    def register_command(self, name, handler):
+        """Registers a chat command, `*name param...` calls handler(caller login, *params)."""
+        self.commands.register(name, handler)
+
+    def register_controller(self, controller):
+        """Registers every public method of the controller as a chat command."""
+        self.commands.register_controller(controller)
+
     def run(self):
         try:
             self.connect()
             self.rpc.authenticate(self.config.rcp_login,
                                   self.config.rcp_password)
             self.server_message('pyseco connected')
+            self.chat.flush()
             self.rpc.enable_callbacks(True)
             self.server.synchronize()
             self.synchronize_players()
@@ -108,11 +222,52 @@ class Pyseco:
             logger.error(traceback.format_exc())
             raise
         finally:
-            self.transport.disconnect()
+            self.disconnect()
 
     def add_player(self, login: str, is_spectator: bool = False):
-        self.players[login] = Player(self.rpc.get_detailed_player_info(login),
-                                     self.rpc.get_current_ranking_for_login(login)[0])
+        with self.rpc.batch() as batch:
+            player_info = batch.get_detailed_player_info(login)
+            player_ranking = batch.get_current_ranking_for_login(login)
+        self.players[login] = Player(player_info.result(), player_ranking.result()[0])
+
+    def add_players(self, logins: List[str]):
+        """Adds many players with one chunked multicall for their details and one ranking request for all."""
+        if not logins:
+            return
+        multicall = self.rpc.getMulticallRpc()
+        for login in logins:
+            multicall.get_detailed_player_info(login)
+        detailed_infos = multicall.exec_multicall(*[DetailedPlayerInfo] * len(logins))
+
+        present = dict()
+        for login, player_info in zip(logins, detailed_infos):
+            if isinstance(player_info, Fault):
+                logger.warning(f'Cannot add player "{login}": {player_info.faultString}')
+                continue
+            present[login] = player_info
+        rankings = self._get_rankings(list(present))
+
+        players = {login: Player(player_info, rankings.get(login, PlayerRanking(login=login)))
+                   for login, player_info in present.items()}
+        self.players.update(players)
+        logger.debug(f'{len(players)} player(s) added')
+
+    def _get_rankings(self, logins: List[str]):
+        """Rankings by login with one request. The server faults the whole request if one login has left in the
+        meantime, then they are asked one by one and the missing ones are left out."""
+        if not logins:
+            return dict()
+        rankings = self.rpc.get_current_ranking_for_login(','.join(logins))
+        if isinstance(rankings, list):
+            return {ranking.login: ranking for ranking in rankings}
+
+        logger.debug(f'Ranking of {len(logins)} player(s) failed, asking for them one by one')
+        rankings = dict()
+        for login in logins:
+            ranking = self.rpc.get_current_ranking_for_login(login)
+            if isinstance(ranking, list) and ranking:
+                rankings[login] = ranking[0]
+        return rankings
 
     def remove_player(self, login: str):
         if login in self.players:
@@ -129,22 +284,19 @@ class Pyseco:
         return login in self.players
 
     def server_message(self, msg):
-        self.rpc.chat_send_server_message(
-            f'{self.config.color}{self.config.prefix}~ $888{msg}')
+        self.chat.send(f'{self.config.color}{self.config.prefix}~ $888{msg}')
 
     def server_message_to_login(self, login, msg):
-        self.rpc.chat_send_server_message_to_login(
-            f'{self.config.color}{self.config.prefix}~ $888{msg}', login)
+        self.chat.send(f'{self.config.color}{self.config.prefix}~ $888{msg}', login)
 
     def handle_event(self, event):
         try:
             event = self._prepare_event(event)
             logger.debug(f'{event.name} Data: {event.data}')
-            for listener_method in self.events_matrix[event.name]:
-                if event.data:
-                    listener_method(event.data)
-                else:
-                    listener_method()
+            self.coalescer.add(event)
+            listeners = self.events_matrix.get(event.name)
+            if listeners:
+                self.dispatcher.dispatch(event, listeners)
 
         except PysecoException as ex:
             logger.debug(f'Event dropped. {ex}')
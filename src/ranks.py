@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class RankEngine:
+    """Server ranks like XAseco's rs_rank: the average of a player's local record ranks over all challenges, a
+    challenge without a record of the player counting as `max_records`. Only players with at least `min_records`
+    records are ranked. Rank sums and record counts are kept in NumPy arrays indexed by player, so a rebuild is a
+    couple of vectorized passes and a changed challenge ranking only updates the players on it. Averages are
+    stored like XAseco does, multiplied by 10000."""
+
+    def __init__(self, max_records: int = 50, min_records: int = 3):
+        self.max_records = max_records
+        self.min_records = min_records
+        self._reset()
+
+    def _reset(self):
+        self._index: Dict[str, int] = dict()
+        self._logins: List[str] = []
+        self._sums = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int32)
+        self._challenges: Dict[str, List[str]] = dict()
+        self._positions = None
+        self._changed = set()
+        self._all_changed = False
+
+    def __len__(self):
+        return int(np.count_nonzero(self._counts[:len(self._logins)] >= self.min_records))
+
+    @property
+    def nb_challenges(self):
+        return len(self._challenges)
+
+    def _player(self, login: str) -> int:
+        index = self._index.get(login)
+        if index is None:
+            index = self._index[login] = len(self._logins)
+            self._logins.append(login)
+            if index == len(self._sums):
+                size = max(2 * len(self._sums), 1024)
+                self._sums = np.resize(self._sums, size)
+                self._counts = np.resize(self._counts, size)
+                self._sums[index:] = 0
+                self._counts[index:] = 0
+        return index
+
+    def build(self, records):
+        """Rebuilds everything from (challenge uid, login) records sorted by challenge, then best first. The
+        stored ranks are taken as matching them, nothing is marked changed."""
+        self._reset()
+        players, ranks = [], []
+        current, rank = None, 0
+        for challenge_uid, login in records:
+            if challenge_uid != current:
+                current, rank = challenge_uid, 0
+                self._challenges[challenge_uid] = []
+            rank += 1
+            if rank <= self.max_records:
+                self._challenges[challenge_uid].append(login)
+                players.append(self._player(login))
+                ranks.append(rank)
+
+        players = np.array(players, dtype=np.int64)
+        self._sums[:len(self._logins)] = np.bincount(players, weights=ranks, minlength=len(self._logins))
+        self._counts[:len(self._logins)] = np.bincount(players, minlength=len(self._logins))
+
+    def _averages(self) -> np.ndarray:
+        count = len(self._logins)
+        nb_challenges = max(self.nb_challenges, 1)
+        return (self._sums[:count] + (nb_challenges - self._counts[:count]) * self.max_records) / nb_challenges
+
+    def set_ranking(self, challenge_uid: str, logins: List[str]):
+        """Updates the sums with the new record ranking of one challenge, logins best first."""
+        if challenge_uid not in self._challenges:
+            self._all_changed = True
+        old_ranks = {login: rank for rank, login in enumerate(self._challenges.get(challenge_uid, []), 1)}
+        new_logins = logins[:self.max_records]
+        self._challenges[challenge_uid] = list(new_logins)
+        new_ranks = {login: rank for rank, login in enumerate(new_logins, 1)}
+
+        for login in old_ranks.keys() | new_ranks.keys():
+            old_rank, new_rank = old_ranks.get(login), new_ranks.get(login)
+            if old_rank == new_rank:
+                continue
+            index = self._player(login)
+            self._sums[index] += (new_rank or 0) - (old_rank or 0)
+            self._counts[index] += (new_rank is not None) - (old_rank is not None)
+            self._changed.add(index)
+        self._positions = None
+
+    def average(self, login: str) -> Optional[float]:
+        index = self._index.get(login)
+        if index is None or self._counts[index] < self.min_records:
+            return None
+        nb_challenges = max(self.nb_challenges, 1)
+        return (self._sums[index] + (nb_challenges - self._counts[index]) * self.max_records) / nb_challenges
+
+    def rank_of(self, login: str) -> Optional[int]:
+        """Position of the login among the ranked players, the ordering is sorted again after changes only."""
+        index = self._index.get(login)
+        if index is None or self._counts[index] < self.min_records:
+            return None
+        if self._positions is None:
+            averages = self._averages()
+            averages[self._counts[:len(self._logins)] < self.min_records] = np.inf
+            self._positions = np.empty(len(averages), dtype=np.int64)
+            self._positions[np.argsort(averages, kind='stable')] = np.arange(1, len(averages) + 1)
+        return int(self._positions[index])
+
+    def take_changed(self) -> List[Tuple[str, Optional[int]]]:
+        """(login, average * 10000) of the ranked players whose average changed since the previous call, after the
+        first record on a new challenge all of them. (login, None) for a player which lost its rank."""
+        everybody = self._all_changed
+        if everybody:
+            changed = np.arange(len(self._logins))
+        else:
+            changed = np.fromiter(self._changed, dtype=np.int64, count=len(self._changed))
+        self._changed, self._all_changed = set(), False
+        ranked = self._counts[changed] >= self.min_records
+        averages = np.rint(self._averages()[changed[ranked]] * 10000).astype(np.int64)
+        rows = [(self._logins[index], average) for index, average in zip(changed[ranked].tolist(), averages.tolist())]
+        if not everybody:
+            rows.extend((self._logins[index], None) for index in changed[~ranked].tolist())
+        return rows
@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+
+class LocalRecords:
+    """Best time of each login on one challenge, top `max_records` only, sorted by time then by the order they
+    were driven. Ranks are found by bisection; the logins which improved since the last `take_changed()` are
+    remembered for saving."""
+
+    def __init__(self, challenge_uid: str, max_records: int = 50):
+        self.challenge_uid = challenge_uid
+        self.max_records = max_records
+        self._sorted = []
+        self._by_login: Dict[str, Tuple[int, int]] = dict()
+        self._changed = set()
+        self._order = 0
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def __contains__(self, login):
+        return login in self._by_login
+
+    def _next_order(self):
+        self._order += 1
+        return self._order
+
+    def load(self, records):
+        """Fills the cache with (login, time) already sorted best first, like the database returns them."""
+        self._sorted = []
+        self._by_login = dict()
+        self._changed = set()
+        for login, time in records[:self.max_records]:
+            key = (time, self._next_order())
+            self._sorted.append((key, login))
+            self._by_login[login] = key
+        self._sorted.sort()
+
+    def time_of(self, login) -> Optional[int]:
+        key = self._by_login.get(login)
+        return key[0] if key else None
+
+    def rank_of(self, login) -> Optional[int]:
+        key = self._by_login.get(login)
+        return bisect_left(self._sorted, (key, login)) + 1 if key else None
+
+    def records(self) -> List[Tuple[str, int]]:
+        return [(login, key[0]) for key, login in self._sorted]
+
+    def finish(self, login: str, time: int) -> Optional[int]:
+        """Returns the new rank of the login if the time is a new or improved record, None otherwise."""
+        if time <= 0:
+            return None
+        previous = self._by_login.get(login)
+        if previous and previous[0] <= time:
+            return None
+        key = (time, self._next_order())
+        if len(self._sorted) >= self.max_records and not previous and (key, login) > self._sorted[-1]:
+            return None
+
+        if previous:
+            del self._sorted[bisect_left(self._sorted, (previous, login))]
+        insort(self._sorted, (key, login))
+        self._by_login[login] = key
+        self._changed.add(login)
+        if len(self._sorted) > self.max_records:
+            _, dropped = self._sorted.pop()
+            del self._by_login[dropped]
+            self._changed.discard(dropped)
+        return self.rank_of(login)
+
+    def take_changed(self) -> List[Tuple[str, int]]:
+        """(login, time) of the records improved since the previous call."""
+        changed, self._changed = self._changed, set()
+        return [(login, self._by_login[login][0]) for login in changed if login in self._by_login]
@@ -0,0 +1,5 @@
+from src.simulator.callbacks import RandomCallbacks, scripted_callbacks, challenge_change
+from src.simulator.fixtures import ServerState, to_struct
+from src.simulator.server import SimulatedServer
+
+__all__ = ['RandomCallbacks', 'scripted_callbacks', 'challenge_change', 'ServerState', 'to_struct', 'SimulatedServer']
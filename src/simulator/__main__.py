@@ -0,0 +1,38 @@
+import argparse
+import logging
+import time
+
+from src.includes.log import setup_logger
+from src.simulator import RandomCallbacks, ServerState, SimulatedServer
+
+parser = argparse.ArgumentParser(description='Simulated TrackMania dedicated server for load tests')
+parser.add_argument('--host', default='127.0.0.1', type=str, help='Address to listen on')
+parser.add_argument('-p', '--port', default=5000, type=int, help='XML-RPC port to listen on')
+parser.add_argument('--players', default=32, type=int, help='Players on the server at start')
+parser.add_argument('--challenges', default=20, type=int, help='Challenges in the challenge list')
+parser.add_argument('--server-login', default='simulated_server', type=str, help='Login of the server account')
+parser.add_argument('-r', '--rate', default=100.0, type=float, help='Callbacks per second, 0 for no delay')
+parser.add_argument('-c', '--count', default=None, type=int, help='Callbacks to send, endless by default')
+parser.add_argument('--weights', default='', type=str,
+                    help='Callback kinds weights, e.g. "checkpoint=50,chat=3,join=1,leave=1,next_challenge=0"')
+parser.add_argument('--seed', default=None, type=int, help='Seed of the fixtures and callbacks randomness')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+    logger = setup_logger(__name__)
+
+    weights = {kind: float(weight) for kind, weight in (item.split('=') for item in args.weights.split(',') if item)}
+    state = ServerState(args.challenges, args.server_login, args.seed)
+    for _ in range(args.players):
+        state.add_player()
+    server = SimulatedServer(state, RandomCallbacks(args.rate, weights, args.count), args.host, args.port)
+    host, port = server.start()
+    logger.info(f'Simulated server with {args.players} player(s) listening on {host}:{port}')
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f'{server.callbacks_sent} callback(s) sent, {sum(server.calls.values())} call(s) answered, '
+                        f'{len(state.players)} player(s)')
+    except KeyboardInterrupt:
+        server.stop()
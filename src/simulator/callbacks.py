@@ -0,0 +1,85 @@
+from src.simulator.fixtures import ServerState, to_struct
+
+CHAT_LINES = ['gg', 'nice run', 'lol', 'wr incoming', 'brb', 'who made this track?', '/hi all', 'gz']
+
+DEFAULT_WEIGHTS = {
+    'join': 1,
+    'leave': 1,
+    'checkpoint': 50,
+    'chat': 3,
+    'next_challenge': 0,
+}
+
+
+def challenge_change(state: ServerState):
+    """Callbacks of a challenge change, as (method, params), the state is moved to the next challenge."""
+    rankings = to_struct(state.ranking())
+    challenge = to_struct(state.current_challenge)
+    state.change_challenge()
+    next_challenge = to_struct(state.current_challenge)
+    return [
+        ('TrackMania.EndRace', (rankings, challenge)),
+        ('TrackMania.EndChallenge', (rankings, challenge, False, False, False)),
+        ('TrackMania.BeginChallenge', (next_challenge, False, False)),
+        ('TrackMania.BeginRace', (next_challenge,)),
+    ]
+
+
+def scripted_callbacks(script):
+    """Callbacks from a list of (delay, method, params), for callbacks(state) of the simulator."""
+    return lambda state: iter(script)
+
+
+class RandomCallbacks:
+    """Endless (or `count` long) stream of (delay, method, params) callbacks, `rate` of them per second, picked
+    at random with the given weights: players joining and leaving, driving through checkpoints up to the finish,
+    chatting, and challenge changes. Used as callbacks(state) of the simulator."""
+
+    def __init__(self, rate: float = 100.0, weights: dict = None, count: int = None):
+        self.rate = rate
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.count = count
+
+    def __call__(self, state: ServerState):
+        return self._generate(state)
+
+    def _generate(self, state: ServerState):
+        delay = 1 / self.rate if self.rate else 0
+        kinds = [kind for kind, weight in self.weights.items() if weight]
+        weights = [self.weights[kind] for kind in kinds]
+        progress = dict()
+        sent = 0
+        while self.count is None or sent < self.count:
+            for method, params in self._pick(state, state.rng.choices(kinds, weights)[0], progress):
+                yield delay, method, params
+                sent += 1
+                if sent == self.count:
+                    return
+
+    def _pick(self, state: ServerState, kind: str, progress: dict):
+        if not state.players or (kind == 'join' and len(state.players) < state.options.current_max_players):
+            player = state.add_player()
+            return [('TrackMania.PlayerConnect', (player.login, False)),
+                    ('TrackMania.PlayerInfoChanged', (to_struct(state.player_info(player.login)),))]
+
+        login = state.rng.choice(list(state.players))
+        player = state.players[login]
+        if kind == 'leave':
+            state.remove_player(login)
+            progress.pop(login, None)
+            return [('TrackMania.PlayerDisconnect', (login,))]
+        if kind == 'chat':
+            return [('TrackMania.PlayerChat', (player.player_id, login, state.rng.choice(CHAT_LINES), False))]
+        if kind == 'next_challenge':
+            progress.clear()
+            return challenge_change(state)
+
+        checkpoints = progress.setdefault(login, [])
+        checkpoints.append((checkpoints[-1] if checkpoints else 0) + state.rng.randrange(2000, 8000, 10))
+        time = checkpoints[-1]
+        callbacks = [('TrackMania.PlayerCheckpoint', (player.player_id, login, time, 0, len(checkpoints) - 1))]
+        if len(checkpoints) == state.current_challenge.nb_checkpoints:
+            state.finish(login, time, checkpoints)
+            del progress[login]
+            callbacks.append(('TrackMania.PlayerFinish', (player.player_id, login, time)))
+        return callbacks
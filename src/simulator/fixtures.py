@@ -0,0 +1,133 @@
+import random
+import string
+from collections import OrderedDict
+
+from src.api.tm_types import TmType, Version, SystemInfo, ServerOptions, GameInfo, ChallengeInfo, StateValue, \
+    LadderServerLimits, DetailedPlayerInfo, PlayerInfo, PlayerRanking, Avatar, LadderStats, LadderRanking
+
+ENVIRONMENTS = ['Stadium', 'Island', 'Bay', 'Coast', 'Desert', 'Rally', 'Snow']
+MOODS = ['Sunrise', 'Day', 'Sunset', 'Night']
+NICKNAME_STYLES = ['$f00', '$0f0', '$00f', '$fff$o', '$i$aaa', '$s$ff0']
+
+
+def to_struct(value):
+    """Server side representation of a TmType: a dict with the server's member names, in the KEYS order, like
+    the server sends them (the callback types are built from their values by position)."""
+    if isinstance(value, TmType):
+        return {key: to_struct(getattr(value, name)) for key, name in type(value).KEYS.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_struct(item) for item in value]
+    return value
+
+
+def random_uid(rng: random.Random) -> str:
+    return ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(27))
+
+
+def make_challenge(rng: random.Random, index: int) -> ChallengeInfo:
+    author_time = rng.randrange(20000, 90000, 10)
+    name = f'{chr(ord("A") + index // 15 % 26)}{index % 15 + 1:02d}-{rng.choice(["Race", "Acrobatic", "Speed"])}'
+    return ChallengeInfo(uid=random_uid(rng), name=name, filename=f'Challenges/Nadeo/{name}.Challenge.Gbx',
+                         author='Nadeo', environment=rng.choice(ENVIRONMENTS), mood=rng.choice(MOODS),
+                         bronze_time=author_time * 3 // 2, silver_time=author_time * 6 // 5,
+                         gold_time=author_time * 21 // 20, author_time=author_time, copper_price=rng.randrange(500),
+                         lap_race=False, nb_laps=0, nb_checkpoints=rng.randrange(3, 15))
+
+
+class ServerState:
+    """What the simulated server knows: its settings, the challenge list and the connected players."""
+
+    def __init__(self, challenges: int = 20, server_login: str = 'simulated_server', seed: int = None):
+        self.rng = random.Random(seed)
+        self.status = (4, 'Running - Play')
+        self.version = Version(name='TmForever', version='2.11.26', build='2011-02-21_18_36')
+        self.system_info = SystemInfo(published_ip='127.0.0.1', port=2350, p2p_port=3450, server_login=server_login,
+                                      server_player_id=0, connection_download_rate=8192,
+                                      connection_upload_rate=8192)
+        self.options = ServerOptions(name='$fffSimulated $f00server', comment='pyseco load test', hide_server=0,
+                                     current_max_players=255, next_max_players=255, current_max_spectators=32,
+                                     next_max_spectators=32, is_p2p_upload=True, is_p2p_download=False,
+                                     current_ladder_mode=1, next_ladder_mode=1, ladder_server_limit_max=50000,
+                                     ladder_server_limit_min=0, current_callvote_timeout=60000,
+                                     next_callvote_timeout=60000, callvote_ratio=0.5,
+                                     allow_challenge_download=True, autosave_replays=False,
+                                     autosave_validation_replays=False, referee_mode=0,
+                                     current_use_changing_validation_seed=False,
+                                     next_use_changing_validation_seed=False)
+        self.game_info = GameInfo(game_mode=1, chat_time=10000, nb_challenge=challenges, timeattack_limit=300000,
+                                  finish_timeout=1)
+        self.ladder_server_limits = LadderServerLimits(ladder_limit_min=0, ladder_limit_max=50000)
+        self.challenges = [make_challenge(self.rng, index) for index in range(challenges)]
+        self.current_challenge_index = 0
+        self.players = OrderedDict()
+        self.rankings = dict()
+        self.chat_messages = []
+        self._next_player_id = 236
+        self._next_login = 0
+
+    @property
+    def current_challenge(self) -> ChallengeInfo:
+        return self.challenges[self.current_challenge_index]
+
+    @property
+    def next_challenge(self) -> ChallengeInfo:
+        return self.challenges[self.next_challenge_index()]
+
+    def next_login(self) -> str:
+        self._next_login += 1
+        return f'player_{self._next_login:05d}'
+
+    def make_player(self, login: str) -> DetailedPlayerInfo:
+        nickname = f'{self.rng.choice(NICKNAME_STYLES)}{login.capitalize()}'
+        ladder_stats = LadderStats(last_match_score=0, team_name='', player_rankings=[
+            LadderRanking(path='World|Europe|Poland', score=self.rng.uniform(0, 50000),
+                          ranking=self.rng.randrange(1, 600000), total_count=600000)], TeamRankings=[])
+        player = DetailedPlayerInfo(login=login, nickname=nickname, player_id=self._next_player_id, team_id=-1,
+                                    path='World|Europe|Poland', language='en', client_version='2.11.26',
+                                    ip_address=f'10.0.{self._next_player_id // 256}.{self._next_player_id % 256}:2350',
+                                    download_rate=8192, upload_rate=1024, is_spectator=False,
+                                    is_in_official_mode=True, is_referee=False,
+                                    avatar=Avatar(file_name='Skins/Avatars/Default.dds'), ladder_stats=ladder_stats,
+                                    hours_since_zone_inscription=self.rng.randrange(9000), online_rights=3)
+        self._next_player_id += 1
+        return player
+
+    def add_player(self, login: str = None) -> DetailedPlayerInfo:
+        login = login or self.next_login()
+        player = self.players[login] = self.make_player(login)
+        self.rankings[login] = PlayerRanking(login=login, nickname=player.nickname, player_id=player.player_id, rank=0,
+                                             best_time=-1, best_checkpoints=[], score=0, nbr_laps_finished=0,
+                                             ladder_score=0)
+        return player
+
+    def remove_player(self, login: str):
+        self.players.pop(login, None)
+        self.rankings.pop(login, None)
+
+    def player_info(self, login: str) -> PlayerInfo:
+        player = self.players[login]
+        return PlayerInfo(login=login, nickname=player.nickname, player_id=player.player_id, team_id=player.team_id,
+                          spectator_status=0, ladder_ranking=player.ladder_stats.player_rankings[0].ranking, flags=0)
+
+    def finish(self, login: str, time: int, checkpoints):
+        ranking = self.rankings[login]
+        if ranking.best_time < 0 or time < ranking.best_time:
+            ranking.best_time, ranking.best_checkpoints = time, list(checkpoints)
+            finished = sorted((ranking for ranking in self.rankings.values() if ranking.best_time > 0),
+                              key=lambda ranking: ranking.best_time)
+            for rank, ranking in enumerate(finished, 1):
+                ranking.rank = rank
+
+    def ranking(self):
+        return sorted(self.rankings.values(), key=lambda ranking: (ranking.best_time < 0, ranking.best_time))
+
+    def next_challenge_index(self):
+        return (self.current_challenge_index + 1) % len(self.challenges)
+
+    def change_challenge(self, index: int = None):
+        self.current_challenge_index = self.next_challenge_index() if index is None else index
+        for ranking in self.rankings.values():
+            ranking.rank, ranking.best_time, ranking.best_checkpoints = 0, -1, []
+
+    def max_players(self) -> StateValue:
+        return StateValue(current_value=self.options.current_max_players, next_value=self.options.next_max_players)
@@ -0,0 +1,284 @@
+import socket
+import threading
+import time
+from collections import Counter
+from struct import Struct
+from xmlrpc.client import dumps, loads, Fault
+
+from src.includes.log import setup_logger
+from src.simulator.callbacks import challenge_change
+from src.simulator.fixtures import ServerState, to_struct
+
+logger = setup_logger(__name__)
+
+PROTOCOL = b'GBXRemote 2'
+HEADER = Struct('<LL')
+HANDSHAKE_HEADER = Struct('<L')
+
+CHAT_METHODS = {'ChatSendServerMessage', 'ChatSendServerMessageToLogin', 'ChatSendServerMessageToId', 'ChatSend',
+                'ChatSendToLogin', 'ChatSendToId', 'SendNotice', 'SendNoticeToLogin', 'SendNoticeToId'}
+ACCEPTED_PREFIXES = ('Set', 'Send', 'Chat', 'Force', 'Kick', 'Ban', 'UnBan', 'BlackList', 'UnBlackList', 'Add',
+                     'Remove', 'Clean', 'Ignore', 'UnIgnore', 'Save', 'Load', 'Insert', 'Append', 'Choose',
+                     'Restart', 'Manual', 'Tunnel', 'Write', 'Enable', 'Allow', 'Auto', 'Pay')
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed by client')
+        data += chunk
+    return bytes(data)
+
+
+class _Connection:
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.closed = threading.Event()
+        self._send_lock = threading.Lock()
+        self._callback_handle = 0
+        self._callbacks_thread = None
+
+    def send(self, handle: int, xml: str):
+        data = xml.encode('utf-8')
+        with self._send_lock:
+            if handle is None:
+                self._callback_handle = handle = self._callback_handle % 0x7fffffff + 1
+            self.sock.sendall(HEADER.pack(len(data), handle) + data)
+
+    def send_callback(self, method: str, params: tuple):
+        self.send(None, dumps(params, method))
+
+    def start_callbacks(self):
+        if self.server.callbacks and self._callbacks_thread is None:
+            self._callbacks_thread = threading.Thread(target=self._stream_callbacks, name='simulator-callbacks',
+                                                      daemon=True)
+            self._callbacks_thread.start()
+
+    def _stream_callbacks(self):
+        with self.server.state_lock:
+            callbacks = iter(self.server.callbacks(self.server.state))
+        due = time.perf_counter()
+        try:
+            while not self.closed.is_set():
+                with self.server.state_lock:
+                    item = next(callbacks, None)
+                if item is None:
+                    return
+                delay, method, params = item
+                due += delay
+                if due > time.perf_counter():
+                    self.closed.wait(due - time.perf_counter())
+                self.send_callback(method, params)
+                self.server.callbacks_sent += 1
+        except OSError:
+            pass
+
+    def serve(self):
+        try:
+            self.sock.sendall(HANDSHAKE_HEADER.pack(len(PROTOCOL)) + PROTOCOL)
+            while True:
+                size, handle = HEADER.unpack(_recv_exactly(self.sock, HEADER.size))
+                params, method = loads(_recv_exactly(self.sock, size))
+                self.send(handle, self.server.respond(self, method, params))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            self.closed.set()
+            self.sock.close()
+
+
+class SimulatedServer:
+    """Stand-in for a TrackMania Forever dedicated server. It speaks GBXRemote 2 on a local port, answers the
+    methods pyseco uses with the fixtures of its ServerState, accepts the setters and chat methods, and once a
+    client enables callbacks streams the ones of `callbacks(state)`, e.g. RandomCallbacks or scripted_callbacks.
+    Other methods can be answered with `handle(method_name, handler)`, handler(*params) returning the result."""
+
+    def __init__(self, state: ServerState = None, callbacks=None, host: str = '127.0.0.1', port: int = 0):
+        self.state = state or ServerState()
+        self.state_lock = threading.RLock()
+        self.callbacks = callbacks
+        self.calls = Counter()
+        self.callbacks_sent = 0
+        self._handlers = dict()
+        self._listener = socket.create_server((host, port))
+        self._connections = []
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._listener.getsockname()[:2]
+
+    def handle(self, method_name: str, handler):
+        self._handlers[method_name] = handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='simulator', daemon=True)
+        self._thread.start()
+        return self.address
+
+    def serve_forever(self):
+        logger.info(f'Simulated server listening on {self.address[0]}:{self.address[1]}')
+        try:
+            while True:
+                sock, address = self._listener.accept()
+                logger.debug(f'Client connected from {address}')
+                connection = _Connection(self, sock)
+                self._connections.append(connection)
+                threading.Thread(target=connection.serve, name='simulator-client', daemon=True).start()
+        except OSError:
+            pass
+
+    def stop(self):
+        try:
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        for connection in self._connections:
+            connection.closed.set()
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def respond(self, connection, method: str, params: tuple) -> str:
+        if method == 'system.multicall':
+            with self.state_lock:
+                self.calls[method] += 1
+            results = []
+            for call in params[0]:
+                try:
+                    results.append([self.call(connection, call['methodName'], call['params'])])
+                except Fault as fault:
+                    results.append({'faultCode': fault.faultCode, 'faultString': fault.faultString})
+            return dumps((results,), methodresponse=True)
+        try:
+            return dumps((self.call(connection, method, params),), methodresponse=True, allow_none=True)
+        except Fault as fault:
+            return dumps(fault, methodresponse=True)
+
+    def call(self, connection, method: str, params):
+        with self.state_lock:
+            self.calls[method] += 1
+            try:
+                if method in self._handlers:
+                    return self._handlers[method](*params)
+                handler = getattr(self, f'rpc_{method}', None)
+                if handler:
+                    return handler(connection, *params)
+            except TypeError as ex:
+                raise Fault(-1000, f'Wrong parameters for {method}: {ex}')
+            if method in CHAT_METHODS:
+                self.state.chat_messages.append((method, tuple(params)))
+                return True
+            if method.startswith(ACCEPTED_PREFIXES):
+                return True
+        raise Fault(-1000, f'Method "{method}" not simulated')
+
+    def rpc_Authenticate(self, connection, login, password):
+        return True
+
+    def rpc_EnableCallbacks(self, connection, enable):
+        if enable:
+            connection.start_callbacks()
+        return True
+
+    def rpc_Echo(self, connection, internal, public):
+        connection.send_callback('TrackMania.Echo', (internal, public))
+        return True
+
+    def rpc_GetStatus(self, connection):
+        return {'Code': self.state.status[0], 'Name': self.state.status[1]}
+
+    def rpc_GetVersion(self, connection):
+        return to_struct(self.state.version)
+
+    def rpc_GetSystemInfo(self, connection):
+        return to_struct(self.state.system_info)
+
+    def rpc_GetServerOptions(self, connection, *params):
+        return to_struct(self.state.options)
+
+    def rpc_GetServerName(self, connection):
+        return self.state.options.name
+
+    def rpc_GetMaxPlayers(self, connection):
+        return to_struct(self.state.max_players())
+
+    def rpc_GetLadderServerLimits(self, connection):
+        return to_struct(self.state.ladder_server_limits)
+
+    def rpc_IsRelayServer(self, connection):
+        return False
+
+    def rpc_GetCurrentGameInfo(self, connection, *params):
+        return to_struct(self.state.game_info)
+
+    def rpc_GetNextGameInfo(self, connection, *params):
+        return to_struct(self.state.game_info)
+
+    def rpc_GetGameInfos(self, connection, *params):
+        return {'CurrentGameInfos': to_struct(self.state.game_info), 'NextGameInfos': to_struct(self.state.game_info)}
+
+    def rpc_GetCurrentChallengeIndex(self, connection):
+        return self.state.current_challenge_index
+
+    def rpc_GetNextChallengeIndex(self, connection):
+        return self.state.next_challenge_index()
+
+    def rpc_GetCurrentChallengeInfo(self, connection):
+        return to_struct(self.state.current_challenge)
+
+    def rpc_GetNextChallengeInfo(self, connection):
+        return to_struct(self.state.next_challenge)
+
+    def rpc_GetChallengeInfo(self, connection, filename):
+        for challenge in self.state.challenges:
+            if challenge.filename == filename:
+                return to_struct(challenge)
+        raise Fault(-1000, 'Challenge not found.')
+
+    def rpc_GetChallengeList(self, connection, max_infos, start):
+        return to_struct(self.state.challenges[start:start + max_infos])
+
+    def rpc_NextChallenge(self, connection, *params):
+        for method, callback_params in challenge_change(self.state):
+            connection.send_callback(method, callback_params)
+        return True
+
+    def rpc_GetPlayerList(self, connection, max_infos, start, *params):
+        logins = list(self.state.players)[start:start + max_infos]
+        return to_struct([self.state.player_info(login) for login in logins])
+
+    def rpc_GetPlayerInfo(self, connection, login, *params):
+        if login not in self.state.players:
+            raise Fault(-1000, 'Login unknown.')
+        return to_struct(self.state.player_info(login))
+
+    def rpc_GetDetailedPlayerInfo(self, connection, login):
+        if login == self.state.system_info.server_login:
+            return to_struct(self.state.make_player(login))
+        if login not in self.state.players:
+            raise Fault(-1000, 'Login unknown.')
+        return to_struct(self.state.players[login])
+
+    def rpc_GetCurrentRanking(self, connection, max_infos, start):
+        return to_struct(self.state.ranking()[start:start + max_infos])
+
+    def rpc_GetCurrentRankingForLogin(self, connection, logins):
+        rankings = [self.state.rankings.get(login) for login in logins.split(',')]
+        if not all(rankings):
+            raise Fault(-1000, 'Login unknown.')
+        return to_struct(rankings)
@@ -1,11 +1,101 @@
+import asyncio
 import socket
+import threading
 from multiprocessing.queues import Queue
-from struct import unpack, pack
+from queue import Full
+from struct import unpack, pack, Struct
 from src.includes.log import setup_logger
 
 logger = setup_logger(__name__)
 
 
+def pack_message(msg, request_num):
+    encoded_message = msg.encode('utf-8')
+    preamble = pack('<LL', len(encoded_message), request_num)
+    return b''.join([preamble, encoded_message])
+
+
+def queue_event(events_queue, journal, msg, block=True):
+    """Journals a callback as it is read, then queues it. Without `block` a callback arriving at a full queue
+    is handled by the queue policy without waiting, or dropped by a queue which has none."""
+    msg = bytes(msg)
+    if journal:
+        journal.write(msg)
+    if block:
+        events_queue.put(msg)
+        return
+    try:
+        events_queue.put_nowait(msg)
+    except Full:
+        logger.warning('Events queue full, callback dropped')
+
+
+class FrameDecoder:
+    """Reassembles GBXRemote frames in one preallocated buffer. The socket is read with recv_into as much as it
+    has, so a header, its payload and the frames after it usually come with a single syscall, and short reads
+    of the header are just another partial frame. Complete frames are handed out as memoryview slices of the
+    buffer, they stay valid until the next read."""
+    HEADER = Struct('<LL')
+    HANDSHAKE_HEADER = Struct('<L')
+
+    def __init__(self, buffer_size=64 * 1024):
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _wanted(self, header):
+        if len(self) < header.size:
+            return header.size
+        return header.size + header.unpack_from(self._buffer, self._start)[0]
+
+    def _make_room(self, wanted):
+        if self._start + wanted <= len(self._buffer):
+            return
+        pending = len(self)
+        if wanted < len(self._buffer):
+            self._view[:pending] = self._view[self._start:self._end]
+        else:
+            logger.debug(f'growing frame buffer to {wanted} byte(s)')
+            buffer = bytearray(wanted + len(self._buffer))
+            buffer[:pending] = self._view[self._start:self._end]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        self._start, self._end = 0, pending
+
+    def _take(self, header):
+        if len(self) < header.size:
+            return None
+        size, *info = header.unpack_from(self._buffer, self._start)
+        frame_start = self._start + header.size
+        frame_end = frame_start + size
+        if frame_end > self._end:
+            return None
+        if frame_end == self._end:
+            self._start = self._end = 0
+        else:
+            self._start = frame_end
+        return (*info, self._view[frame_start:frame_end])
+
+    def read_from(self, sock, header=HEADER):
+        self._make_room(self._wanted(header))
+        bytes_received = sock.recv_into(self._view[self._end:])
+        if not bytes_received:
+            raise ConnectionError('Connection closed by server')
+        self._end += bytes_received
+
+    def next_frame(self):
+        """Returns (request_number, payload) of the next complete frame, None if it has not been received yet."""
+        return self._take(self.HEADER)
+
+    def next_handshake(self):
+        frame = self._take(self.HANDSHAKE_HEADER)
+        return frame[0] if frame else None
+
+
 class Transport:
     def __init__(self, ip, port, events_queue: Queue):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -13,42 +103,54 @@ class Transport:
         self.port = port
         self.request_num = 0x80000000
         self.events_queue = events_queue
+        self.decoder = FrameDecoder()
+        self.journal = None
+        self._responses = dict()
+        self._discarded = set()
+
+    def _queue_event(self, msg):
+        queue_event(self.events_queue, self.journal, msg)
 
     def _read_response(self, expected_request_number):
+        if expected_request_number in self._responses:
+            return self._responses.pop(expected_request_number)
         while True:
-            size, request_number = self._read_message_info()
-            msg = self._receive(size)
+            request_number, msg = self._read_frame()
 
             if not expected_request_number or request_number == expected_request_number:
                 return msg
+            elif request_number in self._discarded:
+                logger.debug(f'Drop response {request_number:#x} of a discarded request')
+                self._discarded.remove(request_number)
+            elif request_number & 0x80000000:
+                logger.debug(f'Stash response {request_number:#x} of a pipelined request')
+                self._responses[request_number] = bytes(msg)
             else:
                 logger.debug(f'Queue event, current size = {self.events_queue.qsize()}')
-                self.events_queue.put(msg)
+                self._queue_event(msg)
 
-    def _read_init_resp_size(self):
-        return unpack('<L', self.sock.recv(4))[0]
+    def _read_frame(self):
+        frame = self.decoder.next_frame()
+        while frame is None:
+            self.decoder.read_from(self.sock)
+            frame = self.decoder.next_frame()
+        return frame
 
-    def _read_message_info(self):
-        return unpack('<LL', self.sock.recv(8))
+    def _read_handshake(self):
+        protocol_version = self.decoder.next_handshake()
+        while protocol_version is None:
+            self.decoder.read_from(self.sock, FrameDecoder.HANDSHAKE_HEADER)
+            protocol_version = self.decoder.next_handshake()
+        return str(protocol_version, 'utf-8')
 
     def _pack_message(self, msg):
-        encoded_message = msg.encode('utf-8')
-        preamble = pack('<LL', len(encoded_message), self.request_num)
-        return b''.join([preamble, encoded_message])
-
-    def _receive(self, size):
-        bytes_received = bytearray()
-        while len(bytes_received) < size:
-            bytes_received.extend(self.sock.recv(size - len(bytes_received)))
-            if len(bytes_received) < size:
-                bytes_left = size - len(bytes_received)
-                logger.debug(f'waiting for next {bytes_left} byte(s)')
-        return bytes_received.decode('utf-8')
+        return pack_message(msg, self.request_num)
 
     def send_request(self, request):
         try:
             self.request_num += 1
             self.sock.sendall(self._pack_message(request))
+            return self.request_num
         except BrokenPipeError:
             self.request_num -= 1
             raise
@@ -59,12 +161,228 @@ class Transport:
     def get_any_message(self):
         return self._read_response(None)
 
-    def get_response(self):
-        return self._read_response(self.request_num)
+    def receive(self):
+        """Reads once what the socket has, for loops which wait for the socket to be readable themselves."""
+        self.decoder.read_from(self.sock)
+
+    def poll_message(self):
+        """Returns the next message already received, None when there is no complete one. Like all messages
+        it is a view of the receive buffer, valid until the next read."""
+        frame = self.decoder.next_frame()
+        if frame is None:
+            return None
+        if self.journal:
+            self.journal.write(frame[1])
+        return frame[1]
+
+    def attach(self, loop):
+        loop.add_reader(self.sock, self.receive)
+
+    def get_response(self, request_num=None):
+        """Waits for the response to the given request, the last one sent by default. Responses to other
+        requests received meanwhile are kept until asked for, so several requests can be sent before reading."""
+        return self._read_response(request_num or self.request_num)
+
+    def discard_response(self, request_num):
+        """Forgets a request whose response nobody will ask for, the response is dropped when it comes."""
+        if self._responses.pop(request_num, None) is None:
+            self._discarded.add(request_num)
 
     def connect(self):
         logger.debug('connecting')
         self.sock.connect((self.ip, self.port))
-        data_length = self._read_init_resp_size()
-        protocol_version = self._receive(data_length)
+        protocol_version = self._read_handshake()
+        logger.info(f'Connected, protocol used: {protocol_version}')
+
+
+class _Waiter:
+    def __init__(self):
+        self._event = threading.Event()
+        self._response = None
+        self._exception = None
+
+    def set_response(self, response):
+        self._response = response
+        self._event.set()
+
+    def set_exception(self, exception):
+        if not self._event.is_set():
+            self._exception = exception
+            self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        if self._exception:
+            raise self._exception
+        return self._response
+
+
+class ThreadedTransport(Transport):
+    """Transport which can be used from many threads at once. Sends are serialized by a lock and a single reader
+    thread owns the receiving side: it hands every response to the waiter of its request handle and puts the
+    callbacks into the events queue, then calls on_event (e.g. to wake up the main loop)."""
+
+    def __init__(self, ip, port, events_queue: Queue):
+        super().__init__(ip, port, events_queue)
+        self.on_event = None
+        self._send_lock = threading.Lock()
+        self._waiters = dict()
+        self._waiters_lock = threading.Lock()
+        self._reader_thread = None
+        self._connection_error = None
+        self._closing = False
+
+    def _read_loop(self):
+        try:
+            while True:
+                request_number, msg = self._read_frame()
+                if request_number & 0x80000000:
+                    with self._waiters_lock:
+                        waiter = self._waiters.get(request_number)
+                    if waiter:
+                        waiter.set_response(bytes(msg))
+                    else:
+                        logger.warning(f'Dropping response {request_number:#x} nobody waits for')
+                    continue
+                self._queue_event(msg)
+                if self.on_event:
+                    self.on_event()
+        except OSError as ex:
+            if self._closing:
+                logger.debug('Reader stopped, disconnected')
+            else:
+                logger.error(f'Connection lost: {ex!r}')
+            with self._waiters_lock:
+                self._connection_error = ConnectionError('Disconnected' if self._closing else 'Connection lost')
+                waiters = list(self._waiters.values())
+            for waiter in waiters:
+                waiter.set_exception(self._connection_error)
+
+    def send_request(self, request):
+        with self._send_lock:
+            self.request_num += 1
+            with self._waiters_lock:
+                if self._connection_error:
+                    raise self._connection_error
+                self._waiters[self.request_num] = _Waiter()
+            try:
+                self.sock.sendall(self._pack_message(request))
+            except OSError:
+                with self._waiters_lock:
+                    del self._waiters[self.request_num]
+                raise
+            return self.request_num
+
+    def get_response(self, request_num=None):
+        request_num = request_num or self.request_num
+        with self._waiters_lock:
+            waiter = self._waiters.get(request_num)
+        if waiter is None:
+            raise KeyError(f'No request {request_num:#x} waiting for response')
+        try:
+            return waiter.wait()
+        finally:
+            with self._waiters_lock:
+                self._waiters.pop(request_num, None)
+
+    def discard_response(self, request_num):
+        with self._waiters_lock:
+            self._waiters.pop(request_num, None)
+
+    def get_any_message(self):
+        return self.events_queue.get()
+
+    def receive(self):
+        pass
+
+    def poll_message(self):
+        return None
+
+    def attach(self, loop):
+        self.on_event = loop.wakeup
+
+    def disconnect(self):
+        self._closing = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if self._reader_thread and self._reader_thread is not threading.current_thread():
+            self._reader_thread.join(1)
+
+    def connect(self):
+        super().connect()
+        self._reader_thread = threading.Thread(target=self._read_loop, name='transport-reader', daemon=True)
+        self._reader_thread.start()
+
+
+class AsyncTransport:
+    """asyncio counterpart of Transport. Requests are not waited for one by one: every request gets its own
+    future, so any number of them can be in flight on the socket at once. A single reader task resolves the
+    futures by request handle and puts everything else (server callbacks) into the events queue, journaled like
+    Transport does. The reader never waits for room in the queue, that would stall every request in flight."""
+
+    def __init__(self, ip, port, events_queue: Queue):
+        self.ip = ip
+        self.port = port
+        self.request_num = 0x80000000
+        self.events_queue = events_queue
+        self.journal = None
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = dict()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                size, request_number = unpack('<LL', await self._reader.readexactly(8))
+                msg = await self._reader.readexactly(size)
+                future = self._pending.pop(request_number, None)
+                if future is None:
+                    logger.debug(f'Queue event, current size = {self.events_queue.qsize()}')
+                    queue_event(self.events_queue, self.journal, msg, block=False)
+                elif not future.cancelled():
+                    future.set_result(msg)
+        except (asyncio.IncompleteReadError, ConnectionError) as ex:
+            logger.error(f'Connection lost: {ex!r}')
+            self._fail_pending(ConnectionError('Connection lost'))
+
+    def _fail_pending(self, exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exception)
+        self._pending.clear()
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def send_request(self, request) -> asyncio.Future:
+        """Writes the request and returns a future resolved with the raw response, does not wait for it."""
+        self.request_num += 1
+        future = asyncio.get_event_loop().create_future()
+        self._pending[self.request_num] = future
+        self._writer.write(pack_message(request, self.request_num))
+        return future
+
+    async def request(self, request):
+        future = self.send_request(request)
+        await self._writer.drain()
+        return await future
+
+    async def connect(self):
+        logger.debug('connecting')
+        self._reader, self._writer = await asyncio.open_connection(self.ip, self.port)
+        data_length = unpack('<L', await self._reader.readexactly(4))[0]
+        protocol_version = (await self._reader.readexactly(data_length)).decode('utf-8')
         logger.info(f'Connected, protocol used: {protocol_version}')
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    async def disconnect(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+        self._fail_pending(ConnectionError('Disconnected'))
@@ -22,6 +22,25 @@ class CommandParser:
             raise WrongCommand("Used wrong command")
 
 
+METHOD_NAME_REGEX = re.compile(rb'<methodName>([^<]*)</methodName>')
+
+
+def peek_method_name(msg) -> str:
+    """Returns the methodName of a raw callback frame without parsing it, empty string for responses."""
+    hit = METHOD_NAME_REGEX.search(msg, 0, 256)
+    return hit.group(1).decode('utf-8') if hit else ''
+
+
+FIRST_STRING_REGEX = re.compile(rb'</methodName>.*?<string>([^<]*)</string>', re.DOTALL)
+
+
+def peek_login(msg) -> str:
+    """Returns the first string param of a raw callback frame, which is the login for the player callbacks
+    (PlayerCheckpoint, PlayerInfoChanged...), empty string if there is none."""
+    hit = FIRST_STRING_REGEX.search(msg, 0, 1024)
+    return hit.group(1).decode('utf-8') if hit else ''
+
+
 def strip_size(text):
     return re.sub(r'(?<!\$)\$[iwosn]|(?<!\$)\$l\[\S*\]', '', text)
 
@@ -32,3 +51,9 @@ def strip_nickname(nickname):
 
 def is_bound(m):
     return hasattr(m, '__self__')
+
+
+def format_time(milliseconds: int) -> str:
+    """Race time as the game shows it: 1:02.35"""
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    return f'{minutes}:{milliseconds // 1000:02d}.{milliseconds % 1000 // 10:02d}'
@@ -0,0 +1,10 @@
+import pytest
+
+from src.api.tm_types import ChallengeInfo
+from src.simulator import to_struct
+
+
+@pytest.fixture
+def challenge_struct():
+    """Challenge struct like the server sends it in callbacks, for the challenge uid given."""
+    return lambda uid: to_struct(ChallengeInfo(uid=uid))
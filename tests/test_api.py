@@ -1,10 +1,39 @@
+import time
 from typing import List
+from xmlrpc.client import dumps, loads, Fault
 
 import pytest
 
 from src.api.tm_requests import XmlRpc
 from src.api.tm_types import Status
 from src.errors import InconsistentTypesError
+from src.includes.type_factory import get_builder
+
+
+class FakeTransport:
+    def __init__(self, *responses, responder=None):
+        self.requests = []
+        self.log = []
+        self.responses = list(responses)
+        self.responder = responder
+        self.request_num = 0x80000000
+
+    def send_request(self, request):
+        self.request_num += 1
+        self.requests.append(loads(request))
+        self.log.append(('send', self.request_num, len(request.encode('utf-8'))))
+        return self.request_num
+
+    def get_response(self, request_num=None):
+        request_num = request_num or self.request_num
+        self.log.append(('receive', request_num))
+        if self.responder:
+            value = self.responder(*self.requests[request_num - 0x80000001])
+        else:
+            value = self.responses.pop(0)
+        if isinstance(value, Fault):
+            return dumps(value, methodresponse=True).encode('utf-8')
+        return dumps((value,), methodresponse=True).encode('utf-8')
 
 
 @pytest.fixture
@@ -17,11 +46,6 @@ def rpc_multicall(mocker):
     return mocker.patch('src.api.tm_requests.RpcMulticall')
 
 
-@pytest.fixture
-def multicall(mocker):
-    return mocker.patch('src.api.tm_requests.MultiCall')
-
-
 @pytest.fixture
 def method(mocker):
     return mocker.patch('src.api.tm_requests.Method')
@@ -54,17 +78,15 @@ def test_should_getattr_from_multicall_when_multicall_requested(method, transpor
     rpc_multicall.return_value.GetStatus.assert_called_once()
 
 
-def test_should_exec_multicall_when_multicall_requested_only(transport, multicall):
-    rpc = XmlRpc(transport.return_value, True)
+def test_should_exec_multicall_when_multicall_requested_only():
+    transport = FakeTransport([[{'Code': 4, 'Name': 'Running'}]])
+    rpc = XmlRpc(transport, True)
     rpc.get_status()
+    assert transport.requests == []
 
-    multicall.return_value.return_value = []
-    dummy_param = None
-    rpc.exec_multicall(dummy_param)
+    rpc.exec_multicall(None)
 
-    multicall.assert_called_once_with(rpc)
-    multicall.return_value.GetStatus.assert_called_once()
-    multicall.return_value.assert_called_once()
+    assert transport.requests == [(([{'methodName': 'GetStatus', 'params': []}],), 'system.multicall')]
 
 
 @pytest.mark.parametrize('types, methods, return_values, expected', [
@@ -97,15 +119,13 @@ def test_should_exec_multicall_when_multicall_requested_only(transport, multical
             [[1, 2, 3], []]
     )
 ])
-def test_exec_multicall_should_return_expected_types(types, methods, return_values, expected, transport, multicall):
-    rpc = XmlRpc(transport.return_value, True)
+def test_exec_multicall_should_return_expected_types(types, methods, return_values, expected):
+    rpc = XmlRpc(FakeTransport([[value] for value in return_values]), True)
     [getattr(rpc, method)() for method in methods]
-    multicall.return_value.return_value = return_values
 
     results = rpc.exec_multicall(*types)
 
-    for expectation, result in zip(expected, results):
-        assert expectation == result
+    assert results == expected
 
 
 @pytest.mark.parametrize('types, methods, return_values', [
@@ -130,10 +150,131 @@ def test_exec_multicall_should_return_expected_types(types, methods, return_valu
             [[1, 'unexpected list', 3], ['1', '2', '3']]
     )
 ])
-def test_exec_multicall_throws_exception_on_inconsistent_data(types, methods, return_values, transport, multicall):
-    rpc = XmlRpc(transport.return_value, True)
+def test_exec_multicall_throws_exception_on_inconsistent_data(types, methods, return_values):
+    rpc = XmlRpc(FakeTransport([[value] for value in return_values]), True)
     [getattr(rpc, method)() for method in methods]
-    multicall.return_value.return_value = return_values
 
     with pytest.raises(InconsistentTypesError):
         rpc.exec_multicall(*types)
+
+
+def multicall_responder(params, method_name):
+    fault = {'faultCode': -1000, 'faultString': 'Login unknown.'}
+    return [[call['params'][0]] if call['params'][0] != 'bad_login' else fault for call in params[0]]
+
+
+def test_exec_multicall_should_split_calls_into_pipelined_chunks():
+    transport = FakeTransport(responder=multicall_responder)
+    rpc = XmlRpc(transport).getMulticallRpc(max_request_size=4096)
+    logins = [f'login_{i}' for i in range(300)]
+    [rpc.kick(login, 'message') for login in logins]
+
+    results = rpc.exec_multicall()
+
+    sent = [entry for entry in transport.log if entry[0] == 'send']
+    assert len(sent) > 1
+    assert all(size <= 4096 for _, _, size in sent)
+    assert transport.log[:len(sent)] == sent
+    assert results == logins
+
+
+def test_exec_multicall_should_return_fault_of_failed_entry_only():
+    rpc = XmlRpc(FakeTransport(responder=multicall_responder), True)
+    [rpc.add_guest(login) for login in ['first', 'bad_login', 'last']]
+
+    first, bad, last = rpc.exec_multicall(str, None, str)
+
+    assert (first, last) == ('first', 'last')
+    assert isinstance(bad, Fault) and bad.faultCode == -1000
+
+
+def test_exec_multicall_should_return_fault_for_missing_results():
+    rpc = XmlRpc(FakeTransport([['first']]), True)
+    [rpc.add_guest(login) for login in ['first', 'second']]
+
+    first, missing = rpc.exec_multicall(str, str)
+
+    assert first == 'first'
+    assert isinstance(missing, Fault)
+
+
+def test_exec_multicall_should_discard_sent_chunks_when_a_send_fails():
+    class FailingTransport(FakeTransport):
+        def __init__(self):
+            super().__init__()
+            self.discarded = []
+
+        def send_request(self, request):
+            if self.requests:
+                raise BrokenPipeError()
+            return super().send_request(request)
+
+        def discard_response(self, request_num):
+            self.discarded.append(request_num)
+
+    transport = FailingTransport()
+    rpc = XmlRpc(transport).getMulticallRpc(max_request_size=4096)
+    [rpc.kick(f'login_{i}', 'message') for i in range(300)]
+
+    with pytest.raises(BrokenPipeError):
+        rpc.exec_multicall()
+
+    assert transport.discarded == [0x80000001]
+
+
+def test_typed_list_methods_should_be_typed_in_multicall_without_types_given():
+    rpc = XmlRpc(FakeTransport([[[{'Code': 1, 'Name': 'name1'}]]]), True)
+    rpc.call_proxy.GetStatusList[List[Status]]()
+
+    assert rpc.exec_multicall() == [[Status(1, 'name1')]]
+
+
+def test_batch_should_send_calls_as_one_multicall_and_resolve_each_caller():
+    transport = FakeTransport([[{'Code': 4, 'Name': 'Running'}], {'faultCode': -1000, 'faultString': 'Login unknown.'},
+                               [True]])
+    rpc = XmlRpc(transport)
+
+    with rpc.batch() as batch:
+        status = batch.get_status()
+        kick = batch.kick('unknown')
+        message = batch.chat_send_server_message('hello')
+
+    assert transport.requests == [(([{'methodName': 'GetStatus', 'params': []},
+                                     {'methodName': 'Kick', 'params': ['unknown', '']},
+                                     {'methodName': 'ChatSendServerMessage', 'params': ['hello']}],),
+                                   'system.multicall')]
+    assert status.result() == Status(4, 'Running')
+    with pytest.raises(Fault):
+        kick.result()
+    assert message.result() is True
+
+
+def test_batch_result_should_flush_pending_calls():
+    transport = FakeTransport([[1337]])
+    batch = XmlRpc(transport).batch(window=60)
+
+    coppers = batch.get_server_coppers()
+    assert transport.requests == []
+    assert coppers.result() == 1337
+    assert len(transport.requests) == 1
+
+
+def test_batch_window_should_send_trailing_calls_without_another_call():
+    transport = FakeTransport([[True], [True]])
+    batch = XmlRpc(transport).batch(window=0.05)
+
+    first = batch.chat_send_server_message('hello')
+    second = batch.chat_send_server_message('world')
+    assert transport.requests == []
+    deadline = time.monotonic() + 5
+    while not second.done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(transport.requests) == 1
+    assert first.done() and second.done()
+    assert len(batch) == 0
+
+
+def test_builders_should_be_compiled_once_per_type():
+    assert get_builder(List[Status]) is get_builder(List[Status])
+    assert get_builder(List[Status])([{'Code': 1, 'Name': 'name1'}]) == [Status(1, 'name1')]
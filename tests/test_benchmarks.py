@@ -0,0 +1,26 @@
+from benchmarks.runner import compare, measure
+
+
+def results(**throughputs):
+    return {'results': {name: {'median_ops_per_sec': ops} for name, ops in throughputs.items()}}
+
+
+def test_slower_benchmarks_over_threshold_are_regressions():
+    current = results(decode=80.0, events=95.0, transport=200.0, new=1.0)
+    baseline = results(decode=100.0, events=100.0, transport=100.0)
+
+    assert compare(current, baseline, 0.1) == [('decode', 0.8)]
+
+
+def test_measure_reports_throughput_of_operations():
+    calls = []
+
+    def setup():
+        return lambda: calls.append(1), 10
+
+    result = measure(setup, repeat=3, min_time=0.001)
+
+    assert result['operations'] == 10
+    assert result['runs'] == 3
+    assert result['best_ops_per_sec'] >= result['median_ops_per_sec'] > 0
+    assert len(calls) > result['loops'] * 3
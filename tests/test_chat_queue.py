@@ -0,0 +1,101 @@
+from xmlrpc.client import Fault
+
+import pytest
+
+from src.chat_queue import ChatQueue
+
+
+@pytest.fixture
+def rpc(mocker):
+    return mocker.Mock()
+
+
+@pytest.fixture
+def multicall(mocker):
+    multicall = mocker.patch('src.chat_queue.RpcMulticall').return_value
+    multicall.return_value = [True, True, True]
+    return multicall
+
+
+def test_nothing_is_sent_before_flush(rpc):
+    chat = ChatQueue(rpc)
+    chat.send('hello')
+
+    rpc.chat_send_server_message.assert_not_called()
+    assert len(chat) == 1
+
+
+def test_single_message_is_sent_without_multicall(rpc, multicall):
+    chat = ChatQueue(rpc)
+    chat.send('hello', 'first')
+    chat.flush()
+
+    rpc.chat_send_server_message_to_login.assert_called_once_with('hello', 'first')
+    multicall.assert_not_called()
+    assert len(chat) == 0
+
+
+def test_same_message_to_logins_is_merged_into_one_call(rpc, multicall):
+    chat = ChatQueue(rpc)
+    chat.send('welcome', 'first')
+    chat.send('first has joined')
+    chat.send('welcome', 'second')
+    chat.send('welcome', 'first')
+    chat.send('second has joined')
+    chat.flush()
+
+    assert multicall.method_calls == [
+        ('ChatSendServerMessageToLogin', ('welcome', 'first,second')),
+        ('ChatSendServerMessage', ('first has joined',)),
+        ('ChatSendServerMessage', ('second has joined',)),
+    ]
+    multicall.assert_called_once_with()
+    assert chat.sent == 3
+    assert chat.merged == 2
+
+
+def test_failed_message_is_logged(rpc, multicall, mocker):
+    logger = mocker.patch('src.chat_queue.logger')
+    multicall.return_value = [True, Fault(-1000, 'Login unknown.')]
+    chat = ChatQueue(rpc)
+    chat.send('hello')
+    chat.send('psst', 'gone')
+    chat.flush()
+
+    logger.error.assert_called_once()
+    assert 'psst' in logger.error.call_args[0][0]
+
+
+def test_messages_over_budget_wait_for_next_ticks(rpc, multicall, mocker):
+    clock = mocker.patch('src.chat_queue.time.monotonic')
+    clock.return_value = 100.0
+    chat = ChatQueue(rpc, messages_per_second=2)
+    for number in range(5):
+        chat.send(f'message {number}')
+
+    chat.flush()
+    assert [call[1] for call in multicall.method_calls] == [('message 0',), ('message 1',)]
+    assert len(chat) == 3
+
+    chat.flush()
+    assert len(multicall.method_calls) == 2
+
+    clock.return_value = 100.5
+    chat.flush()
+    rpc.chat_send_server_message.assert_called_once_with('message 2')
+
+    clock.return_value = 101.5
+    chat.flush()
+    assert [call[1] for call in multicall.method_calls[2:]] == [('message 3',), ('message 4',)]
+    assert len(chat) == 0
+
+
+def test_flush_without_budget_sends_everything(rpc, multicall):
+    chat = ChatQueue(rpc, messages_per_second=1)
+    for number in range(3):
+        chat.send(f'message {number}')
+
+    chat.flush(use_budget=False)
+
+    assert [call[1] for call in multicall.method_calls] == [('message 0',), ('message 1',), ('message 2',)]
+    assert len(chat) == 0
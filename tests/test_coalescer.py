@@ -0,0 +1,70 @@
+from collections import namedtuple
+from unittest.mock import Mock
+
+from src.coalescer import EventCoalescer
+from src.includes.events_types import EventPlayerCheckpoint, EventPlayerInfoChanged
+
+Event = namedtuple('Event', ['name', 'data'])
+
+
+def checkpoint(login, index):
+    return Event(EventPlayerCheckpoint.name, EventPlayerCheckpoint(0, login, 1000 * index, 0, index))
+
+
+def test_events_are_delivered_once_per_flush_grouped_by_login():
+    coalescer = EventCoalescer()
+    listener = Mock()
+    coalescer.register(EventPlayerCheckpoint.name, listener)
+
+    for event in [checkpoint('a', 0), checkpoint('b', 0), checkpoint('a', 1), checkpoint('c', 0)]:
+        assert coalescer.add(event)
+    assert coalescer.pending() == 4
+    coalescer.flush()
+
+    listener.assert_called_once_with([checkpoint('a', 0).data, checkpoint('a', 1).data,
+                                      checkpoint('b', 0).data, checkpoint('c', 0).data])
+    assert coalescer.pending() == 0
+
+
+def test_flush_without_events_calls_nobody():
+    coalescer = EventCoalescer()
+    listener = Mock()
+    coalescer.register(EventPlayerCheckpoint.name, listener)
+
+    coalescer.flush()
+
+    listener.assert_not_called()
+
+
+def test_events_without_batch_listeners_are_not_kept():
+    coalescer = EventCoalescer()
+
+    assert not coalescer.add(checkpoint('a', 0))
+    assert EventPlayerCheckpoint.name not in coalescer
+
+
+def test_player_info_changed_is_grouped_by_login_of_player_info():
+    coalescer = EventCoalescer()
+    listener = Mock()
+    coalescer.register(EventPlayerInfoChanged.name, listener)
+    infos = [EventPlayerInfoChanged({'Login': login, 'NickName': login, 'PlayerId': 0, 'TeamId': 0,
+                                     'SpectatorStatus': 0, 'LadderRanking': 0, 'Flags': flags})
+             for login, flags in [('a', 0), ('b', 0), ('a', 1)]]
+
+    for info in infos:
+        coalescer.add(Event(EventPlayerInfoChanged.name, info))
+    coalescer.flush()
+
+    listener.assert_called_once_with([infos[0], infos[2], infos[1]])
+
+
+def test_failing_batch_listener_does_not_stop_others():
+    coalescer = EventCoalescer()
+    failing, listener = Mock(side_effect=ValueError), Mock()
+    coalescer.register(EventPlayerCheckpoint.name, failing)
+    coalescer.register(EventPlayerCheckpoint.name, listener)
+
+    coalescer.add(checkpoint('a', 0))
+    coalescer.flush()
+
+    listener.assert_called_once_with([checkpoint('a', 0).data])
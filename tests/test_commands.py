@@ -0,0 +1,103 @@
+import pytest
+
+from src.commands import CommandRegistry
+from src.errors import WrongCommand, WrongNumberOfParams, WrongParamType
+from src.listeners.chat_listener import ChatListener
+from src.includes.events_types import EventPlayerChat
+
+
+class DummyController:
+    def __init__(self):
+        self.calls = []
+
+    def kick(self, caller, login, message='bye'):
+        self.calls.append(('kick', login, message))
+
+    def kill(self, caller):
+        self.calls.append(('kill',))
+
+    def ask_me(self, caller, *words):
+        self.calls.append(('ask_me',) + words)
+
+    def warmup(self, caller, seconds: int, enabled: bool = True):
+        self.calls.append(('warmup', seconds, enabled))
+
+    def _private(self):
+        pass
+
+
+@pytest.fixture
+def controller():
+    return DummyController()
+
+
+@pytest.fixture
+def registry(controller):
+    registry = CommandRegistry()
+    registry.register_controller(controller)
+    return registry
+
+
+def test_public_methods_are_registered(registry):
+    assert all(name in registry for name in ('kick', 'kill', 'ask_me', 'warmup'))
+    assert '_private' not in registry
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('  *kick user', ('kick', 'user', 'bye')),
+    ('*kick user "message in the middle"', ('kick', 'user', 'message in the middle')),
+    (' *kill     ', ('kill',)),
+    (' ****kick\tuser_with_underscore_in_nickname', ('kick', 'user_with_underscore_in_nickname', 'bye')),
+    ('*ask_me about various params   ', ('ask_me', 'about', 'various', 'params')),
+    ('*warmup 30 off', ('warmup', 30, False)),
+])
+def test_dispatch_calls_handler_with_converted_params(registry, controller, line, expected):
+    registry.dispatch(line, 'admin')
+
+    assert controller.calls == [expected]
+
+
+@pytest.mark.parametrize('line, error', [
+    ('*unexpected_command', WrongCommand),
+    ('*', WrongCommand),
+    ('*kick user "unterminated', WrongCommand),
+    ('*kick', WrongNumberOfParams),
+    ('*kill now', WrongNumberOfParams),
+    ('*warmup soon', WrongParamType),
+])
+def test_dispatch_raises_on_bad_lines(registry, line, error):
+    with pytest.raises(error):
+        registry.dispatch(line, 'admin')
+
+
+def test_commands_can_be_registered_by_other_controllers(registry):
+    calls = []
+    registry.register('hi', lambda caller, login: calls.append((caller, login)))
+
+    registry.dispatch('*hi player', 'admin')
+
+    assert calls == [('admin', 'player')]
+
+
+def test_chat_listener_dispatches_commands(mocker):
+    pyseco = mocker.Mock()
+    pyseco.commands = CommandRegistry()
+    pyseco.register_controller.side_effect = pyseco.commands.register_controller
+    listener = ChatListener('chat', pyseco)
+
+    listener.on_player_chat(EventPlayerChat(236, 'admin', '*skip', False))
+    listener.on_player_chat(EventPlayerChat(236, 'admin', 'skip', False))
+
+    pyseco.rpc.next_challenge.assert_called_once_with()
+
+
+def test_chat_listener_passes_the_caller_login(mocker):
+    pyseco = mocker.Mock()
+    pyseco.commands = CommandRegistry()
+    listener = ChatListener('chat', pyseco)
+    calls = []
+    pyseco.commands.register('hi', lambda caller: calls.append(caller))
+
+    listener.on_player_chat(EventPlayerChat(236, 'player', '*hi', False))
+
+    assert calls == ['player']
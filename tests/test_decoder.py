@@ -0,0 +1,53 @@
+from typing import List
+from xmlrpc.client import dumps, loads, Fault
+
+import pytest
+
+from src.api.tm_decoder import decode_response
+from src.api.tm_types import PlayerInfo, DetailedPlayerInfo, Avatar, LadderStats, LadderRanking, Status
+
+PLAYER = {'Login': 'edenik', 'NickName': '$o$f00xst', 'PlayerId': 3, 'TeamId': -1, 'SpectatorStatus': 2550101,
+          'LadderRanking': 0, 'Flags': 1100000}
+
+
+def response(value):
+    return dumps((value,), methodresponse=True).encode('utf-8')
+
+
+def test_should_build_list_of_tm_types():
+    players = decode_response(response([PLAYER, dict(PLAYER, Login='other', PlayerId=4)]), List[PlayerInfo])
+
+    assert players == [PlayerInfo('edenik', '$o$f00xst', 3, -1, 2550101, 0, 1100000),
+                       PlayerInfo('other', '$o$f00xst', 4, -1, 2550101, 0, 1100000)]
+
+
+def test_should_map_members_by_name_and_skip_unknown_ones():
+    reordered = {'Flags': 1, 'Unknown': {'Nested': [1, 2]}, 'PlayerId': 7, 'Login': 'login'}
+
+    assert decode_response(response(reordered), PlayerInfo) == PlayerInfo(login='login', player_id=7, flags=1)
+
+
+def test_should_build_nested_tm_types():
+    details = dict(PLAYER, Avatar={'FileName': 'avatar.tga', 'Checksum': 'abc'},
+                   LadderStats={'TeamName': 'team', 'PlayerRankings': [{'Path': 'World', 'Score': 1.5,
+                                                                        'Ranking': 10, 'TotalCount': 100}]})
+
+    player = decode_response(response(details), DetailedPlayerInfo)
+
+    assert player.avatar == Avatar('avatar.tga', 'abc')
+    assert player.ladder_stats.team_name == 'team'
+    assert player.ladder_stats.player_rankings == [LadderRanking('World', 1.5, 10, 100)]
+    assert isinstance(player.ladder_stats, LadderStats)
+
+
+@pytest.mark.parametrize('value', [
+    True, 1337, 'text', 1.5, [1, 'two', [3.0]], {'Code': 4, 'Name': 'Running'}, [PLAYER]
+])
+def test_should_decode_untyped_values_like_xmlrpc_loads(value):
+    data = response(value)
+    assert decode_response(data) == loads(data)[0][0]
+
+
+def test_should_raise_fault_even_when_type_expected():
+    with pytest.raises(Fault):
+        decode_response(dumps(Fault(-1000, 'Login unknown.'), methodresponse=True).encode('utf-8'), Status)
@@ -0,0 +1,123 @@
+import threading
+from collections import namedtuple
+
+from src.dispatcher import EventDispatcher
+from src.includes.events_types import EventPlayerCheckpoint, EventStatusChanged
+
+Event = namedtuple('Event', ['name', 'data'])
+
+
+def checkpoint(login, index):
+    return Event('EventPlayerCheckpoint', EventPlayerCheckpoint(0, login, 1000 * index, 0, index))
+
+
+def test_without_workers_listeners_run_on_calling_thread():
+    dispatcher = EventDispatcher()
+    threads = []
+
+    dispatcher.dispatch(checkpoint('a', 0), [lambda data: threads.append(threading.current_thread())])
+
+    assert threads == [threading.current_thread()]
+
+
+def test_events_of_one_login_keep_their_order():
+    dispatcher = EventDispatcher(4)
+    handled = []
+
+    for index in range(100):
+        dispatcher.dispatch(checkpoint('login', index), [lambda data: handled.append(data.checkpoint_index)])
+    dispatcher.join()
+
+    assert handled == list(range(100))
+    dispatcher.shutdown()
+
+
+def test_events_of_different_logins_run_in_parallel():
+    dispatcher = EventDispatcher(2)
+    logins = ['a', 'b', 'c', 'd']
+    first, second = next((x, y) for x in logins for y in logins if dispatcher.shard_of(x) != dispatcher.shard_of(y))
+    other_started = threading.Event()
+    blocked = []
+
+    def listener(data):
+        if data.login == first:
+            blocked.append(other_started.wait(1))
+        else:
+            other_started.set()
+
+    dispatcher.dispatch(checkpoint(first, 0), [listener])
+    dispatcher.dispatch(checkpoint(second, 0), [listener])
+    dispatcher.join()
+
+    assert blocked == [True]
+    dispatcher.shutdown()
+
+
+def test_events_without_login_run_after_all_dispatched_events():
+    dispatcher = EventDispatcher(3)
+    handled = []
+
+    for login in ['a', 'b', 'c', 'd']:
+        dispatcher.dispatch(checkpoint(login, 0), [lambda data: handled.append(data.login)])
+    dispatcher.dispatch(Event('EventStatusChanged', EventStatusChanged(4, 'Running')),
+                        [lambda data: handled.append(data.status_name)])
+    dispatcher.join()
+
+    assert sorted(handled[:4]) == ['a', 'b', 'c', 'd']
+    assert handled[4] == 'Running'
+    dispatcher.shutdown()
+
+
+def test_events_without_login_do_not_block_the_caller_and_keep_their_order():
+    dispatcher = EventDispatcher(2)
+    release = threading.Event()
+    handled = []
+
+    dispatcher.dispatch(checkpoint('a', 0), [lambda data: release.wait(1) and handled.append(data.login)])
+    dispatcher.dispatch(Event('EventStatusChanged', EventStatusChanged(4, 'Running')),
+                        [lambda data: handled.append(data.status_name)])
+    for login in ['a', 'b', 'c', 'd']:
+        dispatcher.dispatch(checkpoint(login, 1), [lambda data: handled.append(data.login)])
+    assert handled == []
+    release.set()
+    dispatcher.join()
+
+    assert handled[:2] == ['a', 'Running']
+    assert sorted(handled[2:]) == ['a', 'b', 'c', 'd']
+    dispatcher.shutdown()
+
+
+def test_failing_listener_does_not_stop_its_shard():
+    dispatcher = EventDispatcher(1)
+    handled = []
+
+    def listener(data):
+        if data.checkpoint_index == 0:
+            raise ValueError('failed')
+        handled.append(data.checkpoint_index)
+
+    dispatcher.dispatch(checkpoint('a', 0), [listener])
+    dispatcher.dispatch(checkpoint('a', 1), [listener])
+    dispatcher.join()
+
+    assert handled == [1]
+    dispatcher.shutdown()
+
+
+def test_stats_are_collected_per_shard():
+    dispatcher = EventDispatcher(2)
+    release = threading.Event()
+
+    for index in range(5):
+        dispatcher.dispatch(checkpoint('a', index), [lambda data: release.wait(1)])
+    release.set()
+    dispatcher.join()
+
+    stats = dispatcher.stats()[dispatcher.shard_of('a')]
+    assert stats.handled == 5
+    assert stats.max_queue_depth >= 1
+    assert stats.queue_depth == 0
+    assert 0 < stats.mean_latency <= stats.max_latency
+    assert dispatcher.stats()[1 - dispatcher.shard_of('a')].handled == 0
+    assert dispatcher.report()[dispatcher.shard_of('a')].startswith(f"shard {dispatcher.shard_of('a')}: depth 0")
+    dispatcher.shutdown()
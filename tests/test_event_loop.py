@@ -0,0 +1,70 @@
+import socket
+import threading
+import time
+
+from src.event_loop import EventLoop
+
+
+def test_timers_should_run_in_order_of_their_deadline():
+    loop = EventLoop()
+    calls = []
+    loop.call_later(0.02, calls.append, 'second')
+    loop.call_later(0.01, calls.append, 'first')
+    loop.call_later(0.03, loop.stop)
+
+    loop.run_forever()
+
+    assert calls == ['first', 'second']
+
+
+def test_periodic_job_should_run_until_cancelled():
+    loop = EventLoop()
+    calls = []
+    timer = loop.call_every(0.01, calls.append, 'tick')
+    loop.call_later(0.055, timer.cancel)
+    loop.call_later(0.08, loop.stop)
+
+    loop.run_forever()
+
+    assert 4 <= len(calls) <= 6
+
+
+def test_failing_job_should_not_stop_the_loop():
+    loop = EventLoop()
+    calls = []
+    loop.call_later(0, lambda: 1 / 0)
+    loop.call_later(0.01, calls.append, 'still running')
+    loop.call_later(0.02, loop.stop)
+
+    loop.run_forever()
+
+    assert calls == ['still running']
+
+
+def test_reader_callback_and_idle_callback_should_be_called():
+    loop = EventLoop()
+    reader, writer = socket.socketpair()
+    received = []
+    idle_calls = []
+    loop.add_reader(reader, lambda: received.append(reader.recv(100)))
+    loop.add_idle_callback(lambda: idle_calls.append(len(received)))
+
+    writer.send(b'data')
+    loop.run_once(timeout=1)
+
+    assert received == [b'data']
+    assert idle_calls == [1]
+
+
+def test_call_soon_threadsafe_should_wake_up_waiting_loop():
+    loop = EventLoop()
+    calls = []
+    thread = threading.Thread(target=lambda: (time.sleep(0.01), loop.call_soon_threadsafe(calls.append, 'woken')))
+    thread.start()
+
+    start = time.monotonic()
+    loop.run_once(timeout=5)
+    thread.join()
+
+    assert time.monotonic() - start < 1
+    assert calls == ['woken']
@@ -0,0 +1,148 @@
+import threading
+from queue import Empty
+from xmlrpc.client import dumps
+
+import pytest
+
+from src.includes.event_queue import BoundedEventQueue, DROP_OLDEST
+from src.utils import peek_login
+
+
+def checkpoint(login, index):
+    return dumps((0, login, 1000 * index, 0, index), 'TrackMania.PlayerCheckpoint').encode()
+
+
+def player_connect(login):
+    return dumps((login, False), 'TrackMania.PlayerConnect').encode()
+
+
+def player_info_changed(login, flags):
+    return dumps(({'Login': login, 'NickName': login, 'Flags': flags},), 'TrackMania.PlayerInfoChanged').encode()
+
+
+def drain(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+def test_peek_login_returns_first_string_param():
+    assert peek_login(checkpoint('login', 1)) == 'login'
+    assert peek_login(player_info_changed('other', 0)) == 'other'
+    assert peek_login(dumps((1, 2), 'TrackMania.BillUpdated').encode()) == ''
+
+
+def test_messages_are_returned_in_order():
+    queue = BoundedEventQueue(10)
+    messages = [player_connect('a'), checkpoint('a', 0), player_connect('b')]
+    for msg in messages:
+        queue.put(msg)
+
+    assert drain(queue) == messages
+
+
+def player_finish(login, time):
+    return dumps((0, login, time), 'TrackMania.PlayerFinish').encode()
+
+
+def test_nothing_is_coalesced_below_high_water():
+    queue = BoundedEventQueue(10, high_water=0.5)
+    messages = [checkpoint('a', 0), checkpoint('a', 1), checkpoint('a', 2)]
+    for msg in messages:
+        queue.put(msg)
+
+    assert drain(queue) == messages
+    assert not queue.coalesced
+
+
+def test_latest_checkpoint_of_login_replaces_waiting_one_above_high_water():
+    queue = BoundedEventQueue(10, high_water=0.2)
+    queue.put(checkpoint('a', 0))
+    queue.put(checkpoint('b', 0))
+    queue.put(player_info_changed('a', 0))
+    queue.put(checkpoint('a', 1))
+    queue.put(player_info_changed('a', 1))
+
+    assert drain(queue) == [checkpoint('b', 0), checkpoint('a', 1), player_info_changed('a', 1)]
+    assert queue.coalesced == {'TrackMania.PlayerCheckpoint': 1, 'TrackMania.PlayerInfoChanged': 1}
+
+
+def test_coalescing_keeps_the_order_of_a_login():
+    queue = BoundedEventQueue(10, high_water=0.1)
+    queue.put(checkpoint('a', 5))
+    queue.put(player_finish('a', 5000))
+    queue.put(checkpoint('a', 0))
+
+    assert drain(queue) == [player_finish('a', 5000), checkpoint('a', 0)]
+
+
+def test_coalescing_stops_once_the_event_is_taken():
+    queue = BoundedEventQueue(10, high_water=0.1)
+    queue.put(checkpoint('a', 0))
+    queue.get_nowait()
+    queue.put(checkpoint('a', 1))
+
+    assert drain(queue) == [checkpoint('a', 1)]
+
+
+def test_full_queue_drops_oldest_event():
+    queue = BoundedEventQueue(2, {'TrackMania.PlayerConnect': DROP_OLDEST})
+    for login in ['a', 'b', 'c']:
+        queue.put(player_connect(login))
+
+    assert drain(queue) == [player_connect('b'), player_connect('c')]
+    assert queue.dropped == {'TrackMania.PlayerConnect': 1}
+
+
+def test_blocking_put_waits_for_consumer():
+    queue = BoundedEventQueue(1, block_timeout=5)
+    queue.put(player_connect('a'))
+    producer = threading.Thread(target=queue.put, args=(player_connect('b'),))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+
+    assert queue.get() == player_connect('a')
+    producer.join(1)
+    assert drain(queue) == [player_connect('b')]
+    assert not queue.dropped
+
+
+def test_blocking_put_from_consumer_thread_drops_instead_of_waiting():
+    queue = BoundedEventQueue(1, block_timeout=5)
+    with pytest.raises(Empty):
+        queue.get_nowait()
+    queue.put(player_connect('a'))
+    queue.put(player_connect('b'))
+
+    assert drain(queue) == [player_connect('b')]
+    assert queue.dropped == {'TrackMania.PlayerConnect': 1}
+
+
+def test_blocking_put_drops_oldest_after_timeout():
+    queue = BoundedEventQueue(1, block_timeout=0.01)
+    queue.put(player_connect('a'))
+    queue.put(player_connect('b'))
+
+    assert drain(queue) == [player_connect('b')]
+    assert queue.dropped == {'TrackMania.PlayerConnect': 1}
+
+
+def test_high_water_mark_is_tracked():
+    queue = BoundedEventQueue(10)
+    for login in 'abcd':
+        queue.put(player_connect(login))
+    drain(queue)
+
+    assert queue.stats() == {'size': 0, 'high_water_mark': 4, 'dropped': {}, 'coalesced': {}}
+
+
+def test_get_from_empty_queue_raises_empty():
+    with pytest.raises(Empty):
+        BoundedEventQueue(1).get_nowait()
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedEventQueue(1, {'TrackMania.PlayerConnect': 'ignore'})
@@ -0,0 +1,77 @@
+from xmlrpc.client import dumps
+
+import pytest
+
+from src.includes.journal import EventJournal, journal_files, read_journal
+
+
+def frame(index):
+    return dumps((0, 'login', index, 0, index), 'TrackMania.PlayerCheckpoint').encode()
+
+
+def test_written_frames_are_read_back_in_order(tmp_path):
+    path = str(tmp_path / 'events.journal')
+    journal = EventJournal(path)
+    for index in range(10):
+        journal.write(memoryview(frame(index)))
+    journal.close()
+
+    records = list(read_journal(path))
+
+    assert [record[1] for record in records] == [frame(index) for index in range(10)]
+    timestamps = [record[0] for record in records]
+    assert timestamps == sorted(timestamps)
+
+
+def test_journal_is_appended_to(tmp_path):
+    path = str(tmp_path / 'events.journal')
+    for index in range(2):
+        journal = EventJournal(path)
+        journal.write(frame(index))
+        journal.close()
+
+    assert [record[1] for record in read_journal(path)] == [frame(0), frame(1)]
+
+
+def test_runs_follow_each_other_without_gap(tmp_path, mocker):
+    path = str(tmp_path / 'events.journal')
+    monotonic = mocker.patch('src.includes.journal.time.monotonic')
+    for start in (1000.0, 10.0):
+        monotonic.side_effect = [start, start + 1, start + 2]
+        journal = EventJournal(path)
+        journal.write(frame(0))
+        journal.write(frame(1))
+        journal.close()
+
+    assert [record[0] for record in read_journal(path)] == [1001.0, 1002.0, 1003.0, 1004.0]
+
+
+def test_journal_is_rotated_and_read_over_its_files(tmp_path):
+    path = str(tmp_path / 'events.journal')
+    journal = EventJournal(path, max_bytes=len(frame(0)) * 2, backup_count=2)
+    for index in range(8):
+        journal.write(frame(index))
+    journal.close()
+
+    assert journal_files(path) == [f'{path}.2', f'{path}.1', path]
+    assert [record[1] for record in read_journal(path)] == [frame(index) for index in range(2, 8)]
+
+
+def test_truncated_last_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'events.journal')
+    journal = EventJournal(path)
+    journal.write(frame(0))
+    journal.write(frame(1))
+    journal.close()
+    with open(path, 'r+b') as journal_file:
+        journal_file.truncate(journal_file.seek(0, 2) - 5)
+
+    assert [record[1] for record in read_journal(path)] == [frame(0)]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'events.journal'
+    path.write_bytes(b'not a journal')
+
+    with pytest.raises(ValueError):
+        list(read_journal(str(path)))
@@ -0,0 +1,68 @@
+import pytest
+
+from src.includes.events_types import EventBeginChallenge, EventEndChallenge, EventPlayerChat
+from src.karma import KarmaVotes
+from src.listeners.karma_listener import KarmaListener
+from src.api.tm_types import ChallengeInfo
+
+
+@pytest.fixture
+def votes():
+    votes = KarmaVotes('uid')
+    votes.load([('first', 1), ('second', 1), ('third', -1)])
+    return votes
+
+
+def test_loaded_votes_are_counted(votes):
+    assert (votes.plus, votes.minus, votes.karma) == (2, 1, 1)
+    assert votes.take_changed() == []
+
+
+def test_changed_vote_moves_between_counters(votes):
+    assert votes.vote('first', -1)
+    assert not votes.vote('first', -1)
+    assert votes.vote('fourth', 1)
+
+    assert (votes.plus, votes.minus) == (2, 2)
+    assert votes.vote_of('first') == -1
+    assert sorted(votes.take_changed()) == [('first', -1), ('fourth', 1)]
+    assert votes.take_changed() == []
+
+
+@pytest.fixture
+def pyseco(mocker):
+    pyseco = mocker.Mock()
+    pyseco.mysql.get_karma.side_effect = lambda uid: [{'Login': 'first', 'Score': 1}] if uid == 'A02' else []
+    return pyseco
+
+
+def test_next_challenge_votes_are_preloaded(pyseco, challenge_struct):
+    listener = KarmaListener('karma', pyseco)
+    pyseco.rpc.get_next_challenge_info.return_value = ChallengeInfo(uid='A02')
+    listener.on_begin_challenge(EventBeginChallenge(challenge_struct('A01'), False, False))
+    pyseco.rpc.get_next_challenge_info.return_value = ChallengeInfo(uid='A03')
+    listener.on_begin_challenge(EventBeginChallenge(challenge_struct('A02'), False, False))
+
+    assert listener.current.challenge_uid == 'A02'
+    assert listener.current.plus == 1
+    assert listener.next.challenge_uid == 'A03'
+    assert [call[0][0] for call in pyseco.mysql.get_karma.call_args_list] == ['A01', 'A02', 'A03']
+    pyseco.schedule_periodic.assert_called_once_with(pyseco.config.karma_flush_interval, listener.save)
+
+
+def test_votes_are_counted_and_saved_in_batch(pyseco, challenge_struct):
+    listener = KarmaListener('karma', pyseco)
+    pyseco.rpc.get_next_challenge_info.return_value = ChallengeInfo(uid='A01')
+    listener.on_begin_challenge(EventBeginChallenge(challenge_struct('A01'), False, False))
+
+    listener.on_player_chat(EventPlayerChat(236, 'first', '++', False))
+    listener.on_player_chat(EventPlayerChat(237, 'second', ' -- ', False))
+    listener.on_player_chat(EventPlayerChat(237, 'second', 'gg ++', False))
+    pyseco.mysql.save_karma_later.assert_not_called()
+    listener.on_end_challenge(EventEndChallenge([], challenge_struct('A01'), False, False, False))
+
+    assert (listener.current.plus, listener.current.minus) == (1, 1)
+    pyseco.server_message_to_login.assert_called_with('second', 'Karma of this challenge: $0f0+1 $f00-1')
+    pyseco.mysql.save_karma_later.assert_called_once()
+    assert pyseco.mysql.save_karma_later.call_args[0][0] == 'A01'
+    assert sorted(pyseco.mysql.save_karma_later.call_args[0][1]) == [('first', 1), ('second', -1)]
@@ -0,0 +1,87 @@
+import pytest
+from pymysql import OperationalError, ProgrammingError
+
+from src.includes.mysql_pool import ConnectionPool, WriteBehind
+
+
+@pytest.fixture
+def connect(mocker):
+    return mocker.Mock(side_effect=lambda: mocker.MagicMock(name='connection'))
+
+
+def cursor_of(connection):
+    return connection.cursor.return_value.__enter__.return_value
+
+
+def test_connections_are_opened_when_needed_and_reused(connect):
+    pool = ConnectionPool(connect, size=2)
+
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+    with pool.connection() as again:
+        assert again in (first, second)
+
+    assert connect.call_count == 2
+
+
+def test_connection_is_pinged_after_being_idle(connect, mocker):
+    clock = mocker.patch('src.includes.mysql_pool.time.monotonic')
+    clock.return_value = 100.0
+    pool = ConnectionPool(connect, ping_interval=30)
+    pool.open()
+
+    with pool.connection() as connection:
+        connection.ping.assert_not_called()
+    clock.return_value = 200.0
+    with pool.connection() as connection:
+        connection.ping.assert_called_once_with(reconnect=True)
+
+
+def test_operation_is_retried_on_a_new_connection_after_connection_error(connect):
+    pool = ConnectionPool(connect)
+    used = []
+
+    def operation(connection):
+        used.append(connection)
+        if len(used) == 1:
+            raise OperationalError(2006, 'MySQL server has gone away')
+        return 'rows'
+
+    assert pool.run(operation) == 'rows'
+    assert used[0] is not used[1]
+    used[0].close.assert_called_once()
+
+
+def test_writes_are_batched_with_executemany_in_one_transaction(connect):
+    pool = ConnectionPool(connect)
+    with pool.connection() as connection:
+        pass
+    writes = WriteBehind(pool)
+    writes.execute('INSERT INTO rs_times VALUES (%s, %s)', (1, 100))
+    writes.execute('INSERT INTO rs_times VALUES (%s, %s)', (2, 200))
+    writes.execute('UPDATE players SET wins = wins + 1 WHERE id = %s', (1,))
+
+    writes.close()
+
+    cursor = cursor_of(connection)
+    cursor.executemany.assert_called_once_with('INSERT INTO rs_times VALUES (%s, %s)', [(1, 100), (2, 200)])
+    cursor.execute.assert_called_once_with('UPDATE players SET wins = wins + 1 WHERE id = %s', (1,))
+    connection.commit.assert_called_once_with()
+    assert writes.written == 3
+
+
+def test_failed_batch_is_rolled_back_and_dropped(connect, mocker):
+    logger = mocker.patch('src.includes.mysql_pool.logger')
+    pool = ConnectionPool(connect)
+    with pool.connection() as connection:
+        pass
+    cursor_of(connection).execute.side_effect = ProgrammingError(1146, "Table 'rs_nothing' doesn't exist")
+    writes = WriteBehind(pool)
+    writes.execute('DELETE FROM rs_nothing')
+    writes.flush()
+
+    connection.rollback.assert_called_once_with()
+    assert writes.failed == 1
+    logger.error.assert_called_once()
+    writes.close()
@@ -0,0 +1,67 @@
+import pymysql
+import pytest
+from pymysql import OperationalError
+
+from src.includes.mysql_wrapper import MySqlWrapper
+
+
+@pytest.fixture
+def connection(mocker):
+    return mocker.patch('src.includes.mysql_wrapper.pymysql.connect').return_value
+
+
+@pytest.fixture
+def mysql(mocker, connection):
+    config = mocker.Mock(db_pool_size=2, db_ping_interval=30, db_write_batch=100)
+    mysql = MySqlWrapper(config)
+    yield mysql
+    mysql.close()
+
+
+def streaming_cursor(connection, rows):
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchmany.side_effect = lambda size: [rows.pop(0) for _ in range(min(size, len(rows)))]
+    return cursor
+
+
+def test_rows_are_streamed_in_batches(mysql, connection):
+    cursor = streaming_cursor(connection, [{'Id': index} for index in range(5)])
+
+    batches = list(mysql.iter_batches(MySqlWrapper.RS_TIMES, batch_size=2))
+
+    assert batches == [[{'Id': 0}, {'Id': 1}], [{'Id': 2}, {'Id': 3}], [{'Id': 4}]]
+    connection.cursor.assert_called_once_with(pymysql.cursors.SSDictCursor)
+    cursor.execute.assert_called_once_with('SELECT * FROM rs_times', ())
+
+
+def test_columns_can_be_streamed_as_tuples(mysql, connection):
+    cursor = streaming_cursor(connection, [(1, 36520), (2, 41210)])
+
+    rows = list(mysql.iter_rows(MySqlWrapper.RECORDS, ['PlayerId', 'Score'], tuples=True))
+
+    assert rows == [(1, 36520), (2, 41210)]
+    connection.cursor.assert_called_once_with(pymysql.cursors.SSCursor)
+    cursor.execute.assert_called_once_with('SELECT `PlayerId`, `Score` FROM records', ())
+
+
+def test_connection_goes_back_to_pool_when_reading_stops_early(mysql, connection):
+    streaming_cursor(connection, [{'Id': index} for index in range(5)])
+
+    rows = mysql.iter_rows(MySqlWrapper.RS_TIMES, batch_size=2)
+    next(rows)
+    rows.close()
+    list(mysql.iter_rows(MySqlWrapper.RS_TIMES))
+
+    assert pymysql.connect.call_count == 1
+
+
+def test_database_down_at_startup_is_connected_later(mocker, connection):
+    pymysql.connect.side_effect = [OperationalError(2003, "Can't connect to MySQL server"), connection]
+    mysql = MySqlWrapper(mocker.Mock(db_pool_size=2, db_ping_interval=30, db_write_batch=100))
+
+    with pytest.raises(OperationalError):
+        mysql.connect()
+    streaming_cursor(connection, [{'Id': 1}])
+
+    assert list(mysql.iter_rows(MySqlWrapper.PLAYERS)) == [{'Id': 1}]
+    mysql.close()
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from src.controllers.admin_controller import AdminController
+from src.dispatcher import EventDispatcher
+from src.profiler import HandlerProfiler, LatencyHistogram
+
+
+class Handlers:
+    def __init__(self):
+        self.calls = []
+
+    def fast(self, data):
+        self.calls.append(data)
+
+    def slow(self, release):
+        release.wait(1)
+
+
+def test_histogram_counts_calls_in_buckets():
+    histogram = LatencyHistogram()
+    for elapsed in [0.0001, 0.0002, 0.003, 0.2, 7.0]:
+        histogram.add(elapsed)
+
+    assert histogram.count == 5
+    assert histogram.max == 7.0
+    assert histogram.percentile(40) == 0.0005
+    assert histogram.percentile(60) == 0.005
+    assert histogram.percentile(80) == 0.25
+    assert histogram.percentile(100) == 7.0
+
+
+def test_calls_are_profiled_per_event_and_listener():
+    profiler = HandlerProfiler()
+    handlers = Handlers()
+
+    for data in range(3):
+        profiler.call('EventPlayerChat', handlers.fast, data)
+    profiler.call('EventPlayerFinish', handlers.fast, 3)
+
+    assert handlers.calls == [0, 1, 2, 3]
+    assert profiler.histogram('EventPlayerChat', handlers.fast).count == 3
+    assert profiler.histogram('EventPlayerFinish', handlers.fast).count == 1
+
+
+def test_failing_call_is_profiled_too():
+    profiler = HandlerProfiler()
+
+    def failing():
+        raise ValueError()
+
+    try:
+        profiler.call('EventPlayerChat', failing)
+    except ValueError:
+        pass
+
+    assert profiler.histogram('EventPlayerChat', failing).count == 1
+
+
+def test_report_lists_top_offenders_first():
+    profiler = HandlerProfiler()
+    profiler.call('EventPlayerChat', Handlers().fast, 0)
+    profiler.call('EventEndRace', lambda: time.sleep(0.01))
+
+    report = profiler.report(1)
+
+    assert len(report) == 1
+    assert report[0].startswith('EventEndRace test_report_lists_top_offenders_first.<locals>.<lambda>: 1 call(s)')
+
+
+def test_watchdog_logs_stack_of_slow_handler_once(mocker):
+    logger = mocker.patch('src.profiler.logger')
+    profiler = HandlerProfiler(slow_threshold=0.02)
+    release = threading.Event()
+    worker = threading.Thread(target=profiler.call, args=('EventEndRace', Handlers().slow, release))
+    worker.start()
+    profiler.start_watchdog()
+    time.sleep(0.1)
+    release.set()
+    worker.join()
+    profiler.stop_watchdog()
+
+    assert profiler.slow_calls == 1
+    logger.warning.assert_called_once()
+    assert 'Handlers.slow handling EventEndRace runs for' in logger.warning.call_args[0][0]
+    assert 'release.wait(1)' in logger.warning.call_args[0][0]
+
+
+def test_watchdog_does_not_busy_loop_without_threshold(mocker):
+    profiler = HandlerProfiler(slow_threshold=0)
+    check_running = mocker.patch.object(profiler, 'check_running')
+    profiler.start_watchdog()
+    time.sleep(0.1)
+    profiler.stop_watchdog()
+
+    assert check_running.call_count <= 15
+
+
+def test_admin_command_sends_profile_to_chat(mocker):
+    pyseco = mocker.Mock()
+    pyseco.profiler = HandlerProfiler()
+    pyseco.profiler.call('EventPlayerChat', Handlers().fast, 0)
+    pyseco.dispatcher = EventDispatcher(1)
+
+    AdminController(pyseco).profile('admin')
+    pyseco.dispatcher.shutdown()
+
+    assert pyseco.server_message.call_count == 2
+    assert pyseco.server_message.call_args_list[0][0][0].startswith('EventPlayerChat Handlers.fast: 1 call(s)')
+    assert pyseco.server_message.call_args_list[1][0][0].startswith('shard 0: depth 0 (max 0), handled 0')
+
+
+def test_profile_is_dumped_to_file(tmp_path):
+    profiler = HandlerProfiler()
+    profiler.call('EventPlayerChat', Handlers().fast, 0)
+
+    profiler.dump(str(tmp_path / 'profile.txt'))
+
+    assert (tmp_path / 'profile.txt').read_text().startswith('EventPlayerChat Handlers.fast')
@@ -3,9 +3,12 @@ import pytest
 from collections import namedtuple
 from unittest.mock import Mock, call
 from random import randint
+from xmlrpc.client import dumps, Fault
+from pymysql import OperationalError
 
-from src.api.tm_types import Status, ChallengeInfo
+from src.api.tm_types import Status, ChallengeInfo, PlayerInfo, DetailedPlayerInfo, PlayerRanking
 from src.errors import NotAnEvent, EventDiscarded
+from src.includes.events_types import EventPlayerConnect, EventPlayerCheckpoint
 from src.pyseco import Listener, Pyseco
 
 
@@ -15,9 +18,16 @@ CallAssert = namedtuple('CallAssert', ['call', 'params'])
 TM_FOREVER = 1
 
 DummyConfig = namedtuple('Dummyconfig', ['prefix', 'color', 'tm_login', 'rcp_login', 'rcp_password', 'rcp_ip',
-                                         'rcp_port', 'db_hostname', 'db_user', 'db_password', 'db_name', 'db_charset'])
+                                         'rcp_port', 'db_hostname', 'db_user', 'db_password', 'db_name', 'db_charset',
+                                         'rpc_threaded', 'event_workers',
+                                         'events_queue_size', 'events_queue_policies', 'event_tick',
+                                         'events_journal', 'events_journal_max_bytes', 'events_journal_backups',
+                                         'slow_handler_threshold', 'profiler_dump', 'chat_messages_per_second',
+                                         'local_records', 'min_rank_records', 'karma_flush_interval',
+                                         'dispatcher_stats_interval'],
+                         defaults=['', 1024, 1, 0.1, '', 0, 50, 3, 60, 300])
 DUMMY_CONFIG = DummyConfig("T", "$00f", "server_login", "login", "password", "11.22.33.44", 5002, "localhost", "root",
-                           "passwd", "aseco", "utf8")
+                           "passwd", "aseco", "utf8", False, 0, 100, {}, 0.1)
 DUMMY_PATH_TO_CONFIG = '/path/to/config.yaml'
 
 
@@ -95,7 +105,7 @@ def mysql(mocker):
 @pytest.fixture(autouse=True)
 def rpc(mocker):
     rpc = mocker.patch('src.pyseco.XmlRpc')
-    rpc.return_value.get_status.return_value = Status({'id': 4, 'name': 'status'})
+    rpc.return_value.get_status.return_value = Status({'Code': 4, 'Name': 'status'})
     rpc.return_value.get_current_challenge_info.return_value = ChallengeInfo()
     return rpc
 
@@ -133,6 +143,40 @@ def test_should_sync_data_on_run(transport, pyseco, rpc, server):
     rpc.return_value.get_player_list.assert_called_once()
 
 
+def test_should_synchronize_players_in_bulk(pyseco, rpc):
+    rpc.return_value.get_player_list.return_value = [PlayerInfo(login='first'), PlayerInfo(login='second')]
+    multicall = rpc.return_value.getMulticallRpc.return_value
+    multicall.exec_multicall.return_value = [DetailedPlayerInfo(login='first'), DetailedPlayerInfo(login='second')]
+    rpc.return_value.get_current_ranking_for_login.return_value = [PlayerRanking(login='second', rank=1),
+                                                                   PlayerRanking(login='first', rank=2)]
+
+    pyseco.synchronize_players()
+
+    assert multicall.get_detailed_player_info.call_args_list == [call('first'), call('second')]
+    rpc.return_value.get_current_ranking_for_login.assert_called_once_with('first,second')
+    rpc.return_value.get_detailed_player_info.assert_not_called()
+    assert pyseco.get_player('first').ranking.rank == 2
+    assert pyseco.get_player('second').ranking.rank == 1
+
+
+def test_players_which_left_during_synchronization_are_skipped(pyseco, rpc):
+    rpc.return_value.get_player_list.return_value = [PlayerInfo(login='first'), PlayerInfo(login='gone'),
+                                                     PlayerInfo(login='second')]
+    multicall = rpc.return_value.getMulticallRpc.return_value
+    multicall.exec_multicall.return_value = [DetailedPlayerInfo(login='first'), Fault(-1000, 'Login unknown.'),
+                                             DetailedPlayerInfo(login='second')]
+    rankings = {'first,second': False, 'first': [PlayerRanking(login='first', rank=2)], 'second': False}
+    rpc.return_value.get_current_ranking_for_login.side_effect = rankings.get
+
+    pyseco.synchronize_players()
+
+    assert rpc.return_value.get_current_ranking_for_login.call_args_list == [call('first,second'), call('first'),
+                                                                             call('second')]
+    assert set(pyseco.players) == {'first', 'second'}
+    assert pyseco.get_player('first').ranking.rank == 2
+    assert pyseco.get_player('second').ranking == PlayerRanking(login='second')
+
+
 def test_an_exception_other_than_keyboardinterrupt_should_be_passed_further(rpc, pyseco):
     rpc.return_value.authenticate.return_value = True
     rpc.return_value.chat_send_server_message.side_effect = Exception
@@ -266,3 +310,107 @@ def test_should_not_call_method_on_exception_raised(mocker, pyseco):
     listener.on_dummy_event3.assert_not_called()
     listener.on_dummy_event4.assert_called_with()
     listener.on_dummy_event5.assert_called_with(events_queue[4].data)
+
+
+def test_unsubscribed_callback_should_be_skipped_without_parsing(mocker, pyseco):
+    loads = mocker.patch('src.pyseco.loads')
+    listener = DummyListener(mocker)
+    pyseco.register(EventPlayerConnect.name, listener.on_dummy_event1)
+
+    pyseco.handle_event(dumps((0, 'login', 12345, 0, 1), 'TrackMania.PlayerCheckpoint').encode())
+
+    loads.assert_not_called()
+    listener.on_dummy_event1.assert_not_called()
+    assert pyseco.skipped_callbacks == 1
+
+
+def test_subscribed_callback_should_be_parsed(mocker, pyseco):
+    listener = DummyListener(mocker)
+    pyseco.register(EventPlayerCheckpoint.name, listener.on_dummy_event1)
+
+    pyseco.handle_event(dumps((0, 'login', 12345, 0, 1), 'TrackMania.PlayerCheckpoint').encode())
+
+    listener.on_dummy_event1.assert_called_once_with(EventPlayerCheckpoint(0, 'login', 12345, 0, 1))
+    assert pyseco.skipped_callbacks == 0
+
+
+def test_batch_listener_should_get_events_on_tick_only(mocker, pyseco):
+    listener = DummyListener(mocker)
+    pyseco.register_batch(EventPlayerCheckpoint.name, listener.on_dummy_event1)
+
+    for index in range(3):
+        pyseco.handle_event(dumps((0, 'login', 1000 * index, 0, index), 'TrackMania.PlayerCheckpoint').encode())
+    listener.on_dummy_event1.assert_not_called()
+    pyseco.coalescer.flush()
+
+    listener.on_dummy_event1.assert_called_once_with(
+        [EventPlayerCheckpoint(0, 'login', 1000 * index, 0, index) for index in range(3)])
+    assert pyseco.skipped_callbacks == 0
+
+
+def test_journaled_events_should_be_replayed(mocker, config, transport, tmp_path):
+    mocker.patch('src.pyseco.is_bound').return_value = True
+    config.return_value = DUMMY_CONFIG._replace(events_journal=str(tmp_path / 'events.journal'))
+    pyseco = Pyseco(DUMMY_PATH_TO_CONFIG)
+    assert transport.return_value.journal is pyseco.journal
+    listener = DummyListener(mocker)
+    pyseco.register(EventPlayerCheckpoint.name, listener.on_dummy_event1)
+    for index in range(3):
+        pyseco.journal.write(dumps((0, 'login', 1000 * index, 0, index), 'TrackMania.PlayerCheckpoint').encode())
+    pyseco.disconnect()
+
+    assert pyseco.replay(str(tmp_path / 'events.journal')) == 3
+    assert listener.on_dummy_event1.call_args_list == [
+        call(EventPlayerCheckpoint(0, 'login', 1000 * index, 0, index)) for index in range(3)]
+
+
+def test_buffered_events_should_be_handled_before_received_ones(mocker, pyseco, transport):
+    handle_event = mocker.patch.object(pyseco, 'handle_event')
+    pyseco.events_queue.put(b'buffered')
+    transport.return_value.poll_message.side_effect = ['received', None]
+
+    pyseco._handle_pending_events()
+
+    assert handle_event.call_args_list == [call(b'buffered'), call('received')]
+
+
+def test_server_messages_are_sent_on_chat_flush(rpc, pyseco):
+    pyseco.server_message_to_login('first', 'hello')
+    pyseco.server_message_to_login('second', 'hello')
+    rpc.return_value.chat_send_server_message_to_login.assert_not_called()
+
+    pyseco.chat.flush()
+
+    rpc.return_value.chat_send_server_message_to_login.assert_called_once_with('$00fT~ $888hello', 'first,second')
+
+
+def test_database_down_at_startup_keeps_the_wrapper(mysql):
+    mysql.return_value.connect.side_effect = OperationalError(2003, "Can't connect to MySQL server")
+
+    pyseco = Pyseco(DUMMY_PATH_TO_CONFIG)
+
+    assert pyseco.mysql is mysql.return_value
+
+
+def test_watchdog_is_not_started_when_slow_threshold_is_off(mocker, config):
+    config.return_value = DUMMY_CONFIG._replace(slow_handler_threshold=0)
+    pyseco = Pyseco(DUMMY_PATH_TO_CONFIG)
+    mocker.patch.object(pyseco.loop, 'run_forever')
+    mocker.patch.object(pyseco, '_handle_pending_events')
+    start_watchdog = mocker.patch.object(pyseco.profiler, 'start_watchdog')
+
+    pyseco.start_listening()
+
+    start_watchdog.assert_not_called()
+
+
+def test_disconnect_should_flush_chat_and_close_the_loop_once(mocker, pyseco, transport):
+    flush = mocker.patch.object(pyseco.chat, 'flush')
+    close = mocker.patch.object(pyseco.loop, 'close')
+
+    pyseco.disconnect()
+    pyseco.disconnect()
+
+    flush.assert_called_once_with(use_budget=False)
+    close.assert_called_once_with()
+    transport.return_value.disconnect.assert_called_once()
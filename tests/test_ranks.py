@@ -0,0 +1,69 @@
+import pytest
+
+from src.ranks import RankEngine
+
+RECORDS = [
+    ('A01', 'first'), ('A01', 'second'), ('A01', 'third'),
+    ('A02', 'second'), ('A02', 'first'),
+    ('A03', 'first'), ('A03', 'third'), ('A03', 'fourth'), ('A03', 'fifth'),
+]
+
+
+@pytest.fixture
+def ranks():
+    ranks = RankEngine(max_records=3, min_records=2)
+    ranks.build(RECORDS)
+    return ranks
+
+
+def test_build_computes_averages_like_xaseco(ranks):
+    assert ranks.nb_challenges == 3
+    assert ranks.average('first') == pytest.approx((1 + 2 + 1) / 3)
+    assert ranks.average('third') == pytest.approx((3 + 3 + 2) / 3)
+    assert ranks.average('fourth') is None
+    assert ranks.average('fifth') is None
+    assert len(ranks) == 3
+
+
+def test_rank_of_orders_ranked_players(ranks):
+    assert [ranks.rank_of(login) for login in ('first', 'second', 'third', 'fourth')] == [1, 2, 3, None]
+
+
+def test_build_marks_nothing_changed(ranks):
+    assert ranks.take_changed() == []
+
+
+def test_new_ranking_updates_only_the_players_on_it(ranks):
+    ranks.set_ranking('A03', ['fourth', 'first', 'third'])
+
+    assert sorted(ranks.take_changed()) == [('first', 16667), ('fourth', None), ('third', 30000)]
+    assert ranks.take_changed() == []
+    assert ranks.rank_of('first') == 1
+    assert ranks.rank_of('second') == 2
+
+
+def test_player_losing_the_rank_is_reported(ranks):
+    ranks.set_ranking('A02', ['fourth', 'fifth', 'first'])
+
+    assert sorted(ranks.take_changed()) == [('fifth', None), ('first', 16667), ('fourth', 23333), ('second', None)]
+
+
+def test_first_record_on_a_new_challenge_changes_everybody(ranks):
+    ranks.set_ranking('A04', ['fourth'])
+
+    changed = dict(ranks.take_changed())
+    assert len(changed) == 4
+    assert changed['first'] == 17500
+    assert changed['fourth'] == 25000
+
+
+def test_incremental_updates_match_a_rebuild(ranks):
+    ranks.set_ranking('A01', ['third', 'first', 'sixth'])
+    ranks.set_ranking('A03', ['fifth', 'first', 'third'])
+    rebuilt = RankEngine(max_records=3, min_records=2)
+    rebuilt.build([('A01', 'third'), ('A01', 'first'), ('A01', 'sixth'), ('A02', 'second'), ('A02', 'first'),
+                   ('A03', 'fifth'), ('A03', 'first'), ('A03', 'third')])
+
+    for login in ('first', 'second', 'third', 'fifth', 'sixth'):
+        assert ranks.average(login) == rebuilt.average(login)
+        assert ranks.rank_of(login) == rebuilt.rank_of(login)
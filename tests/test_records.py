@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+from src.includes.events_types import EventBeginChallenge, EventEndChallenge, EventPlayerFinish
+from src.listeners.records_listener import RecordsListener
+from src.records import LocalRecords
+from src.utils import format_time
+
+
+@pytest.fixture
+def records():
+    records = LocalRecords('uid', max_records=3)
+    records.load([('first', 30000), ('second', 31000), ('third', 32000)])
+    return records
+
+
+def test_loaded_records_are_ranked(records):
+    assert [records.rank_of(login) for login in ('first', 'second', 'third')] == [1, 2, 3]
+    assert records.rank_of('nobody') is None
+    assert records.take_changed() == []
+
+
+def test_improved_record_moves_up(records):
+    assert records.finish('third', 30500) == 2
+
+    assert records.records() == [('first', 30000), ('third', 30500), ('second', 31000)]
+    assert records.take_changed() == [('third', 30500)]
+    assert records.take_changed() == []
+
+
+def test_slower_time_and_retire_are_not_records(records):
+    assert records.finish('first', 30000) is None
+    assert records.finish('second', 0) is None
+
+
+def test_equal_time_ranks_after_the_older_one(records):
+    assert records.finish('fourth', 31000) == 3
+
+    assert records.records() == [('first', 30000), ('second', 31000), ('fourth', 31000)]
+    assert 'third' not in records
+
+
+def test_time_outside_the_top_is_not_kept(records):
+    assert records.finish('fourth', 32000) is None
+    assert len(records) == 3
+
+
+def test_record_pushed_out_is_not_saved(records):
+    records.finish('fourth', 31500)
+    records.finish('fifth', 29000)
+
+    assert sorted(records.take_changed()) == [('fifth', 29000)]
+
+
+def test_format_time():
+    assert format_time(62350) == '1:02.35'
+    assert format_time(9990) == '0:09.99'
+
+
+def test_listener_loads_on_begin_and_saves_on_end(mocker, challenge_struct):
+    pyseco = mocker.Mock()
+    pyseco.config.local_records = 50
+    pyseco.config.min_rank_records = 1
+    pyseco.players = dict()
+    pyseco.mysql.iter_record_rankings.return_value = [('uid', 'first'), ('other', 'second')]
+    pyseco.mysql.get_records.return_value = [{'Login': 'first', 'Score': 30000}]
+    listener = RecordsListener('records', pyseco)
+    assert listener.ranks_ready.wait(5)
+
+    listener.on_begin_challenge(EventBeginChallenge(challenge_struct('uid'), False, False))
+    listener.on_player_finish(EventPlayerFinish(236, 'second', 31000))
+    listener.on_player_finish(EventPlayerFinish(236, 'first', 30500))
+    listener.on_end_challenge(EventEndChallenge([], challenge_struct('uid'), False, False, False))
+
+    pyseco.mysql.get_records.assert_called_once_with('uid', 50)
+    pyseco.server_message.assert_called_once_with('second$z$s$888 secured the 2. local record 0:31.00')
+    pyseco.mysql.save_records_later.assert_called_once_with('uid', [('second', 31000)])
+    pyseco.mysql.save_ranks_later.assert_called_once_with([('second', 15000)])
+    pyseco.register_command.assert_called_once_with('rank', listener.rank)
+
+
+def test_rank_command(mocker):
+    pyseco = mocker.Mock()
+    pyseco.config.local_records = 50
+    pyseco.config.min_rank_records = 1
+    pyseco.mysql.iter_record_rankings.return_value = []
+    listener = RecordsListener('records', pyseco)
+    assert listener.ranks_ready.wait(5)
+    listener.ranks.build([('uid', 'first'), ('uid', 'second')])
+
+    listener.rank('second')
+    listener.rank('first', 'nobody')
+
+    assert pyseco.server_message_to_login.call_args_list == [mocker.call('second', 'second is ranked 2/2, average 2.0'),
+                                                             mocker.call('first', 'nobody has no server rank yet')]
+
+
+def test_rankings_changed_during_build_are_applied(mocker, challenge_struct):
+    pyseco = mocker.Mock()
+    pyseco.config.local_records = 50
+    pyseco.config.min_rank_records = 1
+    pyseco.players = dict()
+    pyseco.mysql.get_records.return_value = []
+    building = threading.Event()
+    release = threading.Event()
+
+    def iter_record_rankings():
+        building.set()
+        release.wait(5)
+        return [('other', 'first')]
+
+    pyseco.mysql.iter_record_rankings.side_effect = iter_record_rankings
+    listener = RecordsListener('records', pyseco)
+    assert building.wait(5)
+
+    listener.on_begin_challenge(EventBeginChallenge(challenge_struct('uid'), False, False))
+    listener.on_player_finish(EventPlayerFinish(236, 'first', 30000))
+    listener.rank('first')
+    release.set()
+    assert listener.ranks_ready.wait(5)
+    listener.rank('first')
+
+    pyseco.mysql.iter_record_rankings.assert_called_once_with()
+    assert pyseco.server_message_to_login.call_args_list == [
+        mocker.call('first', 'Server ranks are still being computed, try again later'),
+        mocker.call('first', 'first is ranked 1/1, average 1.0')]
@@ -0,0 +1,98 @@
+from queue import Queue
+from xmlrpc.client import loads
+
+import pytest
+
+from src.api.tm_requests import XmlRpc
+from src.includes.config import Config
+from src.includes.events_types import EventData, EventPlayerCheckpoint
+from src.server_context import ServerCtx
+from src.simulator import RandomCallbacks, ServerState, SimulatedServer, scripted_callbacks
+from src.transport import Transport, ThreadedTransport
+
+
+@pytest.fixture
+def state():
+    state = ServerState(challenges=5, seed=1)
+    for _ in range(3):
+        state.add_player()
+    return state
+
+
+def connect(server, transport_class=Transport):
+    events_queue = Queue()
+    transport = transport_class(*server.address, events_queue)
+    transport.connect()
+    return transport, XmlRpc(transport), events_queue
+
+
+def test_common_methods_are_answered_with_fixtures(state):
+    with SimulatedServer(state) as server:
+        transport, rpc, _ = connect(server)
+
+        assert rpc.authenticate('SuperAdmin', 'SuperAdmin')
+        assert rpc.get_status().code == 4
+        assert rpc.get_version().name == 'TmForever'
+        assert [player.login for player in rpc.get_player_list(10)] == list(state.players)
+        assert rpc.get_challenge_list(10, 0)[2].uid == state.challenges[2].uid
+        assert rpc.get_current_challenge_info().name == state.current_challenge.name
+        assert rpc.get_detailed_player_info('player_00002').nickname == state.players['player_00002'].nickname
+        assert [ranking.login for ranking in rpc.get_current_ranking_for_login('player_00001,player_00003')] == \
+            ['player_00001', 'player_00003']
+        transport.disconnect()
+
+
+def test_server_context_synchronizes_over_multicall(state, mocker):
+    with SimulatedServer(state) as server:
+        transport, rpc, _ = connect(server)
+        config = mocker.Mock(spec=Config, tm_login=state.system_info.server_login)
+        server_ctx = ServerCtx(rpc, config)
+
+        server_ctx.synchronize()
+
+        assert server_ctx.version.version == '2.11.26'
+        assert server_ctx.options.name == state.options.name
+        assert server_ctx.max_players.current_value == 255
+        assert server_ctx.detailed_player_info.login == state.system_info.server_login
+        assert server.calls['system.multicall'] == 1
+        transport.disconnect()
+
+
+def test_chat_is_recorded_and_unknown_methods_fault(state):
+    with SimulatedServer(state) as server:
+        transport, rpc, _ = connect(server)
+
+        assert rpc.chat_send_server_message_to_login('hello', 'player_00001')
+        assert rpc.GetNetworkStats() is False
+
+        assert state.chat_messages == [('ChatSendServerMessageToLogin', ('hello', 'player_00001'))]
+        transport.disconnect()
+
+
+def test_scripted_callbacks_are_streamed_once_enabled(state):
+    script = [(0, 'TrackMania.PlayerCheckpoint', (236, 'player_00001', 1000 * index, 0, index)) for index in range(3)]
+    with SimulatedServer(state, scripted_callbacks(script)) as server:
+        transport, rpc, events_queue = connect(server, ThreadedTransport)
+
+        assert rpc.enable_callbacks(True)
+        events = [EventData(*loads(events_queue.get(timeout=1))) for _ in script]
+
+        assert [event.data for event in events] == \
+            [EventPlayerCheckpoint(236, 'player_00001', 1000 * index, 0, index) for index in range(3)]
+        transport.disconnect()
+
+
+def test_random_callbacks_are_valid_events_and_keep_players_consistent(state):
+    callbacks = RandomCallbacks(rate=0, count=300, weights={'next_challenge': 1})
+    with SimulatedServer(state, callbacks) as server:
+        transport, rpc, events_queue = connect(server, ThreadedTransport)
+
+        rpc.enable_callbacks(True)
+        events = [EventData(*loads(events_queue.get(timeout=1))) for _ in range(300)]
+
+        assert {event.name for event in events} >= {'EventPlayerConnect', 'EventPlayerCheckpoint', 'EventPlayerFinish',
+                                                    'EventPlayerChat', 'EventBeginChallenge', 'EventEndRace'}
+        assert server.callbacks_sent == 300
+        logins = set(state.players)
+        assert {player.login for player in rpc.get_player_list(255)} == logins
+        transport.disconnect()
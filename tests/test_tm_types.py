@@ -0,0 +1,36 @@
+from src.api.tm_types import PlayerInfo, DetailedPlayerInfo, Avatar, LadderRanking, GameInfo, NetworkStats, PlayerNetInfos
+from src.includes.events_types import EventPlayerInfoChanged
+
+
+def test_should_map_server_keys_regardless_of_order():
+    player = PlayerInfo({'Flags': 100, 'PlayerId': 3, 'NickName': 'nick', 'Login': 'login'})
+    assert player == PlayerInfo(login='login', nickname='nick', player_id=3, flags=100)
+
+
+def test_should_ignore_unknown_keys_and_default_missing_ones():
+    game_info = GameInfo({'GameMode': 1, 'NbChallenge': 32, 'AllWarmUpDuration': 0, 'ChatTime': 10000})
+    assert game_info == GameInfo(game_mode=1, chat_time=10000, nb_challenge=32)
+
+
+def test_should_build_nested_types():
+    player = DetailedPlayerInfo({'Login': 'login', 'Avatar': {'FileName': 'avatar.tga', 'Checksum': 'abc'},
+                                 'LadderStats': {'PlayerRankings': [{'Path': 'World', 'Ranking': 10}]}})
+
+    assert player.avatar == Avatar('avatar.tga', 'abc')
+    assert player.ladder_stats.player_rankings == [LadderRanking(path='World', ranking=10)]
+    assert player.skins is not DetailedPlayerInfo().skins
+
+
+def test_should_build_list_of_net_infos():
+    stats = NetworkStats({'Uptime': 10, 'PlayerNetInfos': [{'Login': 'first'}, {'Login': 'second', 'PacketLossRate': 0.5}]})
+    assert stats.player_net_infos == [PlayerNetInfos(login='first'), PlayerNetInfos(login='second', packet_loss_rate=0.5)]
+    assert NetworkStats({}).player_net_infos == []
+
+
+def test_player_info_changed_should_map_server_keys():
+    event = EventPlayerInfoChanged({'Flags': 100, 'Login': 'login', 'PlayerId': 3, 'NickName': 'nick'})
+    assert event.player_info == PlayerInfo(login='login', nickname='nick', player_id=3, flags=100)
+
+
+def test_should_use_slots():
+    assert not hasattr(PlayerInfo(), '__dict__')
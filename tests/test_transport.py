@@ -0,0 +1,240 @@
+import asyncio
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from struct import pack, unpack
+from xmlrpc.client import dumps, loads
+
+import pytest
+
+from src.api.tm_requests import AsyncXmlRpc, XmlRpc
+from src.api.tm_types import Status
+from src.includes.event_queue import BoundedEventQueue
+from src.includes.journal import EventJournal, read_journal
+from src.transport import AsyncTransport, FrameDecoder, ThreadedTransport, Transport
+
+PROTOCOL = b'GBXRemote 2'
+
+
+def frame(msg: bytes, handle: int) -> bytes:
+    return pack('<LL', len(msg), handle) + msg
+
+
+class ChunkedSocket:
+    def __init__(self, data: bytes, chunk_size: int):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.recv_calls = 0
+
+    def recv_into(self, buffer):
+        self.recv_calls += 1
+        chunk, self.data = self.data[:min(self.chunk_size, len(buffer))], self.data[min(self.chunk_size, len(buffer)):]
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def read_frames(decoder, sock, count):
+    frames = []
+    while len(frames) < count:
+        frame = decoder.next_frame()
+        if frame is None:
+            decoder.read_from(sock)
+        else:
+            frames.append((frame[0], bytes(frame[1])))
+    return frames
+
+
+async def start_server(responses):
+    async def handle_client(reader, writer):
+        writer.write(pack('<L', len(PROTOCOL)) + PROTOCOL)
+        requests = []
+        while len(requests) < len(responses):
+            size, handle = unpack('<LL', await reader.readexactly(8))
+            params, method_name = loads(await reader.readexactly(size))
+            requests.append((handle, method_name))
+        writer.write(frame(dumps(('Login', True), 'TrackMania.PlayerConnect').encode(), 0x1))
+        for handle, method_name in reversed(requests):
+            writer.write(frame(dumps((responses[method_name],), methodresponse=True).encode(), handle))
+        await writer.drain()
+
+    server = await asyncio.start_server(handle_client, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_pipelined_responses_are_routed_to_their_callers():
+    events_queue = Queue()
+
+    async def scenario():
+        server, port = await start_server({'GetStatus': {'Code': 4, 'Name': 'Running - Play'},
+                                           'GetServerCoppers': 1337})
+        transport = AsyncTransport('127.0.0.1', port, events_queue)
+        await transport.connect()
+        rpc = AsyncXmlRpc(transport)
+        results = await asyncio.gather(rpc.get_status(), rpc.get_server_coppers())
+        await transport.disconnect()
+        server.close()
+        return results
+
+    status, coppers = asyncio.run(scenario())
+
+    assert status == Status(4, 'Running - Play')
+    assert coppers == 1337
+    assert events_queue.qsize() == 1
+    assert loads(events_queue.get())[1] == 'TrackMania.PlayerConnect'
+
+
+def test_async_reader_does_not_wait_for_a_full_queue(tmp_path):
+    events_queue = BoundedEventQueue(1, block_timeout=10)
+    events_queue.put(dumps(('Other', True), 'TrackMania.PlayerConnect').encode())
+    journal = EventJournal(str(tmp_path / 'events.journal'))
+
+    async def scenario():
+        server, port = await start_server({'GetServerCoppers': 1337})
+        transport = AsyncTransport('127.0.0.1', port, events_queue)
+        transport.journal = journal
+        await transport.connect()
+        coppers = await asyncio.wait_for(AsyncXmlRpc(transport).get_server_coppers(), 5)
+        await transport.disconnect()
+        server.close()
+        return coppers
+
+    assert asyncio.run(scenario()) == 1337
+    journal.close()
+
+    assert events_queue.dropped == {'TrackMania.PlayerConnect': 1}
+    assert loads(events_queue.get())[0] == ('Login', True)
+    assert [loads(frame)[0] for _, frame in read_journal(str(tmp_path / 'events.journal'))] == [('Login', True)]
+
+
+def recv_exactly(conn, size):
+    data = b''
+    while len(data) < size:
+        data += conn.recv(size - len(data))
+    return data
+
+
+def serve_in_thread(request_count, answer=True):
+    listener = socket.create_server(('127.0.0.1', 0))
+
+    def handle_client():
+        conn, _ = listener.accept()
+        conn.sendall(pack('<L', len(PROTOCOL)) + PROTOCOL)
+        requests = []
+        while len(requests) < request_count:
+            size, handle = unpack('<LL', recv_exactly(conn, 8))
+            params, method_name = loads(recv_exactly(conn, size))
+            requests.append((handle, params))
+        conn.sendall(frame(dumps(('Login', True), 'TrackMania.PlayerConnect').encode(), 0x1))
+        for handle, params in reversed(requests if answer else []):
+            conn.sendall(frame(dumps(params, methodresponse=True).encode(), handle))
+        conn.close()
+        listener.close()
+
+    threading.Thread(target=handle_client, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def test_threaded_transport_routes_responses_to_calling_threads():
+    events_queue = Queue()
+    transport = ThreadedTransport('127.0.0.1', serve_in_thread(8), events_queue)
+    woken = threading.Event()
+    transport.on_event = woken.set
+    transport.connect()
+    rpc = XmlRpc(transport)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda n: rpc.Echo(f'message {n}'), range(8)))
+
+    assert results == [f'message {n}' for n in range(8)]
+    assert woken.wait(1)
+    assert loads(events_queue.get_nowait())[1] == 'TrackMania.PlayerConnect'
+    transport.disconnect()
+
+
+def test_threaded_transport_fails_waiting_requests_when_connection_is_lost():
+    transport = ThreadedTransport('127.0.0.1', serve_in_thread(1, answer=False), Queue())
+    transport.connect()
+    request_num = transport.send_request(dumps(('only one',), 'echo'))
+
+    try:
+        transport.get_response(request_num)
+        assert False, 'ConnectionError expected'
+    except ConnectionError:
+        pass
+    transport.disconnect()
+
+
+def test_threaded_transport_disconnect_is_not_logged_as_lost_connection(mocker):
+    logger = mocker.patch('src.transport.logger')
+    listener = socket.create_server(('127.0.0.1', 0))
+
+    def handle_client():
+        conn, _ = listener.accept()
+        conn.sendall(pack('<L', len(PROTOCOL)) + PROTOCOL)
+        conn.recv(1)
+        conn.close()
+        listener.close()
+
+    threading.Thread(target=handle_client, daemon=True).start()
+    transport = ThreadedTransport('127.0.0.1', listener.getsockname()[1], Queue())
+    transport.connect()
+
+    transport.disconnect()
+
+    assert not transport._reader_thread.is_alive()
+    logger.error.assert_not_called()
+
+
+@pytest.mark.parametrize('transport_class', [Transport, ThreadedTransport])
+def test_callbacks_are_journaled_when_read(transport_class, tmp_path):
+    events_queue = Queue()
+    transport = transport_class('127.0.0.1', serve_in_thread(1), events_queue)
+    transport.journal = EventJournal(str(tmp_path / 'events.journal'))
+    transport.connect()
+
+    assert XmlRpc(transport).Echo('message') == 'message'
+    callback = events_queue.get(timeout=1)
+    transport.disconnect()
+    transport.journal.close()
+
+    assert [frame for _, frame in read_journal(str(tmp_path / 'events.journal'))] == [callback]
+    assert loads(callback)[1] == 'TrackMania.PlayerConnect'
+
+
+def test_discarded_responses_are_dropped_when_received(mocker):
+    transport = Transport('127.0.0.1', 0, Queue())
+    mocker.patch.object(transport, '_read_frame', side_effect=[(0x80000001, b'stashed'), (0x80000002, b'dropped'),
+                                                               (0x80000003, b'response')])
+
+    transport.discard_response(0x80000002)
+    assert transport._read_response(0x80000003) == b'response'
+    transport.discard_response(0x80000001)
+
+    assert transport._responses == dict()
+    assert transport._discarded == set()
+
+
+def test_decoder_handles_short_reads_of_header():
+    sock = ChunkedSocket(frame(b'first', 0x80000001) + frame(b'second', 0x2), chunk_size=3)
+    assert read_frames(FrameDecoder(), sock, 2) == [(0x80000001, b'first'), (0x2, b'second')]
+
+
+def test_decoder_reads_many_frames_with_one_recv():
+    frames = [(0x80000000 + i, f'message {i}'.encode()) for i in range(50)]
+    sock = ChunkedSocket(b''.join(frame(msg, handle) for handle, msg in frames), chunk_size=1 << 20)
+    assert read_frames(FrameDecoder(), sock, len(frames)) == frames
+    assert sock.recv_calls == 1
+
+
+def test_decoder_grows_buffer_for_frames_larger_than_it():
+    big_message = b'x' * 5000
+    sock = ChunkedSocket(frame(b'small', 0x1) + frame(big_message, 0x2) + frame(b'tail', 0x3), chunk_size=700)
+    assert read_frames(FrameDecoder(buffer_size=64), sock, 3) == [(0x1, b'small'), (0x2, big_message), (0x3, b'tail')]
+
+
+def test_decoder_reads_handshake():
+    decoder = FrameDecoder()
+    decoder.read_from(ChunkedSocket(pack('<L', len(PROTOCOL)) + PROTOCOL, chunk_size=100),
+                      FrameDecoder.HANDSHAKE_HEADER)
+    assert bytes(decoder.next_handshake()) == PROTOCOL